@@ -1,5 +1,9 @@
 from fastapi import APIRouter
 
+from app.ml.cache import get_cache_stats
+from app.ml.circuit_breaker import get_circuit_stats
+from app.ml.ee_executor import get_ee_executor_stats
+
 router = APIRouter()
 
 
@@ -13,3 +17,21 @@ async def health_check():
         "database": "disabled",
         "ml_modules": "integrated"
     }
+
+
+@router.get("/health/cache")
+async def cache_health():
+    """Provider cache hit/miss counters per tier."""
+    return get_cache_stats()
+
+
+@router.get("/health/providers")
+async def provider_health():
+    """Circuit breaker state per upstream provider host."""
+    return get_circuit_stats()
+
+
+@router.get("/health/earth-engine")
+async def earth_engine_health():
+    """Earth Engine executor load: submitted, in-flight and timed-out calls."""
+    return get_ee_executor_stats()
@@ -1,8 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pymongo.database import Database
 
 from app.db.session import get_db
-from app.schemas.water_towers import WaterTowerRead
+from app.ml.gee_ndvi import DEFAULT_COLLECTION
+from app.schemas.water_towers import NdviTrendRead, WaterTowerRead
+from app.services.ndvi_series_service import (
+    get_ndvi_series,
+    ndvi_series_update_status,
+    ndvi_trend,
+    start_ndvi_series_update,
+)
 from app.services.tower_enrichment_service import enrich_water_tower, enrich_all_water_towers
 
 router = APIRouter()
@@ -77,13 +84,54 @@ async def enrich_single_water_tower(
 async def enrich_all_towers(
     ndvi_start: str = "2024-01-01",
     ndvi_end: str = "2024-12-31",
+    max_workers: int | None = Query(None, ge=1, le=32),
     db: Database = Depends(get_db),
 ):
     """
-    Enrich all towers sequentially (avoid hammering external APIs).
+    Enrich all towers in parallel, within per-provider rate limits.
     """
     try:
-        updated = await enrich_all_water_towers(db, ndvi_start=ndvi_start, ndvi_end=ndvi_end)
+        updated = await enrich_all_water_towers(
+            db,
+            ndvi_start=ndvi_start,
+            ndvi_end=ndvi_end,
+            max_workers=max_workers,
+        )
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Bulk enrichment failed: {exc}")
     return [WaterTowerRead.model_validate(_serialize_water_tower(doc)) for doc in updated]
+
+
+@router.get("/water-towers/{water_tower_id}/ndvi-trend", response_model=NdviTrendRead)
+async def get_ndvi_trend(
+    water_tower_id: str,
+    collection: str = DEFAULT_COLLECTION,
+    db: Database = Depends(get_db),
+):
+    """
+    Monthly NDVI series and trend for a tower, read from the stored series
+    (no Earth Engine computation).
+    """
+    if not db["water_towers"].find_one({"id": water_tower_id}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Water tower not found")
+    series = get_ndvi_series(db, water_tower_id, collection)
+    return NdviTrendRead(water_tower_id=water_tower_id, collection=collection, series=series, **ndvi_trend(series))
+
+
+@router.post("/water-towers/ndvi-series/update", status_code=202)
+async def update_ndvi_series_for_towers(
+    tower_ids: list[str] | None = Query(None, description="Limit the update to these towers"),
+    collection: str = DEFAULT_COLLECTION,
+    db: Database = Depends(get_db),
+):
+    """
+    Start appending newly closed months to the towers' NDVI series (backfills
+    from 2017 on first run) in the background; poll GET for its status.
+    """
+    return start_ndvi_series_update(db, tower_ids, collection)
+
+
+@router.get("/water-towers/ndvi-series/update")
+async def get_ndvi_series_update_status():
+    """Status of the background NDVI series update started in this worker."""
+    return ndvi_series_update_status()
@@ -45,8 +45,16 @@ class Settings(BaseSettings):
     # ============================================================================
     cache_enabled: bool = True
     cache_ttl_hours: int = 24
+    cache_mongo_enabled: bool = False  # Share provider cache across workers via Mongo
+    cache_warmup_enabled: bool = True  # Warm canonical tower caches at startup
+    cache_warmup_timeout_seconds: int = 120  # Max startup wait; warm-up then continues in background
+    cache_refresh_interval_hours: float = 6.0  # Background refresh cadence (ahead of TTL expiry)
+    ndvi_store_mongo_enabled: bool = True  # Persist NDVI results in Mongo (closed windows kept forever)
+    ndvi_series_update_enabled: bool = False  # Opt-in daily append of newly closed months to tower NDVI series
+    ndvi_series_update_interval_hours: float = 24.0
     request_timeout_seconds: int = 30
     request_retry_attempts: int = 3
+    enrichment_max_workers: int = 4  # Concurrent towers in enrich-all / backfill
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,28 @@
+from datetime import datetime, timedelta, timezone
+
+from pymongo.database import Database
+from pymongo.errors import DuplicateKeyError
+
+# Background jobs that every uvicorn worker schedules (cache warm-up and
+# refresh, the NDVI series update) run in one worker at a time: each holds a
+# lease document in this collection, taken over once it expires (e.g. after
+# a crashed worker).
+LOCK_COLLECTION = "service_locks"
+
+
+def acquire_lease(db: Database, lock_id: str, owner: str, lease_hours: float) -> bool:
+    """Take the lease unless another owner holds an unexpired one."""
+    now = datetime.now(timezone.utc)
+    try:
+        db[LOCK_COLLECTION].update_one(
+            {"_id": lock_id, "expires_at": {"$lt": now}},
+            {"$set": {"owner": owner, "acquired_at": now, "expires_at": now + timedelta(hours=lease_hours)}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+def release_lease(db: Database, lock_id: str, owner: str) -> None:
+    db[LOCK_COLLECTION].delete_one({"_id": lock_id, "owner": owner})
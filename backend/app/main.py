@@ -1,3 +1,4 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -11,6 +12,19 @@ from app.api import (
     water_towers,
     cfas,
 )
+from app.core.config import settings
+from app.db.session import client as mongo_client
+from app.ml.cache import configure_shared_cache
+from app.ml.ee_executor import shutdown_ee_executor
+from app.ml.environmental_api_client import close_async_http_client
+from app.ml.gee_ndvi import configure_ndvi_store
+from app.services.cache_warmup_service import run_cache_refresher, warm_canonical_caches
+from app.services.ndvi_series_service import run_ndvi_series_updater
+
+
+def _report_warmup(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception():
+        print(f"Cache warm-up failed: {task.exception()}")
 
 
 @asynccontextmanager
@@ -19,11 +33,38 @@ async def lifespan(app: FastAPI):
     # Startup
     print("Starting up...")
     print("Running with MongoDB backend and seeded feature datasets")
+    db = mongo_client[settings.mongodb_db]
+    if settings.cache_mongo_enabled:
+        configure_shared_cache(db)
+    if settings.ndvi_store_mongo_enabled:
+        configure_ndvi_store(db)
+
+    background_tasks = []
+    if settings.cache_warmup_enabled:
+        # Fill the caches before the worker reports ready, but never wait
+        # longer than the timeout; a slow warm-up then finishes in the background
+        warmup = asyncio.create_task(warm_canonical_caches(db))
+        warmup.add_done_callback(_report_warmup)
+        done, _ = await asyncio.wait({warmup}, timeout=settings.cache_warmup_timeout_seconds)
+        if not done:
+            print("Cache warm-up still running; continuing startup")
+            background_tasks.append(warmup)
+        background_tasks.append(
+            asyncio.create_task(run_cache_refresher(db, settings.cache_refresh_interval_hours))
+        )
+    if settings.ndvi_series_update_enabled:
+        background_tasks.append(
+            asyncio.create_task(run_ndvi_series_updater(db, settings.ndvi_series_update_interval_hours))
+        )
     
     yield
     
     # Shutdown
     print("Shutting down...")
+    for task in background_tasks:
+        task.cancel()
+    await close_async_http_client()
+    shutdown_ee_executor()
 
 
 # Create FastAPI app
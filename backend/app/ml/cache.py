@@ -0,0 +1,460 @@
+"""
+Tiered Response Cache
+
+Caches provider responses in three tiers, checked in order:
+1. Memory: process-wide LRU bounded by a byte budget
+2. Disk: one JSON file per key under the cache directory
+3. Mongo: optional shared collection with a TTL index (all workers)
+
+A hit in a lower tier is promoted into the tiers above it. Each tier keeps
+hit/miss counters, available via get_cache_stats(). Concurrent misses for the
+same key are coalesced into one upstream fetch by `inflight` (SingleFlight).
+
+Entries have a soft TTL (`ttl_hours`) and a hard TTL (`stale_ttl_hours`).
+CacheManager.lookup() reports entries between the two as stale so async
+clients can serve them immediately and refresh in the background
+(stale-while-revalidate); only entries past the hard TTL are discarded.
+Async callers use alookup()/aset(), which move blocking Mongo I/O off the
+event loop.
+"""
+
+import asyncio
+import copy
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .config import CACHE_CONFIG, get_config
+from .utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# Stored entries look like {"timestamp": <ISO-8601>, "data": <payload>}
+CacheEntry = Dict[str, Any]
+
+
+# ============================================================================
+# TIERS
+# ============================================================================
+
+class _CacheTier:
+    """Base class for cache tiers; tracks hits and misses."""
+
+    name = "tier"
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        raise NotImplementedError
+
+    def set(self, key: str, entry: CacheEntry, ttl_hours: float, encoded: str) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "stale": self.stale}
+
+
+class MemoryTier(_CacheTier):
+    """
+    In-process LRU evicting least-recently-used entries beyond `max_bytes`.
+
+    Entries are copied on the way in and out, so callers cannot mutate what
+    later callers are served.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_bytes: int):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, tuple[CacheEntry, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            self._entries.move_to_end(key)
+        return copy.deepcopy(item[0])
+
+    def set(self, key: str, entry: CacheEntry, ttl_hours: float, encoded: str) -> None:
+        size = len(encoded)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+            self._entries[key] = (copy.deepcopy(entry), size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and self._entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            **super().stats(),
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+
+class DiskTier(_CacheTier):
+    """One JSON file per key (the original CacheManager layout)."""
+
+    name = "disk"
+
+    def __init__(self, cache_dir: Path):
+        super().__init__()
+        self.cache_dir = cache_dir
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _get_cache_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        cache_path = self._get_cache_path(key)
+        if not cache_path.exists():
+            return None
+        with open(cache_path, "r") as f:
+            return json.load(f)
+
+    def set(self, key: str, entry: CacheEntry, ttl_hours: float, encoded: str) -> None:
+        with open(self._get_cache_path(key), "w") as f:
+            f.write(encoded)
+
+
+class MongoTier(_CacheTier):
+    """Shared collection keyed by cache key; Mongo's TTL monitor removes expired docs."""
+
+    name = "mongo"
+
+    def __init__(self, collection):
+        super().__init__()
+        self.collection = collection
+        self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        doc = self.collection.find_one({"_id": key})
+        if not doc:
+            return None
+        return {"timestamp": doc["timestamp"], "data": doc["data"]}
+
+    def set(self, key: str, entry: CacheEntry, ttl_hours: float, encoded: str) -> None:
+        # ttl_hours is the hard TTL, so stale entries stay readable until then
+        now = datetime.now(timezone.utc)
+        self.collection.replace_one(
+            {"_id": key},
+            {
+                "_id": key,
+                "timestamp": entry["timestamp"],
+                "data": entry["data"],
+                "expires_at": now + timedelta(hours=ttl_hours),
+            },
+            upsert=True,
+        )
+
+
+# ============================================================================
+# SHARED TIERS
+# ============================================================================
+
+_memory_tier = MemoryTier(CACHE_CONFIG["memory_max_bytes"])
+_disk_tiers: Dict[Path, DiskTier] = {}
+_mongo_tier: Optional[MongoTier] = None
+_tiers_lock = threading.Lock()
+
+
+def _get_disk_tier(cache_dir: Path) -> DiskTier:
+    with _tiers_lock:
+        if cache_dir not in _disk_tiers:
+            _disk_tiers[cache_dir] = DiskTier(cache_dir)
+        return _disk_tiers[cache_dir]
+
+
+def configure_shared_cache(db) -> None:
+    """
+    Enable the Mongo tier on the given database (called at application startup).
+
+    Args:
+        db: pymongo Database; entries go to CACHE_CONFIG["mongo_collection"]
+    """
+    global _mongo_tier
+    try:
+        _mongo_tier = MongoTier(db[CACHE_CONFIG["mongo_collection"]])
+        logger.info(f"Shared Mongo cache tier enabled ({CACHE_CONFIG['mongo_collection']})")
+    except Exception as e:
+        _mongo_tier = None
+        logger.warning(f"Mongo cache tier unavailable: {e}")
+
+
+def get_cache_stats() -> Dict[str, Dict[str, int]]:
+    """Hit/miss counters per tier (disk counters are summed across directories)."""
+    disk = {"hits": 0, "misses": 0, "stale": 0}
+    for tier in list(_disk_tiers.values()):
+        disk["hits"] += tier.hits
+        disk["misses"] += tier.misses
+        disk["stale"] += tier.stale
+    stats = {"memory": _memory_tier.stats(), "disk": disk}
+    if _mongo_tier is not None:
+        stats["mongo"] = _mongo_tier.stats()
+    stats["single_flight"] = inflight.stats()
+    return stats
+
+
+# ============================================================================
+# CACHE MANAGER
+# ============================================================================
+
+class CacheManager:
+    """Tiered cache for API responses (memory LRU -> disk -> optional Mongo)."""
+
+    def __init__(self, cache_dir: Path = None, ttl_hours: int = 24, stale_ttl_hours: float = None):
+        """
+        Initialize cache manager.
+
+        Args:
+            cache_dir: Directory for the disk tier (default: config)
+            ttl_hours: Soft time-to-live; older entries are stale
+            stale_ttl_hours: Hard time-to-live; older entries are discarded
+                (default: ttl_hours * CACHE_CONFIG["stale_ttl_multiplier"])
+        """
+        self.cache_dir = Path(cache_dir or get_config()["cache"]["directory"])
+        self.ttl_hours = ttl_hours
+        if stale_ttl_hours is None:
+            stale_ttl_hours = ttl_hours * CACHE_CONFIG["stale_ttl_multiplier"]
+        if not CACHE_CONFIG["stale_while_revalidate"]:
+            stale_ttl_hours = ttl_hours
+        self.stale_ttl_hours = max(stale_ttl_hours, ttl_hours)
+        self.disk = _get_disk_tier(self.cache_dir)
+
+    def _tiers(self) -> list:
+        tiers = [_memory_tier, self.disk]
+        if _mongo_tier is not None:
+            tiers.append(_mongo_tier)
+        return tiers
+
+    @staticmethod
+    def _age(entry: CacheEntry) -> timedelta:
+        timestamp = entry.get("timestamp")
+        if not timestamp:
+            return timedelta(0)
+        return datetime.now() - datetime.fromisoformat(timestamp)
+
+    def _is_fresh(self, entry: CacheEntry, refresh_within_hours: float = 0.0) -> bool:
+        return self._age(entry) <= timedelta(hours=self.ttl_hours - refresh_within_hours)
+
+    def _is_usable(self, entry: CacheEntry) -> bool:
+        return self._age(entry) <= timedelta(hours=self.stale_ttl_hours)
+
+    def get(self, key: str, refresh_within_hours: float = 0.0) -> Optional[Dict[str, Any]]:
+        """
+        Get value from the first tier holding an unexpired entry.
+
+        Args:
+            key: Cache key
+            refresh_within_hours: Treat entries expiring within this many hours
+                as misses (used by the background refresher to renew ahead of TTL)
+
+        Returns:
+            Cached data or None if not found or expired
+        """
+        data, stale = self.lookup(key, refresh_within_hours)
+        return None if stale else data
+
+    def lookup(self, key: str, refresh_within_hours: float = 0.0) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Get value and staleness from the tiers.
+
+        A fresh entry in any tier wins (and is promoted). Otherwise the first
+        entry past the soft TTL but within the hard TTL is returned as stale.
+
+        Args:
+            key: Cache key
+            refresh_within_hours: Treat entries expiring within this many hours
+                as stale
+
+        Returns:
+            (data, is_stale); data is None if not found or past the hard TTL
+        """
+        if not CACHE_CONFIG["enabled"]:
+            return None, False
+
+        missed = []
+        stale_entry = None
+        stale_tier = None
+        for tier in self._tiers():
+            try:
+                entry = tier.get(key)
+            except Exception as e:
+                logger.warning(f"Failed to read {tier.name} cache for {key}: {e}")
+                entry = None
+
+            if entry is not None and self._is_fresh(entry, refresh_within_hours):
+                tier.hits += 1
+                logger.debug(f"Cache hit ({tier.name}) for key: {key}")
+                if missed:
+                    self._write(missed, key, entry)
+                return entry.get("data"), False
+
+            if entry is not None:
+                logger.debug(f"Cache expired ({tier.name}) for key: {key}")
+                if stale_entry is None and self._is_usable(entry):
+                    stale_entry, stale_tier = entry, tier
+            tier.misses += 1
+            missed.append(tier)
+
+        if stale_entry is not None:
+            stale_tier.stale += 1
+            logger.debug(f"Serving stale ({stale_tier.name}) entry for key: {key}")
+            return stale_entry.get("data"), True
+
+        return None, False
+
+    async def alookup(
+        self, key: str, refresh_within_hours: float = 0.0
+    ) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        lookup() for async callers.
+
+        With the Mongo tier enabled the (blocking pymongo) lookup runs in a
+        worker thread so it never stalls the event loop.
+        """
+        if _mongo_tier is None:
+            return self.lookup(key, refresh_within_hours)
+        return await asyncio.to_thread(self.lookup, key, refresh_within_hours)
+
+    async def aset(self, key: str, value: Dict[str, Any]) -> None:
+        """set() for async callers (Mongo writes run in a worker thread)."""
+        if _mongo_tier is None:
+            self.set(key, value)
+        else:
+            await asyncio.to_thread(self.set, key, value)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """
+        Store value in every tier.
+
+        Args:
+            key: Cache key
+            value: Data to cache
+        """
+        if not CACHE_CONFIG["enabled"]:
+            return
+
+        entry = {
+            "timestamp": datetime.now().isoformat(),
+            "data": value
+        }
+        self._write(self._tiers(), key, entry)
+        logger.debug(f"Cached data for key: {key}")
+
+    def _write(self, tiers: list, key: str, entry: CacheEntry) -> None:
+        try:
+            encoded = json.dumps(entry)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Failed to encode cache entry for {key}: {e}")
+            return
+        for tier in tiers:
+            try:
+                tier.set(key, entry, self.stale_ttl_hours, encoded)
+            except Exception as e:
+                logger.warning(f"Failed to write {tier.name} cache for {key}: {e}")
+
+
+# ============================================================================
+# SINGLE-FLIGHT REQUEST COALESCING
+# ============================================================================
+
+class SingleFlight:
+    """
+    Deduplicate concurrent async lookups that share a cache key.
+
+    The first caller for a key starts the fetch; callers arriving while it is
+    in flight await the same task instead of issuing their own upstream
+    request. The task is shielded so a cancelled caller (e.g. a per-source
+    timeout) does not abort the fetch for everyone else. refresh() starts the
+    same kind of task without waiting for it (stale-while-revalidate).
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, "asyncio.Task"] = {}
+        self.leaders = 0
+        self.followers = 0
+        self.refreshes = 0
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run `factory()` once per key among concurrent callers.
+
+        Args:
+            key: Coalescing key (the provider cache key)
+            factory: Zero-argument callable returning the fetch coroutine
+
+        Returns:
+            Result of the shared fetch
+        """
+        loop = asyncio.get_running_loop()
+        task = self._calls.get(key)
+        if task is not None and not task.done() and task.get_loop() is loop:
+            self.followers += 1
+            logger.debug(f"Joining in-flight fetch for key: {key}")
+            return await asyncio.shield(task)
+
+        self.leaders += 1
+        return await asyncio.shield(self._start(loop, key, factory))
+
+    def refresh(self, key: str, factory: Callable[[], Awaitable[Any]]) -> None:
+        """
+        Start `factory()` in the background unless a fetch for key is in flight.
+
+        Must be called from a running event loop. Later callers for the key
+        join the refresh through do() like any other in-flight fetch.
+        """
+        loop = asyncio.get_running_loop()
+        task = self._calls.get(key)
+        if task is not None and not task.done() and task.get_loop() is loop:
+            return
+        self.refreshes += 1
+        logger.debug(f"Refreshing stale entry in background for key: {key}")
+        self._start(loop, key, factory)
+
+    def _start(self, loop, key: str, factory: Callable[[], Awaitable[Any]]) -> "asyncio.Task":
+        task = loop.create_task(factory())
+        self._calls[key] = task
+        task.add_done_callback(lambda done, key=key: self._release(key, done))
+        return task
+
+    def _release(self, key: str, task: "asyncio.Task") -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Fetch for {key} failed: {task.exception()}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "refreshes": self.refreshes,
+            "in_flight": len(self._calls),
+        }
+
+
+inflight = SingleFlight()
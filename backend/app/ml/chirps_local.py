@@ -0,0 +1,333 @@
+"""
+Local CHIRPS Rainfall Engine
+
+Answers rainfall queries from CHIRPS v2 NetCDF files on disk instead of the
+network. Files are opened lazily through xarray (netCDF4/h5netcdf backends),
+so a query reads only the time steps and grid cells it touches, and a single
+process-wide CHIRPSCube serves every site.
+
+Both daily (mm/day) and monthly (mm/month) products are supported: each time
+step is weighted by the fraction of its period that falls inside the
+requested date range. Where files overlap (e.g. daily files next to
+chirps-v2.0.monthly.nc) every day is counted once, taken from a daily
+file when one covers it and from the monthly product otherwise.
+"""
+
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+try:
+    import xarray as xr
+    XARRAY_AVAILABLE = True
+except ImportError:
+    XARRAY_AVAILABLE = False
+    xr = None
+import shapely
+from shapely.geometry import shape
+
+from .config import DATA_SOURCES
+from .utils import setup_logger
+
+logger = setup_logger(__name__)
+
+DateLike = Union[str, date, datetime]
+
+_LAT_NAMES = ("latitude", "lat", "y")
+_LON_NAMES = ("longitude", "lon", "x")
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def _to_day(value: DateLike) -> np.datetime64:
+    if isinstance(value, str):
+        value = datetime.strptime(value, "%Y-%m-%d")
+    return np.datetime64(value, "D")
+
+
+def _standardise(da: "xr.DataArray") -> "xr.DataArray":
+    """Rename spatial dims to latitude/longitude."""
+    renames = {}
+    for names, target in ((_LAT_NAMES, "latitude"), (_LON_NAMES, "longitude")):
+        for name in names:
+            if name in da.dims and name != target:
+                renames[name] = target
+                break
+    return da.rename(renames) if renames else da
+
+
+def _nearest_index(coords: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Nearest grid index per value, plus a mask of values inside the grid."""
+    step = float(np.abs(np.diff(coords)).min()) if coords.size > 1 else 0.05
+    idx = np.abs(coords[:, None] - values[None, :]).argmin(axis=0)
+    inside = np.abs(coords[idx] - values) <= step * 0.5 + 1e-9
+    return idx, inside
+
+
+def _window(coords: np.ndarray, low: float, high: float) -> slice:
+    """Index slice covering [low, high] on an ascending or descending axis."""
+    hits = np.nonzero((coords >= low) & (coords <= high))[0]
+    if hits.size == 0:
+        return slice(0, 0)
+    return slice(int(hits.min()), int(hits.max()) + 1)
+
+
+def _summary(
+    totals: np.ndarray,
+    days_covered: int,
+    requested_days: int
+) -> List[Optional[Dict[str, Any]]]:
+    """Per-site result dicts in the shape returned by rainfall_service."""
+    results: List[Optional[Dict[str, Any]]] = []
+    for total in np.atleast_1d(totals):
+        if days_covered == 0 or not np.isfinite(total):
+            results.append(None)
+            continue
+        results.append({
+            "rainfall_total_mm": float(total),
+            "rainfall_mean_mm_per_day": float(total) / days_covered,
+            "days_covered": int(days_covered),
+            "partial": days_covered < requested_days,
+        })
+    return results
+
+
+# ============================================================================
+# CHIRPS CUBE
+# ============================================================================
+
+class _Segment:
+    """One lazily opened file: its precip variable and per-step periods."""
+
+    def __init__(self, path: Path, variable: str):
+        self.path = path
+        self.dataset = xr.open_dataset(path, cache=False)
+        self.data = _standardise(self.dataset[variable])
+        self.lats = np.asarray(self.data["latitude"].values, dtype=float)
+        self.lons = np.asarray(self.data["longitude"].values, dtype=float)
+
+        times = np.asarray(self.data["time"].values).astype("datetime64[D]")
+        spacing = np.median(np.diff(times).astype(int)) if times.size > 1 else None
+        self.monthly = "monthly" in path.name.lower() or (spacing is not None and spacing >= 28)
+        if self.monthly:
+            months = times.astype("datetime64[M]")
+            self.period_start = months.astype("datetime64[D]")
+            self.period_end = (months + 1).astype("datetime64[D]")
+        else:
+            self.period_start = times
+            self.period_end = times + 1
+
+    def overlap(
+        self,
+        start: np.datetime64,
+        end_exclusive: np.datetime64
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Indices of steps overlapping the range and their [lo, hi) day offsets from start."""
+        lo = np.maximum(self.period_start, start)
+        hi = np.minimum(self.period_end, end_exclusive)
+        steps = np.nonzero(hi > lo)[0]
+        return steps, (lo[steps] - start).astype(int), (hi[steps] - start).astype(int)
+
+    def close(self) -> None:
+        self.dataset.close()
+
+
+class CHIRPSCube:
+    """
+    Lazily opened CHIRPS archive answering point, multi-point and polygon queries.
+
+    Values outside the grid or over the ocean mask (negative/NaN) yield None.
+    """
+
+    def __init__(self, files: Sequence[Path], variable: str = "precip"):
+        if not XARRAY_AVAILABLE:
+            raise ImportError("xarray is required for the local CHIRPS engine")
+        if not files:
+            raise FileNotFoundError("No CHIRPS NetCDF files given")
+        self.variable = variable
+        self.segments = sorted(
+            (_Segment(Path(f), variable) for f in files),
+            key=lambda seg: seg.period_start[0],
+        )
+        self.start = min(seg.period_start[0] for seg in self.segments)
+        self.end = max(seg.period_end[-1] for seg in self.segments) - 1
+        logger.info(
+            f"Opened {len(self.segments)} CHIRPS file(s) covering {self.start} to {self.end}"
+        )
+
+    def _accumulate(self, start: DateLike, end: DateLike, read) -> Tuple[np.ndarray, int, int]:
+        """
+        Weighted rainfall sum over [start, end] across all segments.
+
+        Daily segments are applied before monthly ones and each step only
+        contributes the days no earlier segment covered, so overlapping
+        files never count a day twice.
+
+        `read(segment, steps)` returns values shaped (len(steps), n) for the
+        n queried sites; NaN/negative values are treated as missing.
+        """
+        start_day, end_day = _to_day(start), _to_day(end)
+        end_exclusive = end_day + 1
+        requested_days = int((end_exclusive - start_day).astype(int))
+
+        totals = None
+        covered = np.zeros(requested_days, dtype=bool)
+        for segment in sorted(self.segments, key=lambda seg: seg.monthly):
+            steps, lo, hi = segment.overlap(start_day, end_exclusive)
+            uncovered = np.concatenate(([0], np.cumsum(~covered)))
+            fresh = uncovered[hi] - uncovered[lo]
+            keep = fresh > 0
+            if not keep.any():
+                continue
+            steps, lo, hi, fresh = steps[keep], lo[keep], hi[keep], fresh[keep]
+
+            length = (segment.period_end[steps] - segment.period_start[steps]).astype(int)
+            values = np.asarray(read(segment, steps), dtype=float)
+            values = np.where(values < 0, np.nan, values)
+            contribution = (values * (fresh / length)[:, None]).sum(axis=0)
+            totals = contribution if totals is None else totals + contribution
+
+            marks = np.zeros(requested_days + 1, dtype=int)
+            np.add.at(marks, lo, 1)
+            np.add.at(marks, hi, -1)
+            covered |= np.cumsum(marks)[:-1] > 0
+        return totals, int(covered.sum()), requested_days
+
+    def point_summaries(
+        self,
+        points: Sequence[Tuple[float, float]],
+        start: DateLike,
+        end: DateLike
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Rainfall totals for many (lat, lon) points with one read per file.
+
+        Returns:
+            One summary dict (or None if outside the grid) per point
+        """
+        if not points:
+            return []
+        lats = np.asarray([p[0] for p in points], dtype=float)
+        lons = np.asarray([p[1] for p in points], dtype=float)
+        inside = np.ones(len(points), dtype=bool)
+
+        def read(segment: _Segment, steps: np.ndarray) -> np.ndarray:
+            lat_idx, lat_ok = _nearest_index(segment.lats, lats)
+            lon_idx, lon_ok = _nearest_index(segment.lons, lons)
+            inside[:] &= lat_ok & lon_ok
+            return segment.data.isel(
+                time=xr.DataArray(steps, dims="step"),
+                latitude=xr.DataArray(lat_idx, dims="site"),
+                longitude=xr.DataArray(lon_idx, dims="site"),
+            ).transpose("step", "site").values
+
+        totals, days_covered, requested_days = self._accumulate(start, end, read)
+        if totals is None:
+            return [None] * len(points)
+        totals = np.where(inside, totals, np.nan)
+        return _summary(totals, days_covered, requested_days)
+
+    def point_summary(self, lat: float, lon: float, start: DateLike, end: DateLike) -> Optional[Dict[str, Any]]:
+        """Rainfall total and daily mean for one point over [start, end]."""
+        return self.point_summaries([(lat, lon)], start, end)[0]
+
+    def polygon_summary(
+        self,
+        geometry: Union[Dict[str, Any], Any],
+        start: DateLike,
+        end: DateLike
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Area-mean rainfall over a polygon (GeoJSON dict or shapely geometry).
+
+        Reads only the polygon's bounding window; cells whose centres fall
+        inside the polygon are averaged. Polygons smaller than one cell use
+        the cell under their centroid.
+        """
+        geom = shape(geometry) if isinstance(geometry, dict) else geometry
+        min_lon, min_lat, max_lon, max_lat = geom.bounds
+
+        def read(segment: _Segment, steps: np.ndarray) -> np.ndarray:
+            lat_slice = _window(segment.lats, min_lat, max_lat)
+            lon_slice = _window(segment.lons, min_lon, max_lon)
+            lon_grid, lat_grid = np.meshgrid(segment.lons[lon_slice], segment.lats[lat_slice])
+            mask = shapely.contains_xy(geom, lon_grid, lat_grid)
+            if not mask.any():
+                centroid = geom.centroid
+                lat_idx, _ = _nearest_index(segment.lats, np.array([centroid.y]))
+                lon_idx, _ = _nearest_index(segment.lons, np.array([centroid.x]))
+                lat_slice = slice(int(lat_idx[0]), int(lat_idx[0]) + 1)
+                lon_slice = slice(int(lon_idx[0]), int(lon_idx[0]) + 1)
+                mask = np.ones((1, 1), dtype=bool)
+
+            window = segment.data.isel(
+                time=xr.DataArray(steps, dims="step"),
+                latitude=lat_slice,
+                longitude=lon_slice,
+            ).transpose("step", "latitude", "longitude").values.astype(float)
+            window = np.where(window < 0, np.nan, window)
+            with np.errstate(invalid="ignore"):
+                return np.nanmean(window[:, mask], axis=1)[:, None]
+
+        totals, days_covered, requested_days = self._accumulate(start, end, read)
+        if totals is None:
+            return None
+        return _summary(totals, days_covered, requested_days)[0]
+
+    def annual_rainfall(self, lat: float, lon: float, year: int = None) -> Optional[float]:
+        """
+        Annual rainfall (mm) for a year, or the mean annual total over the archive.
+        """
+        if year is not None:
+            summary = self.point_summary(lat, lon, f"{year}-01-01", f"{year}-12-31")
+            if summary is None or summary["partial"]:
+                return None
+            return summary["rainfall_total_mm"]
+
+        summary = self.point_summary(lat, lon, str(self.start), str(self.end))
+        if summary is None:
+            return None
+        return summary["rainfall_mean_mm_per_day"] * 365.25
+
+    def close(self) -> None:
+        for segment in self.segments:
+            segment.close()
+
+
+# ============================================================================
+# SHARED INSTANCE
+# ============================================================================
+
+_cubes: Dict[Path, Optional[CHIRPSCube]] = {}
+_cubes_lock = threading.Lock()
+
+
+def get_chirps_cube(directory: Path = None) -> Optional[CHIRPSCube]:
+    """
+    Return the process-wide CHIRPSCube for a directory, opening it on first use.
+
+    Args:
+        directory: Folder of CHIRPS NetCDF files (default: DATA_SOURCES["chirps_local"])
+
+    Returns:
+        CHIRPSCube, or None if xarray is unavailable or no files match
+    """
+    source = DATA_SOURCES["chirps_local"]
+    directory = Path(directory or source["path"])
+    with _cubes_lock:
+        if directory not in _cubes:
+            files = sorted(directory.glob(source["pattern"])) if directory.exists() else []
+            cube = None
+            if not XARRAY_AVAILABLE:
+                logger.debug("xarray not installed; local CHIRPS engine disabled")
+            elif files:
+                try:
+                    cube = CHIRPSCube(files, variable=source["variable"])
+                except Exception as e:
+                    logger.warning(f"Could not open local CHIRPS archive in {directory}: {e}")
+            _cubes[directory] = cube
+        return _cubes[directory]
@@ -0,0 +1,148 @@
+"""
+Provider Circuit Breakers
+
+One breaker per upstream host. After repeated failures (timeouts, connection
+errors, 5xx) within a window the breaker opens and requests to that host fail
+immediately, so callers go straight to their cache/fixture fallback instead of
+sitting through retries and backoff. After a cool-down a single probe request
+is let through (half-open); its outcome closes or re-opens the breaker.
+Answers that say nothing about the host's health (429 rate limiting, an
+unexpected client-side error) are neutral: they free the probe slot and leave
+the state as it is.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict
+from urllib.parse import urlparse
+
+from .config import REQUEST_CONFIG
+from .utils import setup_logger
+
+logger = setup_logger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a request is short-circuited because the host's breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `failure_threshold` failures in `window_seconds`;
+    open -> half-open after `reset_timeout_seconds`; half-open admits one probe.
+
+    State is guarded by a threading lock so sync clients running in worker
+    threads and async clients share the same breaker.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        window_seconds: float = 60.0,
+        reset_timeout_seconds: float = 30.0,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.window_seconds = window_seconds
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probe_started_at = 0.0
+        self.rejected = 0
+        self._failures: deque = deque()
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now (claims the probe slot when half-open)."""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN and now - self.opened_at >= self.reset_timeout_seconds:
+                self.state = HALF_OPEN
+                self.probe_started_at = 0.0
+                logger.info(f"Circuit for {self.name} half-open; probing")
+
+            if self.state == CLOSED:
+                return True
+            # A probe that never reported back (e.g. cancelled) frees its slot after the cool-down
+            if self.state == HALF_OPEN and (
+                not self.probe_started_at or now - self.probe_started_at >= self.reset_timeout_seconds
+            ):
+                self.probe_started_at = now
+                return True
+
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        """The host answered (a 2xx or non-429 4xx response); close the breaker."""
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info(f"Circuit for {self.name} closed")
+            self.state = CLOSED
+            self._failures.clear()
+
+    def record_neutral(self) -> None:
+        """The outcome says nothing about host health (e.g. 429); free the probe slot only."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.probe_started_at = 0.0
+
+    def record_failure(self) -> None:
+        """Count an outage-type failure; open the breaker past the threshold."""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == HALF_OPEN:
+                self._open(now)
+                return
+            self._failures.append(now)
+            while self._failures and now - self._failures[0] > self.window_seconds:
+                self._failures.popleft()
+            if self.state == CLOSED and len(self._failures) >= self.failure_threshold:
+                self._open(now)
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == OPEN
+
+    def _open(self, now: float) -> None:
+        self.state = OPEN
+        self.opened_at = now
+        self._failures.clear()
+        logger.warning(f"Circuit for {self.name} opened; failing fast for {self.reset_timeout_seconds}s")
+
+    def stats(self) -> Dict[str, object]:
+        return {"state": self.state, "recent_failures": len(self._failures), "rejected": self.rejected}
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(url: str) -> CircuitBreaker:
+    """
+    Return the shared breaker for the host of `url`.
+
+    Args:
+        url: Request URL (or bare host name)
+
+    Returns:
+        CircuitBreaker configured from REQUEST_CONFIG["circuit_breaker"]
+    """
+    host = urlparse(url).netloc or url
+    with _breakers_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker(host, **REQUEST_CONFIG["circuit_breaker"])
+        return _breakers[host]
+
+
+def get_circuit_stats() -> Dict[str, Dict[str, object]]:
+    """Breaker state per upstream host."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.stats() for breaker in breakers}
@@ -21,8 +21,11 @@ DATA_DIRS = {
     "cache_dir": PROJECT_ROOT / "cache",
     "log_dir": PROJECT_ROOT / "logs",
     "geospatial": PROJECT_ROOT / "data" / "geospatial",
-    "sentinel": PROJECT_ROOT / "data" / "sentinel",
+    "sentinel": Path(os.getenv("SENTINEL_DATA_DIR", PROJECT_ROOT / "data" / "sentinel")),
     "fixtures": PROJECT_ROOT / "data" / "fixtures",
+    "chirps": Path(os.getenv("CHIRPS_DATA_DIR", PROJECT_ROOT / "data" / "chirps")),
+    "soilgrids": Path(os.getenv("SOILGRIDS_DATA_DIR", PROJECT_ROOT / "data" / "soilgrids")),
+    "dem": Path(os.getenv("DEM_DATA_DIR", PROJECT_ROOT / "data" / "dem")),
 }
 
 # Create directories if they don't exist
@@ -79,6 +82,43 @@ DATA_SOURCES = {
         ],
     },
     
+    # Local raster/cube archives (optional; remote APIs are used when absent)
+    "chirps_local": {
+        "path": DATA_DIRS["chirps"],
+        "pattern": os.getenv("CHIRPS_FILE_PATTERN", "chirps-v2.0.*.nc"),
+        "variable": "precip",
+        "format": "netcdf",
+        "description": "CHIRPS v2 daily or monthly precipitation (mm per time step)",
+        "source": "https://data.chc.ucsb.edu/products/CHIRPS-2.0/",
+        "license": "CC-BY 4.0",
+    },
+    "soilgrids_local": {
+        "path": DATA_DIRS["soilgrids"],
+        "pattern": "{property}_{depth}_mean.tif",
+        "properties": ["phh2o", "soc", "sand", "silt", "clay", "bdod"],
+        "depths": ["0-5cm", "5-15cm", "15-30cm"],
+        "format": "geotiff",
+        "description": "SoilGrids 250 m layers pre-clipped to Kenya (raw SoilGrids units)",
+        "source": "https://files.isric.org/soilgrids/latest/data/",
+        "license": "CC-BY 4.0",
+    },
+    "sentinel_local": {
+        "path": DATA_DIRS["sentinel"],
+        "index_file": "catalog.npz",
+        "recheck_seconds": 300,  # How often to look for added/removed scene files
+        "format": "geotiff",
+        "description": "Local Sentinel-2 L2A scenes (STAC items or *_B04_*.tif band files)",
+        "source": "Copernicus Data Space Ecosystem",
+        "license": "Copernicus Sentinel data terms",
+    },
+    "dem": {
+        "path": Path(os.getenv("DEM_PATH", DATA_DIRS["dem"] / "kenya_dem.tif")),
+        "format": "geotiff",
+        "description": "SRTM / Copernicus GLO-30 DEM mosaic clipped to Kenya (metres)",
+        "source": "https://spacedata.copernicus.eu/collections/copernicus-digital-elevation-model",
+        "license": "Copernicus DEM licence / public domain (SRTM)",
+    },
+    
     # Infrastructure data
     "nurseries": {
         "path": DATA_DIRS["data_root"] / "nurseries" / "nurseries_kenya.csv",
@@ -102,7 +142,9 @@ API_ENDPOINTS = {
         "format": "NetCDF / GeoTIFF",
         "authentication": "None",
         "rate_limit": "Unlimited",
-        "cache_ttl_hours": 24
+        "cache_ttl_hours": 24,
+        # Native 0.05° grid; cell centres sit at x.025/x.075
+        "grid": {"lat_step": 0.05, "lon_step": 0.05, "lat_offset": 0.025, "lon_offset": 0.025},
     },
     "nasa_power": {
         "base_url": "https://power.larc.nasa.gov/api/",
@@ -122,7 +164,9 @@ API_ENDPOINTS = {
         "authentication": "API key (free)",
         "rate_limit": "40 requests/minute",
         "cache_ttl_hours": 24,
-        "api_key_env": "NASA_POWER_API_KEY"
+        "api_key_env": "NASA_POWER_API_KEY",
+        # MERRA-2 meteorology grid (0.5° x 0.625°), centred on multiples of the step
+        "grid": {"lat_step": 0.5, "lon_step": 0.625, "lat_offset": 0.0, "lon_offset": 0.0},
     },
     "open_meteo": {
         "base_url": "https://api.open-meteo.com/v1/",
@@ -145,7 +189,9 @@ API_ENDPOINTS = {
         "format": "JSON",
         "authentication": "None (open access)",
         "rate_limit": "Unlimited",
-        "cache_ttl_hours": 720  # 30 days; soil doesn't change frequently
+        "cache_ttl_hours": 720,  # 30 days; soil doesn't change frequently
+        # 250 m product, approximated as a 0.0025° lat/lon grid
+        "grid": {"lat_step": 0.0025, "lon_step": 0.0025, "lat_offset": 0.00125, "lon_offset": 0.00125},
     },
     "gbif": {
         "base_url": "https://api.gbif.org/v1/",
@@ -191,7 +237,13 @@ CACHE_CONFIG = {
     "enabled": True,
     "directory": DATA_DIRS["cache_dir"],
     "max_age_hours": 24,
-    "strategy": "file-based",  # Could be: file-based, redis, memcached
+    "strategy": "tiered",  # memory LRU -> disk JSON -> optional shared Mongo
+    "memory_max_bytes": int(os.getenv("CACHE_MEMORY_MAX_BYTES", 32 * 1024 * 1024)),
+    "mongo_collection": "provider_cache",
+    # Stale-while-revalidate: entries past their TTL (soft) but younger than
+    # TTL * stale_ttl_multiplier (hard) are served while a background refresh runs
+    "stale_while_revalidate": os.getenv("CACHE_STALE_WHILE_REVALIDATE", "true").lower() == "true",
+    "stale_ttl_multiplier": float(os.getenv("CACHE_STALE_TTL_MULTIPLIER", 7)),
 }
 
 REQUEST_CONFIG = {
@@ -200,6 +252,30 @@ REQUEST_CONFIG = {
     "retry_delay_seconds": 1,
     "backoff_multiplier": 2.0,
     "ssl_verify": True,
+    # Per-source deadlines for the concurrent feature fan-out
+    "source_timeouts_seconds": {
+        "rainfall": 60,
+        "temperature": 60,
+        "solar_radiation": 60,  # same NASA POWER climatology record as temperature
+        "soil": 60,
+        "elevation": 30,
+        "ndvi": 120,
+    },
+    # Per-host circuit breaker: open after `failure_threshold` timeouts,
+    # connection errors or 5xx responses within `window_seconds`, then allow
+    # one probe request after `reset_timeout_seconds`
+    "circuit_breaker": {
+        "failure_threshold": int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5)),
+        "window_seconds": 60,
+        "reset_timeout_seconds": int(os.getenv("CIRCUIT_RESET_TIMEOUT_SECONDS", 30)),
+    },
+    # Earth Engine calls run on a dedicated thread pool sized to the project's
+    # concurrent-request quota; callers give up after the deadline
+    "earth_engine": {
+        "max_concurrent_requests": int(os.getenv("EE_MAX_CONCURRENT_REQUESTS", 10)),
+        "deadline_seconds": float(os.getenv("EE_REQUEST_DEADLINE_SECONDS", 90)),
+        "batch_deadline_seconds": float(os.getenv("EE_BATCH_DEADLINE_SECONDS", 300)),
+    },
 }
 
 # ============================================================================
@@ -227,6 +303,22 @@ FEATURE_CONFIG = {
             "resolution": 10,  # meters
         },
         "valid_pixel_threshold": 0.1,  # Minimum 10% valid pixels required
+        "windowed": os.getenv("NDVI_WINDOWED", "true").lower() == "true",  # Block-by-block reads
+        "block_size": 1024,  # Block edge (pixels) for untiled bands; tiled bands use their tiling
+        "reflectance_scale": 10000,  # Sentinel-2 L2A DN -> surface reflectance (EVI/SAVI need reflectance)
+        "boa_add_offset": -1000,  # L2A BOA_ADD_OFFSET (DN) from processing baseline 04.00 on
+        "boa_offset_since": "2022-01-25",  # First acquisitions processed with baseline 04.00
+        "max_cloud_cover": 40,  # Skip local scenes with higher scene cloud cover (%)
+        "composite_tile_size": 512,  # Tile edge (pixels) for streaming temporal composites
+        "composite_workers": int(os.getenv("NDVI_COMPOSITE_WORKERS", 0)),  # 0 = one per CPU
+        # Raster output (save_ndvi_array): Cloud-Optimized GeoTIFF settings
+        "output": {
+            "cog": True,
+            "compress": os.getenv("NDVI_OUTPUT_COMPRESS", "deflate"),  # deflate | zstd
+            "quantize": os.getenv("NDVI_OUTPUT_QUANTIZE", "false").lower() == "true",  # int16 + scale
+            "blocksize": 512,
+            "overview_resampling": "average",
+        },
     },
     "rainfall": {
         "primary_source": "chirps",  # CHIRPS as primary, NASA POWER as backup
@@ -241,8 +333,8 @@ FEATURE_CONFIG = {
         "time_window_years": 10,
     },
     "elevation": {
-        "source": "water_towers_geojson",  # From GeoJSON properties
-        "fallback_source": "soilgrids",  # Optional: sample DEM if not in GeoJSON
+        "source": "dem",  # Local DEM GeoTIFF (DATA_SOURCES["dem"])
+        "fallback_source": "water_towers_geojson",  # GeoJSON properties if no DEM
     },
     "spatial_aggregation": {
         "method": "buffer",
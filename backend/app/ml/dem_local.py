@@ -0,0 +1,148 @@
+"""
+Local DEM Elevation Sampler
+
+Samples elevation from a local SRTM / Copernicus GLO-30 GeoTIFF (ideally a
+tiled Cloud-Optimized mosaic clipped to Kenya). The raster stays on disk:
+GDAL pages in only the tiles a query touches and keeps them in its block
+cache, so repeated lookups around the same towers are served from memory.
+
+Point lookups are vectorised (one coordinate transform and one bounding
+window read for many sites); polygon lookups read only each polygon's
+bounding window and return mean/min/max over the pixels inside it.
+"""
+
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+try:
+    import rasterio
+    RASTERIO_AVAILABLE = True
+except ImportError:
+    RASTERIO_AVAILABLE = False
+from shapely.geometry import shape
+
+from .config import DATA_SOURCES
+from .raster_sampling import pixel_indices, polygon_window, read_pixels, read_window
+from .utils import setup_logger
+
+logger = setup_logger(__name__)
+
+
+# ============================================================================
+# SAMPLER
+# ============================================================================
+
+class DEMSampler:
+    """
+    Open DEM raster answering point and polygon elevation queries (metres).
+
+    Values outside the raster or on nodata yield None. Rasterio handles are
+    not thread-safe; reads are serialised by a lock.
+    """
+
+    def __init__(self, path: Path):
+        if not RASTERIO_AVAILABLE:
+            raise ImportError("rasterio is required for the local DEM sampler")
+        self.path = Path(path)
+        if not self.path.exists():
+            raise FileNotFoundError(f"DEM not found: {self.path}")
+        self.src = rasterio.open(self.path)
+        self._lock = threading.Lock()
+        logger.info(f"Opened DEM {self.path} ({self.src.width}x{self.src.height}, {self.src.crs})")
+
+    def sample_points(self, points: Sequence[Tuple[float, float]]) -> List[Optional[float]]:
+        """
+        Elevation at many (lat, lon) points in one pass.
+
+        Returns:
+            One elevation (or None if off-raster/nodata) per point
+        """
+        if not points:
+            return []
+        lats = np.asarray([p[0] for p in points], dtype=float)
+        lons = np.asarray([p[1] for p in points], dtype=float)
+        with self._lock:
+            rows, cols, inside = pixel_indices(self.src, lats, lons)
+            values = read_pixels(self.src, rows, cols, inside)
+        return [float(v) if np.isfinite(v) else None for v in values]
+
+    def elevation_at(self, lat: float, lon: float) -> Optional[float]:
+        """Elevation at one point, or None if off-raster."""
+        return self.sample_points([(lat, lon)])[0]
+
+    def polygon_stats(self, geometry: Union[Dict[str, Any], Any]) -> Optional[Dict[str, Any]]:
+        """
+        Elevation statistics over a polygon (GeoJSON dict or shapely geometry).
+
+        Pixels whose centres fall inside the polygon are summarised; polygons
+        smaller than a pixel use the pixel under their centroid.
+
+        Returns:
+            Dict with mean, min, max and pixel_count, or None if off-raster
+        """
+        geom = shape(geometry) if isinstance(geometry, dict) else geometry
+        with self._lock:
+            window_mask = polygon_window(self.src, geom)
+            data = np.empty(0)
+            if window_mask is not None:
+                window, mask = window_mask
+                data = read_window(self.src, window)[mask]
+                data = data[np.isfinite(data)]
+
+        if data.size == 0:
+            centroid = geom.centroid
+            value = self.elevation_at(centroid.y, centroid.x)
+            if value is None:
+                return None
+            return {"mean": value, "min": value, "max": value, "pixel_count": 1}
+
+        return {
+            "mean": float(data.mean()),
+            "min": float(data.min()),
+            "max": float(data.max()),
+            "pixel_count": int(data.size),
+        }
+
+    def polygon_stats_many(self, geometries: Sequence[Union[Dict[str, Any], Any]]) -> List[Optional[Dict[str, Any]]]:
+        """Elevation statistics for many polygons (one windowed read each)."""
+        return [self.polygon_stats(geometry) for geometry in geometries]
+
+    def close(self) -> None:
+        self.src.close()
+
+
+# ============================================================================
+# SHARED INSTANCE
+# ============================================================================
+
+_samplers: Dict[Path, Optional[DEMSampler]] = {}
+_samplers_lock = threading.Lock()
+
+
+def get_dem_sampler(path: Path = None) -> Optional[DEMSampler]:
+    """
+    Return the process-wide DEMSampler for a GeoTIFF, opening it on first use.
+
+    Args:
+        path: DEM GeoTIFF (default: DATA_SOURCES["dem"])
+
+    Returns:
+        DEMSampler, or None if rasterio is unavailable or the file is missing
+    """
+    path = Path(path or DATA_SOURCES["dem"]["path"])
+    with _samplers_lock:
+        if path not in _samplers:
+            sampler = None
+            if not RASTERIO_AVAILABLE:
+                logger.debug("rasterio not installed; local DEM sampler disabled")
+            elif path.exists():
+                try:
+                    sampler = DEMSampler(path)
+                except Exception as e:
+                    logger.warning(f"Could not open DEM {path}: {e}")
+            else:
+                logger.debug(f"No local DEM at {path}")
+            _samplers[path] = sampler
+        return _samplers[path]
@@ -0,0 +1,99 @@
+"""
+Earth Engine Executor
+
+The Earth Engine client is synchronous: every getInfo() is a blocking HTTP
+call that can take seconds. Awaiting it directly stalls the event loop, and
+handing it to the default thread pool lets a burst of NDVI work crowd out
+the other offloaded I/O (local rasters, Mongo) and exceed the project's
+concurrent-request quota.
+
+All Earth Engine work therefore runs on one dedicated thread pool whose size
+is the quota (REQUEST_CONFIG["earth_engine"]["max_concurrent_requests"]);
+further calls queue for a free worker. run_ee() awaits a call under a
+deadline, so callers are never held longer than that. A call that times out
+keeps its worker until the Earth Engine request itself ends, which keeps the
+in-flight count within the quota.
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from .config import REQUEST_CONFIG
+from .utils import setup_logger
+
+logger = setup_logger(__name__)
+
+EE_CONFIG = REQUEST_CONFIG["earth_engine"]
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_counters = {"submitted": 0, "in_flight": 0, "timeouts": 0}
+_counters_lock = threading.Lock()
+
+
+def get_ee_executor() -> ThreadPoolExecutor:
+    """Return the process-wide Earth Engine thread pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = max(1, EE_CONFIG["max_concurrent_requests"])
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="earth-engine")
+            logger.info(f"Earth Engine executor started with {workers} worker(s)")
+        return _executor
+
+
+def shutdown_ee_executor() -> None:
+    """Stop accepting Earth Engine work (called at application shutdown)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _tracked(func: Callable[[], Any]) -> Any:
+    with _counters_lock:
+        _counters["in_flight"] += 1
+    try:
+        return func()
+    finally:
+        with _counters_lock:
+            _counters["in_flight"] -= 1
+
+
+async def run_ee(func: Callable[..., Any], *args: Any, deadline: Optional[float] = None, **kwargs: Any) -> Any:
+    """
+    Run a blocking Earth Engine call on the dedicated pool.
+
+    Args:
+        func: Callable issuing Earth Engine requests
+        deadline: Seconds to wait, including time queued for a worker
+                  (default: REQUEST_CONFIG["earth_engine"]["deadline_seconds"])
+
+    Returns:
+        The callable's result
+
+    Raises:
+        asyncio.TimeoutError: If the deadline passes first
+    """
+    deadline = EE_CONFIG["deadline_seconds"] if deadline is None else deadline
+    loop = asyncio.get_running_loop()
+    with _counters_lock:
+        _counters["submitted"] += 1
+    future = loop.run_in_executor(get_ee_executor(), _tracked, functools.partial(func, *args, **kwargs))
+    try:
+        return await asyncio.wait_for(future, timeout=deadline)
+    except asyncio.TimeoutError:
+        with _counters_lock:
+            _counters["timeouts"] += 1
+        logger.warning(f"Earth Engine call {getattr(func, '__name__', func)} exceeded {deadline}s deadline")
+        raise
+
+
+def get_ee_executor_stats() -> Dict[str, int]:
+    """Submitted, in-flight and timed-out Earth Engine calls plus the worker cap."""
+    with _counters_lock:
+        return {**_counters, "max_concurrent_requests": EE_CONFIG["max_concurrent_requests"]}
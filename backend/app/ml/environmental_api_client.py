@@ -7,107 +7,37 @@ Provides clients for fetching climate, rainfall, and soil data from:
 - Open-Meteo: Weather backup (free, open-access)
 - SoilGrids: Soil properties (optional, TIER 2)
 
-All clients support caching, retry logic, and graceful error handling.
+All clients support tiered caching (see cache.py), retry logic, per-host circuit
+breakers (see circuit_breaker.py), and graceful error handling.
+Async clients serve stale cache entries immediately and refresh them in the
+background (stale-while-revalidate) until the entry's hard TTL.
+Async variants (AsyncCHIRPSClient, AsyncNASAPOWERClient, AsyncSoilGridsClient)
+share one httpx.AsyncClient so provider latency never blocks the event loop.
 """
 
+import asyncio
 import os
 import json
 from pathlib import Path
-from typing import Optional, Dict, Tuple, Any
+from typing import Optional, Dict, Tuple, Any, Awaitable, Callable
 from datetime import datetime, timedelta
 import logging
 import time
 
+import httpx
 import requests
 import numpy as np
 
-from .config import API_ENDPOINTS, REQUEST_CONFIG, CACHE_CONFIG, get_config
+from .cache import CacheManager, inflight
+from .chirps_local import get_chirps_cube
+from .soilgrids_local import depth_mean, get_soilgrids_store, soil_means_to_properties
+from .circuit_breaker import get_circuit_breaker
+from .config import API_ENDPOINTS, REQUEST_CONFIG, get_config
+from .rate_limit import get_rate_limiter
 from .utils import setup_logger
 
 logger = setup_logger(__name__)
 
-# ============================================================================
-# CACHE MANAGER
-# ============================================================================
-
-class CacheManager:
-    """Simple file-based cache for API responses."""
-    
-    def __init__(self, cache_dir: Path = None, ttl_hours: int = 24):
-        """
-        Initialize cache manager.
-        
-        Args:
-            cache_dir: Directory for cache files (default: config)
-            ttl_hours: Time-to-live for cached items in hours
-        """
-        self.cache_dir = cache_dir or Path(get_config()["cache"]["directory"])
-        self.ttl_hours = ttl_hours
-        self.cache_dir.mkdir(parents=True, exist_ok=True)
-    
-    def _get_cache_path(self, key: str) -> Path:
-        """Get cache file path for key."""
-        return self.cache_dir / f"{key}.json"
-    
-    def get(self, key: str) -> Optional[Dict[str, Any]]:
-        """
-        Get value from cache if not expired.
-        
-        Args:
-            key: Cache key
-        
-        Returns:
-            Cached data or None if not found or expired
-        """
-        if not CACHE_CONFIG["enabled"]:
-            return None
-        
-        cache_path = self._get_cache_path(key)
-        if not cache_path.exists():
-            return None
-        
-        try:
-            with open(cache_path, "r") as f:
-                cache_data = json.load(f)
-            
-            timestamp = cache_data.get("timestamp")
-            if timestamp:
-                cache_age = datetime.now() - datetime.fromisoformat(timestamp)
-                if cache_age > timedelta(hours=self.ttl_hours):
-                    logger.debug(f"Cache expired for key: {key}")
-                    return None
-            
-            logger.debug(f"Cache hit for key: {key}")
-            return cache_data.get("data")
-        
-        except Exception as e:
-            logger.warning(f"Failed to read cache for {key}: {e}")
-            return None
-    
-    def set(self, key: str, value: Dict[str, Any]) -> None:
-        """
-        Store value in cache.
-        
-        Args:
-            key: Cache key
-            value: Data to cache
-        """
-        if not CACHE_CONFIG["enabled"]:
-            return
-        
-        try:
-            cache_path = self._get_cache_path(key)
-            cache_data = {
-                "timestamp": datetime.now().isoformat(),
-                "data": value
-            }
-            with open(cache_path, "w") as f:
-                json.dump(cache_data, f)
-            logger.debug(f"Cached data for key: {key}")
-        except Exception as e:
-            logger.warning(f"Failed to write cache for {key}: {e}")
-
-
 # ============================================================================
 # HTTP CLIENT WITH RETRY LOGIC
 # ============================================================================
@@ -138,11 +68,15 @@ class HTTPClient:
             **kwargs: Additional arguments to requests.get()
         
         Returns:
-            JSON response or None if request fails
+            JSON response or None if request fails or the host's circuit is open
         """
+        breaker = get_circuit_breaker(url)
         delay = self.retry_delay
         
         for attempt in range(self.retry_attempts):
+            if not breaker.allow():
+                logger.debug(f"Circuit open for {breaker.name}; skipping {url}")
+                return None
             try:
                 logger.debug(f"GET {url} (attempt {attempt + 1}/{self.retry_attempts})")
                 response = requests.get(
@@ -153,30 +87,167 @@ class HTTPClient:
                     **kwargs
                 )
                 response.raise_for_status()
-                return response.json() if response.text else {}
+                data = response.json() if response.text else {}
+                breaker.record_success()
+                return data
             
             except requests.exceptions.Timeout:
                 logger.warning(f"Request timeout: {url}")
-                if attempt < self.retry_attempts - 1:
+                breaker.record_failure()
+                if attempt < self.retry_attempts - 1 and not breaker.is_open:
                     time.sleep(delay)
                     delay *= self.backoff_multiplier
             
             except requests.exceptions.ConnectionError as e:
                 logger.warning(f"Connection error: {e}")
-                if attempt < self.retry_attempts - 1:
+                breaker.record_failure()
+                if attempt < self.retry_attempts - 1 and not breaker.is_open:
                     time.sleep(delay)
                     delay *= self.backoff_multiplier
             
             except requests.exceptions.HTTPError as e:
-                if response.status_code == 429:  # Rate limited
+                if response.status_code == 429:  # Rate limited; says nothing about host health
+                    breaker.record_neutral()
                     logger.warning(f"Rate limited. Waiting {delay} seconds...")
                     time.sleep(delay)
                     delay *= self.backoff_multiplier
+                elif response.status_code >= 500:
+                    breaker.record_failure()
+                    logger.error(f"HTTP error {response.status_code}: {e}")
+                    return None
                 else:
+                    breaker.record_success()
                     logger.error(f"HTTP error {response.status_code}: {e}")
                     return None
             
             except Exception as e:
+                breaker.record_neutral()
+                logger.error(f"Request failed: {e}")
+                return None
+        
+        logger.error(f"Failed after {self.retry_attempts} attempts: {url}")
+        return None
+
+
+# ============================================================================
+# ASYNC HTTP CLIENT (SHARED httpx.AsyncClient)
+# ============================================================================
+
+_async_client: Optional[httpx.AsyncClient] = None
+_async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Return the process-wide httpx.AsyncClient, creating it on first use.
+
+    Connections are bound to the event loop that opened them, so a new client
+    is created if the running loop has changed (e.g. between asyncio.run calls).
+    """
+    global _async_client, _async_client_loop
+
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client.is_closed or _async_client_loop is not loop:
+        _async_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(REQUEST_CONFIG["timeout_seconds"]),
+            verify=REQUEST_CONFIG["ssl_verify"],
+            follow_redirects=True,
+        )
+        _async_client_loop = loop
+    return _async_client
+
+
+async def close_async_http_client() -> None:
+    """Close the shared httpx.AsyncClient (called on application shutdown)."""
+    global _async_client, _async_client_loop
+
+    if _async_client is not None and not _async_client.is_closed:
+        await _async_client.aclose()
+    _async_client = None
+    _async_client_loop = None
+
+
+class AsyncHTTPClient(HTTPClient):
+    """Non-blocking HTTP client with the same retry/backoff policy as HTTPClient."""
+
+    def __init__(self, timeout_seconds: int = None, retry_attempts: int = None, provider: str = None):
+        """
+        Initialize async HTTP client.
+        
+        Args:
+            timeout_seconds: Request timeout (default: from config)
+            retry_attempts: Number of retry attempts (default: from config)
+            provider: API_ENDPOINTS key whose documented rate limit is enforced
+        """
+        super().__init__(timeout_seconds=timeout_seconds, retry_attempts=retry_attempts)
+        self.rate_limiter = get_rate_limiter(provider) if provider else None
+
+    async def get(self, url: str, params: Dict[str, Any] = None, **kwargs) -> Optional[Dict]:
+        """
+        Perform GET request with retry logic, backing off with asyncio.sleep.
+        
+        Args:
+            url: Request URL
+            params: Query parameters
+            **kwargs: Additional arguments to httpx.AsyncClient.get()
+        
+        Returns:
+            JSON response or None if request fails or the host's circuit is open
+        """
+        client = get_async_http_client()
+        breaker = get_circuit_breaker(url)
+        delay = self.retry_delay
+        
+        for attempt in range(self.retry_attempts):
+            if not breaker.allow():
+                logger.debug(f"Circuit open for {breaker.name}; skipping {url}")
+                return None
+            try:
+                if self.rate_limiter is not None:
+                    await self.rate_limiter.acquire()
+                logger.debug(f"GET {url} (attempt {attempt + 1}/{self.retry_attempts})")
+                response = await client.get(
+                    url,
+                    params=params,
+                    timeout=self.timeout,
+                    **kwargs
+                )
+                response.raise_for_status()
+                data = response.json() if response.text else {}
+                breaker.record_success()
+                return data
+            
+            except httpx.TimeoutException:
+                logger.warning(f"Request timeout: {url}")
+                breaker.record_failure()
+                if attempt < self.retry_attempts - 1 and not breaker.is_open:
+                    await asyncio.sleep(delay)
+                    delay *= self.backoff_multiplier
+            
+            except httpx.TransportError as e:
+                logger.warning(f"Connection error: {e}")
+                breaker.record_failure()
+                if attempt < self.retry_attempts - 1 and not breaker.is_open:
+                    await asyncio.sleep(delay)
+                    delay *= self.backoff_multiplier
+            
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code == 429:  # Rate limited; says nothing about host health
+                    breaker.record_neutral()
+                    logger.warning(f"Rate limited. Waiting {delay} seconds...")
+                    await asyncio.sleep(delay)
+                    delay *= self.backoff_multiplier
+                elif e.response.status_code >= 500:
+                    breaker.record_failure()
+                    logger.error(f"HTTP error {e.response.status_code}: {e}")
+                    return None
+                else:
+                    breaker.record_success()
+                    logger.error(f"HTTP error {e.response.status_code}: {e}")
+                    return None
+            
+            except Exception as e:
+                breaker.record_neutral()
                 logger.error(f"Request failed: {e}")
                 return None
         
@@ -184,52 +255,126 @@ class HTTPClient:
         return None
 
 
+def snap_to_grid(lat: float, lon: float, grid: Optional[Dict[str, float]]) -> Tuple[float, float]:
+    """
+    Snap a coordinate to the centre of its provider grid cell.
+
+    Every point inside one native cell gets the same upstream answer, so
+    snapping lets all sites in that cell share one fetch and one cache entry.
+
+    Args:
+        lat: Latitude (WGS84)
+        lon: Longitude (WGS84)
+        grid: Provider grid spec (lat_step, lon_step, lat_offset, lon_offset);
+              None leaves the coordinate unchanged
+
+    Returns:
+        (lat, lon) of the cell centre
+    """
+    if not grid:
+        return lat, lon
+
+    def _snap(value: float, step: float, offset: float) -> float:
+        return round(offset + round((value - offset) / step) * step, 6)
+
+    return (
+        _snap(lat, grid["lat_step"], grid.get("lat_offset", 0.0)),
+        _snap(lon, grid["lon_step"], grid.get("lon_offset", 0.0)),
+    )
+
+
+async def _cached_or_refresh(
+    cache: CacheManager,
+    cache_key: str,
+    fetch: Callable[[], Awaitable[Any]],
+    refresh_within_hours: float = 0.0
+) -> Optional[Dict[str, Any]]:
+    """
+    Return a usable cached entry, refreshing it in the background if stale.
+
+    Entries past the soft TTL are served as-is while `fetch` renews them
+    (stale-while-revalidate). When renewing ahead of expiry
+    (refresh_within_hours > 0) a stale entry counts as a miss so the caller
+    fetches synchronously.
+    """
+    cached, stale = await cache.alookup(cache_key, refresh_within_hours)
+    if cached is None:
+        return None
+    if stale:
+        if refresh_within_hours:
+            return None
+        inflight.refresh(cache_key, fetch)
+    return cached
+
+
+def _annual_mean(param: Any) -> Optional[float]:
+    """Annual value of a NASA POWER climatology parameter ("ANN" or mean of months)."""
+    if not isinstance(param, dict):
+        return None
+    if param.get("ANN") is not None:
+        return float(param["ANN"])
+    numeric = [v for v in param.values() if isinstance(v, (int, float))]
+    if not numeric:
+        return None
+    return float(sum(numeric) / len(numeric))
+
+
 # ============================================================================
 # CHIRPS CLIENT
 # ============================================================================
 
 class CHIRPSClient:
-    """Client for CHIRPS rainfall data via OGC WCS."""
+    """
+    Client for CHIRPS rainfall data.
+
+    Reads the local CHIRPS NetCDF archive (see chirps_local.py) when present.
+    Otherwise rainfall comes from the shared NASA POWER climatology record
+    until the CHIRPS WCS is wired up; a short timeout and single attempt keep
+    that fallback light.
+    """
     
+    POWER_TIMEOUT_SECONDS = 15
+
     def __init__(self):
         """Initialize CHIRPS client."""
         self.config = API_ENDPOINTS["chirps"]
         self.http = HTTPClient()
         self.cache = CacheManager(ttl_hours=self.config.get("cache_ttl_hours", 24))
+        self.power = NASAPOWERClient(
+            http=HTTPClient(timeout_seconds=self.POWER_TIMEOUT_SECONDS, retry_attempts=1)
+        )
+
+    def _snap(self, lat: float, lon: float) -> Tuple[float, float]:
+        """Snap a lookup to this provider's native grid cell centre."""
+        return snap_to_grid(lat, lon, self.config.get("grid"))
+
+    def _cache_key(self, lat: float, lon: float, year: int = None) -> str:
+        """Cache (and in-flight coalescing) key for a rainfall lookup."""
+        return f"chirps_{lat:.4f}_{lon:.4f}_{year or 'clim'}"
+
+    @staticmethod
+    def _local_rainfall_mm(lat: float, lon: float, year: int = None) -> Optional[float]:
+        """Annual (or mean annual) rainfall from the local CHIRPS archive, if any."""
+        cube = get_chirps_cube()
+        if cube is None:
+            return None
+        try:
+            return cube.annual_rainfall(lat, lon, year)
+        except Exception as e:
+            logger.warning(f"Local CHIRPS lookup failed for ({lat}, {lon}): {e}")
+            return None
 
     def _nasa_power_rainfall_mm(self, lat: float, lon: float) -> Optional[float]:
         """
-        Lightweight NASA POWER fetch for rainfall (mm/year) to avoid the CHIRPS placeholder.
-        Uses a direct request instead of the heavier client to reduce failures/timeouts.
+        Rainfall (mm/year) from the combined NASA POWER climatology record,
+        used in place of the CHIRPS placeholder. Shares the record (and its
+        cache entry) with temperature lookups for the same POWER cell.
         """
-        try:
-            url = "https://power.larc.nasa.gov/api/temporal/climatology/point"
-            params = {
-                "parameters": "PRECTOTCORR",
-                "latitude": lat,
-                "longitude": lon,
-                "format": "json",
-                "community": "AG",
-                "start": 1981,
-                "end": 2010,
-            }
-            resp = requests.get(url, params=params, timeout=15)
-            resp.raise_for_status()
-            payload = resp.json()
-            rainfall_param = (payload.get("properties", {}).get("parameter", {}) or {}).get("PRECTOTCORR", {})
-            rainfall_mm_day = None
-            if isinstance(rainfall_param, dict):
-                rainfall_mm_day = rainfall_param.get("ANN")
-                if rainfall_mm_day is None:
-                    numeric = [v for v in rainfall_param.values() if isinstance(v, (int, float))]
-                    if numeric:
-                        rainfall_mm_day = sum(numeric) / len(numeric)
-            if rainfall_mm_day is None:
-                return None
-            return float(rainfall_mm_day) * 365.0
-        except Exception as e:
-            logger.warning(f"NASA POWER rainfall fetch failed for ({lat}, {lon}): {e}")
+        climatology = self.power.get_climatology(lat, lon)
+        if not climatology:
+            logger.warning(f"NASA POWER rainfall fetch failed for ({lat}, {lon})")
             return None
+        return climatology.get("rainfall_mm")
     
     def get_rainfall_for_location(
         self,
@@ -240,7 +385,8 @@ class CHIRPSClient:
         """
         Get annual or climatological rainfall for a location.
         
-        Uses CHIRPS v2 monthly data. Returns mean annual rainfall (climatology).
+        Uses the local CHIRPS v2 archive when available, else NASA POWER.
+        Returns mean annual rainfall (climatology) unless a year is given.
         
         Args:
             lat: Latitude (WGS84)
@@ -250,7 +396,8 @@ class CHIRPSClient:
         Returns:
             Mean annual rainfall in mm, or None if request fails
         """
-        cache_key = f"chirps_{lat:.4f}_{lon:.4f}_{year or 'clim'}"
+        lat, lon = self._snap(lat, lon)
+        cache_key = self._cache_key(lat, lon, year)
         
         # Check cache
         if cached := self.cache.get(cache_key):
@@ -259,6 +406,11 @@ class CHIRPSClient:
         try:
             logger.debug(f"Fetching CHIRPS rainfall for ({lat}, {lon})")
 
+            rainfall_mm = self._local_rainfall_mm(lat, lon, year)
+            if rainfall_mm is not None:
+                self.cache.set(cache_key, {"rainfall_mm": rainfall_mm})
+                return rainfall_mm
+
             # Full CHIRPS WCS implementation is pending; use NASA POWER rainfall via direct fetch
             # so each location gets a distinct value instead of the placeholder.
             rainfall_mm = self._nasa_power_rainfall_mm(lat, lon)
@@ -272,13 +424,9 @@ class CHIRPSClient:
                 self.cache.set(cache_key, {"rainfall_mm": rainfall_mm})
                 return rainfall_mm
 
-            # Last resort: load a static fixture/default
-            result = self._load_fixture()
-            if result is not None:
-                self.cache.set(cache_key, {"rainfall_mm": result})
-                return result
-
-            return None
+            # Last resort: a static fixture/default, never cached so the next
+            # request retries the real sources instead of serving the placeholder
+            return self._load_fixture()
         
         except Exception as e:
             logger.error(f"CHIRPS fetch failed: {e}")
@@ -301,17 +449,110 @@ class CHIRPSClient:
         return 120.0
 
 
+class AsyncCHIRPSClient(CHIRPSClient):
+    """Non-blocking CHIRPS client; shares cache, fixtures and parsing with CHIRPSClient."""
+
+    def __init__(self):
+        """Initialize async CHIRPS client."""
+        super().__init__()
+        self.http = AsyncHTTPClient(provider="chirps")
+        self.power = AsyncNASAPOWERClient(
+            http=AsyncHTTPClient(
+                timeout_seconds=self.POWER_TIMEOUT_SECONDS,
+                retry_attempts=1,
+                provider="nasa_power",
+            )
+        )
+
+    async def _nasa_power_rainfall_mm(self, lat: float, lon: float) -> Optional[float]:
+        """Async counterpart of CHIRPSClient._nasa_power_rainfall_mm."""
+        climatology = await self.power.get_climatology(lat, lon)
+        if not climatology:
+            logger.warning(f"NASA POWER rainfall fetch failed for ({lat}, {lon})")
+            return None
+        return climatology.get("rainfall_mm")
+
+    async def get_rainfall_for_location(
+        self,
+        lat: float,
+        lon: float,
+        year: int = None,
+        refresh_within_hours: float = 0.0
+    ) -> Optional[float]:
+        """
+        Async counterpart of CHIRPSClient.get_rainfall_for_location.
+
+        Concurrent misses for the same cache key share one upstream fetch;
+        stale entries are served while a background fetch renews them.
+        refresh_within_hours forces a refetch if the entry expires that soon.
+        """
+        lat, lon = self._snap(lat, lon)
+        cache_key = self._cache_key(lat, lon, year)
+        
+        fetch = lambda: self._fetch_rainfall(lat, lon, cache_key, year)
+        if cached := await _cached_or_refresh(self.cache, cache_key, fetch, refresh_within_hours):
+            return cached.get("rainfall_mm")
+        
+        return await inflight.do(cache_key, fetch)
+
+    async def _fetch_rainfall(
+        self,
+        lat: float,
+        lon: float,
+        cache_key: str,
+        year: int = None
+    ) -> Optional[float]:
+        """Read the local archive or fetch rainfall upstream, then cache; fall back to the fixture uncached."""
+        try:
+            logger.debug(f"Fetching CHIRPS rainfall for ({lat}, {lon})")
+
+            rainfall_mm = await asyncio.to_thread(self._local_rainfall_mm, lat, lon, year)
+            if rainfall_mm is not None:
+                await self.cache.aset(cache_key, {"rainfall_mm": rainfall_mm})
+                return rainfall_mm
+
+            rainfall_mm = await self._nasa_power_rainfall_mm(lat, lon)
+            if rainfall_mm is not None:
+                logger.info(
+                    "Using NASA POWER rainfall fallback for (%s, %s): %.1f mm",
+                    lat,
+                    lon,
+                    rainfall_mm,
+                )
+                await self.cache.aset(cache_key, {"rainfall_mm": rainfall_mm})
+                return rainfall_mm
+
+            # Fixture value is not cached (see CHIRPSClient.get_rainfall_for_location)
+            return self._load_fixture()
+        
+        except Exception as e:
+            logger.error(f"CHIRPS fetch failed: {e}")
+            return None
+
+
 # ============================================================================
 # NASA POWER CLIENT
 # ============================================================================
 
 class NASAPOWERClient:
-    """Client for NASA POWER climate data API."""
+    """
+    Client for NASA POWER climate data API.
+
+    Temperature, rainfall and radiation climatologies for a location come from
+    one multi-parameter request and are cached as a single record.
+    """
+
+    CLIMATOLOGY_PARAMETERS = "T2M,T2M_MIN,T2M_MAX,PRECTOTCORR,ALLSKY_SFC_SW_DWN"
     
-    def __init__(self):
-        """Initialize NASA POWER client."""
+    def __init__(self, http: HTTPClient = None):
+        """
+        Initialize NASA POWER client.
+
+        Args:
+            http: HTTP client to use (default: HTTPClient with config retries)
+        """
         self.config = API_ENDPOINTS["nasa_power"]
-        self.http = HTTPClient()
+        self.http = http or HTTPClient()
         self.cache = CacheManager(ttl_hours=self.config.get("cache_ttl_hours", 24))
         
         # Get API key from environment or config
@@ -325,77 +566,123 @@ class NASAPOWERClient:
         self.end_year = clim_defaults.get("end", 2010)
         self.response_format = clim_defaults.get("format", "json")
 
-    def get_temperature_climatology(
+    def _snap(self, lat: float, lon: float) -> Tuple[float, float]:
+        """Snap a lookup to this provider's native grid cell centre."""
+        return snap_to_grid(lat, lon, self.config.get("grid"))
+
+    def _cache_key(self, kind: str, lat: float, lon: float) -> str:
+        """Cache (and in-flight coalescing) key for a climatology lookup."""
+        return f"nasa_power_{kind}_{lat:.4f}_{lon:.4f}"
+
+    def _climatology_request(
         self,
+        parameters: str,
         lat: float,
         lon: float
-    ) -> Optional[Tuple[float, float, float]]:
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Build URL and query parameters for a climatology point request."""
+        url = f"{self.config['base_url']}{self.config['endpoints']['climatology']}"
+        params = {
+            "parameters": parameters,
+            "latitude": lat,
+            "longitude": lon,
+            "format": self.response_format,
+            "community": self.community,
+            "start": self.start_year,
+            "end": self.end_year,
+            "api_key": self.api_key,
+        }
+        return url, params
+
+    @staticmethod
+    def _parse_climatology(response: Dict[str, Any]) -> Dict[str, Optional[float]]:
         """
-        Get temperature climatology (mean, min, max) for a location.
+        Extract every climatology the app uses from one multi-parameter response.
+
+        Temperatures fall back to Kenya defaults; rainfall (mm/year, from
+        PRECTOTCORR mm/day) and solar radiation (kWh/m²/day) are None if absent.
+        """
+        parameters = response.get("properties", {}).get("parameter", {}) or {}
+        rainfall_mm_day = _annual_mean(parameters.get("PRECTOTCORR", {}))
+        return {
+            "mean_c": _annual_mean(parameters.get("T2M")) or 20.0,
+            "min_c": _annual_mean(parameters.get("T2M_MIN")) or 15.0,
+            "max_c": _annual_mean(parameters.get("T2M_MAX")) or 25.0,
+            "rainfall_mm": rainfall_mm_day * 365 if rainfall_mm_day is not None else None,
+            "solar_radiation": _annual_mean(parameters.get("ALLSKY_SFC_SW_DWN")),
+        }
+
+    @staticmethod
+    def _temperature_tuple(climatology: Dict[str, Any]) -> Tuple[float, float, float]:
+        return (
+            climatology.get("mean_c"),
+            climatology.get("min_c"),
+            climatology.get("max_c")
+        )
+
+    @staticmethod
+    def _rainfall_mm(climatology: Dict[str, Any]) -> float:
+        rainfall_mm = climatology.get("rainfall_mm")
+        if rainfall_mm is None:
+            rainfall_mm = 0.33 * 365  # ~120 mm/year fallback
+        return rainfall_mm
+
+    def get_climatology(self, lat: float, lon: float) -> Optional[Dict[str, Optional[float]]]:
+        """
+        Get the combined climatology record for a location in one request.
         
         Args:
             lat: Latitude (WGS84)
             lon: Longitude (WGS84)
         
         Returns:
-            Tuple of (mean_temp_c, min_temp_c, max_temp_c) or None
+            Dict with mean_c, min_c, max_c, rainfall_mm, solar_radiation,
+            or None if the request fails
         """
-        cache_key = f"nasa_power_temp_{lat:.4f}_{lon:.4f}"
+        lat, lon = self._snap(lat, lon)
+        cache_key = self._cache_key("clim", lat, lon)
         
         # Check cache
         if cached := self.cache.get(cache_key):
-            return (
-                cached.get("mean_c"),
-                cached.get("min_c"),
-                cached.get("max_c")
-            )
+            return cached
         
         try:
-            logger.debug(f"Fetching NASA POWER temperature for ({lat}, {lon})")
+            logger.debug(f"Fetching NASA POWER climatology for ({lat}, {lon})")
             
-            url = f"{self.config['base_url']}{self.config['endpoints']['climatology']}"
-            params = {
-                "parameters": "T2M,T2M_MIN,T2M_MAX",
-                "latitude": lat,
-                "longitude": lon,
-                "format": self.response_format,
-                "community": self.community,
-                "start": self.start_year,
-                "end": self.end_year,
-                "api_key": self.api_key,
-            }
+            url, params = self._climatology_request(self.CLIMATOLOGY_PARAMETERS, lat, lon)
             
             response = self.http.get(url, params=params)
             if not response:
-                # Try fixture fallback
-                return self._load_temperature_fixture()
-            
-            # Parse response
-            properties = response.get("properties", {})
-            parameters = properties.get("parameter", {}) or {}
-
-            def _annual_mean(param: Dict[str, Any]) -> Optional[float]:
-                if not isinstance(param, dict):
-                    return None
-                if "ANN" in param:
-                    return float(param["ANN"])
-                numeric = [v for v in param.values() if isinstance(v, (int, float))]
-                if not numeric:
-                    return None
-                return float(sum(numeric) / len(numeric))
-
-            mean_c = _annual_mean(parameters.get("T2M")) or 20.0
-            min_c = _annual_mean(parameters.get("T2M_MIN")) or 15.0
-            max_c = _annual_mean(parameters.get("T2M_MAX")) or 25.0
+                return None
             
-            result = {"mean_c": mean_c, "min_c": min_c, "max_c": max_c}
+            result = self._parse_climatology(response)
             self.cache.set(cache_key, result)
-            
-            return (mean_c, min_c, max_c)
+            return result
         
         except Exception as e:
             logger.error(f"NASA POWER fetch failed: {e}")
+            return None
+
+    def get_temperature_climatology(
+        self,
+        lat: float,
+        lon: float
+    ) -> Optional[Tuple[float, float, float]]:
+        """
+        Get temperature climatology (mean, min, max) for a location.
+        
+        Args:
+            lat: Latitude (WGS84)
+            lon: Longitude (WGS84)
+        
+        Returns:
+            Tuple of (mean_temp_c, min_temp_c, max_temp_c) or None
+        """
+        climatology = self.get_climatology(lat, lon)
+        if not climatology:
+            # Try fixture fallback
             return self._load_temperature_fixture()
+        return self._temperature_tuple(climatology)
     
     def get_rainfall_climatology(
         self,
@@ -412,56 +699,10 @@ class NASAPOWERClient:
         Returns:
             Mean annual rainfall in mm, or None
         """
-        cache_key = f"nasa_power_precip_{lat:.4f}_{lon:.4f}"
-        
-        # Check cache
-        if cached := self.cache.get(cache_key):
-            return cached.get("rainfall_mm")
-        
-        try:
-            logger.debug(f"Fetching NASA POWER rainfall for ({lat}, {lon})")
-            
-            url = f"{self.config['base_url']}{self.config['endpoints']['climatology']}"
-            params = {
-                "parameters": "PRECTOTCORR",
-                "latitude": lat,
-                "longitude": lon,
-                "format": self.response_format,
-                "community": self.community,
-                "start": self.start_year,
-                "end": self.end_year,
-                "api_key": self.api_key,
-            }
-            
-            response = self.http.get(url, params=params)
-            if not response:
-                return self._load_rainfall_fixture()
-            
-            # Parse response (convert mm/day to annual)
-            properties = response.get("properties", {})
-            parameters = properties.get("parameter", {}) or {}
-
-            rainfall_param = parameters.get("PRECTOTCORR", {})
-            rainfall_mm_day = None
-            if isinstance(rainfall_param, dict):
-                rainfall_mm_day = rainfall_param.get("ANN")
-                if rainfall_mm_day is None:
-                    numeric = [v for v in rainfall_param.values() if isinstance(v, (int, float))]
-                    if numeric:
-                        rainfall_mm_day = sum(numeric) / len(numeric)
-
-            if rainfall_mm_day is None:
-                rainfall_mm_day = 0.33  # ~120 mm/year fallback
-            rainfall_mm_year = rainfall_mm_day * 365
-            
-            result = {"rainfall_mm": rainfall_mm_year}
-            self.cache.set(cache_key, result)
-            
-            return rainfall_mm_year
-        
-        except Exception as e:
-            logger.error(f"NASA POWER rainfall fetch failed: {e}")
+        climatology = self.get_climatology(lat, lon)
+        if not climatology:
             return self._load_rainfall_fixture()
+        return self._rainfall_mm(climatology)
     
     def _load_temperature_fixture(self) -> Optional[Tuple[float, float, float]]:
         """Load sample temperature from fixture file."""
@@ -501,6 +742,89 @@ class NASAPOWERClient:
         return 120.0
 
 
+class AsyncNASAPOWERClient(NASAPOWERClient):
+    """Non-blocking NASA POWER client; shares cache, fixtures and parsing with NASAPOWERClient."""
+
+    def __init__(self, http: AsyncHTTPClient = None):
+        """
+        Initialize async NASA POWER client.
+
+        Args:
+            http: Async HTTP client to use (default: rate-limited AsyncHTTPClient)
+        """
+        super().__init__(http=http or AsyncHTTPClient(provider="nasa_power"))
+
+    async def get_climatology(
+        self,
+        lat: float,
+        lon: float,
+        refresh_within_hours: float = 0.0
+    ) -> Optional[Dict[str, Optional[float]]]:
+        """
+        Async counterpart of NASAPOWERClient.get_climatology.
+
+        Concurrent misses for the same cache key share one upstream fetch;
+        stale entries are served while a background fetch renews them.
+        refresh_within_hours forces a refetch if the entry expires that soon.
+        """
+        lat, lon = self._snap(lat, lon)
+        cache_key = self._cache_key("clim", lat, lon)
+        
+        fetch = lambda: self._fetch_climatology(lat, lon, cache_key)
+        if cached := await _cached_or_refresh(self.cache, cache_key, fetch, refresh_within_hours):
+            return cached
+        
+        return await inflight.do(cache_key, fetch)
+
+    async def _fetch_climatology(
+        self,
+        lat: float,
+        lon: float,
+        cache_key: str
+    ) -> Optional[Dict[str, Optional[float]]]:
+        """Fetch the combined climatology upstream and populate the cache."""
+        try:
+            logger.debug(f"Fetching NASA POWER climatology for ({lat}, {lon})")
+            
+            url, params = self._climatology_request(self.CLIMATOLOGY_PARAMETERS, lat, lon)
+            
+            response = await self.http.get(url, params=params)
+            if not response:
+                return None
+            
+            result = self._parse_climatology(response)
+            await self.cache.aset(cache_key, result)
+            return result
+        
+        except Exception as e:
+            logger.error(f"NASA POWER fetch failed: {e}")
+            return None
+
+    async def get_temperature_climatology(
+        self,
+        lat: float,
+        lon: float,
+        refresh_within_hours: float = 0.0
+    ) -> Optional[Tuple[float, float, float]]:
+        """Async counterpart of NASAPOWERClient.get_temperature_climatology."""
+        climatology = await self.get_climatology(lat, lon, refresh_within_hours)
+        if not climatology:
+            return self._load_temperature_fixture()
+        return self._temperature_tuple(climatology)
+
+    async def get_rainfall_climatology(
+        self,
+        lat: float,
+        lon: float,
+        refresh_within_hours: float = 0.0
+    ) -> Optional[float]:
+        """Async counterpart of NASAPOWERClient.get_rainfall_climatology."""
+        climatology = await self.get_climatology(lat, lon, refresh_within_hours)
+        if not climatology:
+            return self._load_rainfall_fixture()
+        return self._rainfall_mm(climatology)
+
+
 # ============================================================================
 # OPEN-METEO CLIENT (BACKUP)
 # ============================================================================
@@ -561,13 +885,98 @@ class OpenMeteoClient:
 # ============================================================================
 
 class SoilGridsClient:
-    """Client for ISRIC SoilGrids soil properties (optional, TIER 2)."""
+    """
+    Client for ISRIC SoilGrids soil properties (optional, TIER 2).
+
+    Samples the local SoilGrids rasters (see soilgrids_local.py) when present
+    and only calls the REST API for sites they do not cover.
+    """
     
     def __init__(self):
         """Initialize SoilGrids client."""
         self.config = API_ENDPOINTS["soilgrids"]
         self.http = HTTPClient()
         self.cache = CacheManager(ttl_hours=self.config.get("cache_ttl_hours", 720))
+
+    def _snap(self, lat: float, lon: float) -> Tuple[float, float]:
+        """Snap a lookup to this provider's native grid cell centre."""
+        return snap_to_grid(lat, lon, self.config.get("grid"))
+
+    def _cache_key(self, lat: float, lon: float) -> str:
+        """Cache (and in-flight coalescing) key for a soil lookup."""
+        return f"soilgrids_{lat:.4f}_{lon:.4f}"
+
+    def _properties_request(self, lat: float, lon: float) -> Tuple[str, Dict[str, Any]]:
+        """Build URL and query parameters for a properties/query request."""
+        url = f"{self.config['base_url']}{self.config['endpoints']['properties']}"
+        params = {
+            "lon": lon,
+            "lat": lat,
+            "property": [
+                # Core hydrology/vegetation drivers
+                "phh2o",
+                "soc",
+                "sand",
+                "silt",
+                "clay",
+                # Keep bulk density for reference
+                "bdod",
+            ],
+            # Limit depths to top 30 cm for planting relevance
+            "depth": ["0-5cm", "5-15cm", "15-30cm"],
+        }
+        return url, params
+
+    @staticmethod
+    def _parse_properties(response: Dict[str, Any]) -> Dict[str, Optional[float]]:
+        """Convert a SoilGrids v2 properties/query response into TowerGuard units."""
+        # Debug: log the actual response structure
+        logger.debug(f"SoilGrids response structure: {list(response.keys()) if isinstance(response, dict) else type(response)}")
+        
+        def _mean_from_layers(values: list[dict[str, Any]]) -> Optional[float]:
+            # SoilGrids v2 structure: each depth has 'values' dict with 'mean' inside
+            return depth_mean(
+                v["values"].get("mean")
+                for v in values or []
+                if isinstance(v, dict) and isinstance(v.get("values"), dict)
+            )
+
+        properties = response.get("properties", {}) or {}
+        logger.debug(f"Properties keys: {list(properties.keys())}")
+        
+        # SoilGrids v2 API returns layers array, not direct property keys
+        layers = properties.get("layers", [])
+        logger.debug(f"Found {len(layers)} layers")
+        
+        # Build property dict from layers
+        prop_dict = {}
+        for layer in layers:
+            if isinstance(layer, dict):
+                prop_name = layer.get("name")
+                prop_depths = layer.get("depths", [])
+                if prop_name:
+                    prop_dict[prop_name] = prop_depths
+        
+        logger.debug(f"Property names found: {list(prop_dict.keys())}")
+        
+        # Depth-average each property, then convert SoilGrids units
+        means = {
+            name: _mean_from_layers(prop_dict.get(name, []))
+            for name in ("phh2o", "soc", "sand", "silt", "clay", "bdod")
+        }
+        return soil_means_to_properties(means)
+
+    @staticmethod
+    def _local_properties(lat: float, lon: float) -> Optional[Dict[str, Optional[float]]]:
+        """Soil properties from the local SoilGrids rasters, if present."""
+        store = get_soilgrids_store()
+        if store is None:
+            return None
+        try:
+            return store.properties_at(lat, lon)
+        except Exception as e:
+            logger.warning(f"Local SoilGrids lookup failed for ({lat}, {lon}): {e}")
+            return None
     
     def get_soil_properties(
         self,
@@ -584,7 +993,11 @@ class SoilGridsClient:
         Returns:
             Dict with soil properties or None
         """
-        cache_key = f"soilgrids_{lat:.4f}_{lon:.4f}"
+        if local := self._local_properties(lat, lon):
+            return local
+
+        lat, lon = self._snap(lat, lon)
+        cache_key = self._cache_key(lat, lon)
 
         if cached := self.cache.get(cache_key):
             return cached
@@ -592,101 +1005,16 @@ class SoilGridsClient:
         try:
             logger.debug(f"Fetching SoilGrids properties for ({lat}, {lon})")
 
-            url = f"{self.config['base_url']}{self.config['endpoints']['properties']}"
-            params = {
-                "lon": lon,
-                "lat": lat,
-                "property": [
-                    # Core hydrology/vegetation drivers
-                    "phh2o",
-                    "soc",
-                    "sand",
-                    "silt",
-                    "clay",
-                    # Keep bulk density for reference
-                    "bdod",
-                ],
-                # Limit depths to top 30 cm for planting relevance
-                "depth": ["0-5cm", "5-15cm", "15-30cm"],
-            }
+            url, params = self._properties_request(lat, lon)
 
             response = self.http.get(url, params=params)
             if not response:
                 logger.warning(f"SoilGrids returned empty response for ({lat}, {lon})")
                 return None
 
-            # Debug: log the actual response structure
-            logger.debug(f"SoilGrids response structure: {list(response.keys()) if isinstance(response, dict) else type(response)}")
-            
-            def _mean_from_layers(values: list[dict[str, Any]]) -> Optional[float]:
-                if not values:
-                    return None
-                # SoilGrids v2 structure: each depth has 'values' dict with 'mean' inside
-                collected = []
-                for v in values:
-                    if isinstance(v, dict):
-                        values_dict = v.get("values", {})
-                        if isinstance(values_dict, dict):
-                            mean_val = values_dict.get("mean")
-                            if mean_val is not None:
-                                collected.append(float(mean_val))
-                
-                if not collected:
-                    return None
-                return sum(collected) / len(collected)
-
-            properties = response.get("properties", {}) or {}
-            logger.debug(f"Properties keys: {list(properties.keys())}")
-            
-            # SoilGrids v2 API returns layers array, not direct property keys
-            layers = properties.get("layers", [])
-            logger.debug(f"Found {len(layers)} layers")
-            
-            # Build property dict from layers
-            prop_dict = {}
-            for layer in layers:
-                if isinstance(layer, dict):
-                    prop_name = layer.get("name")
-                    prop_depths = layer.get("depths", [])
-                    if prop_name:
-                        prop_dict[prop_name] = prop_depths
-            
-            logger.debug(f"Property names found: {list(prop_dict.keys())}")
-            
-            # Extract soil values with detailed logging
-            ph_raw = _mean_from_layers(prop_dict.get("phh2o", []))
-            soc = _mean_from_layers(prop_dict.get("soc", []))
-            sand = _mean_from_layers(prop_dict.get("sand", []))
-            silt = _mean_from_layers(prop_dict.get("silt", []))
-            clay = _mean_from_layers(prop_dict.get("clay", []))
-            bulk_density = _mean_from_layers(prop_dict.get("bdod", []))
-
-            # SoilGrids returns values in specific units:
-            # - sand, clay, silt: g/kg (need to divide by 10 for percentage)
-            # - pH: pH*10 (need to divide by 10 for actual pH)
-            # - SOC: dg/kg (decigrams per kilogram)
-            # - bulk density: cg/cm³ (centigrams per cubic centimeter)
-            
-            ph = (ph_raw / 10) if ph_raw is not None else 6.0
-            
-            # Convert g/kg to percentage
-            if sand is not None:
-                sand = sand / 10
-            if silt is not None:
-                silt = silt / 10
-            if clay is not None:
-                clay = clay / 10
-
-            result = {
-                "ph": ph,
-                "soc": soc,
-                "sand": sand,
-                "silt": silt,
-                "clay": clay,
-                "bulk_density": bulk_density,
-            }
+            result = self._parse_properties(response)
 
-            logger.info(f"SoilGrids data fetched for ({lat}, {lon}): sand={sand}, clay={clay}, silt={silt}")
+            logger.info(f"SoilGrids data fetched for ({lat}, {lon}): sand={result['sand']}, clay={result['clay']}, silt={result['silt']}")
             self.cache.set(cache_key, result)
             return result
 
@@ -695,6 +1023,62 @@ class SoilGridsClient:
             return None
 
 
+class AsyncSoilGridsClient(SoilGridsClient):
+    """Non-blocking SoilGrids client; shares cache and parsing with SoilGridsClient."""
+
+    def __init__(self):
+        """Initialize async SoilGrids client."""
+        super().__init__()
+        self.http = AsyncHTTPClient(provider="soilgrids")
+
+    async def get_soil_properties(
+        self,
+        lat: float,
+        lon: float,
+        refresh_within_hours: float = 0.0
+    ) -> Optional[Dict[str, float]]:
+        """
+        Async counterpart of SoilGridsClient.get_soil_properties.
+
+        Concurrent misses for the same cache key share one upstream fetch;
+        stale entries are served while a background fetch renews them.
+        refresh_within_hours forces a refetch if the entry expires that soon.
+        """
+        if local := await asyncio.to_thread(self._local_properties, lat, lon):
+            return local
+
+        lat, lon = self._snap(lat, lon)
+        cache_key = self._cache_key(lat, lon)
+
+        fetch = lambda: self._fetch_properties(lat, lon, cache_key)
+        if cached := await _cached_or_refresh(self.cache, cache_key, fetch, refresh_within_hours):
+            return cached
+
+        return await inflight.do(cache_key, fetch)
+
+    async def _fetch_properties(self, lat: float, lon: float, cache_key: str) -> Optional[Dict[str, float]]:
+        """Fetch soil properties upstream and populate the cache."""
+        try:
+            logger.debug(f"Fetching SoilGrids properties for ({lat}, {lon})")
+
+            url, params = self._properties_request(lat, lon)
+
+            response = await self.http.get(url, params=params)
+            if not response:
+                logger.warning(f"SoilGrids returned empty response for ({lat}, {lon})")
+                return None
+
+            result = self._parse_properties(response)
+
+            logger.info(f"SoilGrids data fetched for ({lat}, {lon}): sand={result['sand']}, clay={result['clay']}, silt={result['silt']}")
+            await self.cache.aset(cache_key, result)
+            return result
+
+        except Exception as e:
+            logger.error(f"SoilGrids fetch failed for ({lat}, {lon}): {e}", exc_info=True)
+            return None
+
+
 # ============================================================================
 # CLIENT FACTORY
 # ============================================================================
@@ -2,10 +2,14 @@
 Unified Feature Pipeline adapted for MongoDB persistence.
 
 Uses TowerGuard environmental clients to populate Mongo collections.
+Independent sources (rainfall, temperature, soil, elevation, NDVI) are fetched
+concurrently, each under its own deadline.
 """
 
+import asyncio
 import logging
 from datetime import datetime, timezone
+from typing import Any, Awaitable, Optional, Tuple
 from uuid import UUID, uuid4
 
 from pymongo.database import Database
@@ -13,14 +17,58 @@ from shapely.geometry import shape
 
 from app.ml.drive_uploader import maybe_upload_ndvi
 from app.ml.environmental_api_client import (
-    CHIRPSClient,
-    NASAPOWERClient,
-    SoilGridsClient
+    AsyncCHIRPSClient,
+    AsyncNASAPOWERClient,
+    AsyncSoilGridsClient
 )
-from app.ml.gee_ndvi import compute_ndvi_stats
+from app.ml.config import REQUEST_CONFIG
+from app.ml.dem_local import get_dem_sampler
+from app.ml.gee_ndvi import compute_ndvi_stats_async
+from app.ml.ndvi import compute_ndvi_from_catalog
 
 log = logging.getLogger(__name__)
 
+SOURCE_TIMEOUTS = REQUEST_CONFIG["source_timeouts_seconds"]
+
+
+async def _fetch_source(name: str, pending: Awaitable[Any]) -> Tuple[Any, Optional[str]]:
+    """
+    Await a single feature source under its configured deadline.
+
+    Returns:
+        (value, error) where error is None on success, "timeout" if the
+        deadline passed, or the exception message otherwise.
+    """
+    timeout = SOURCE_TIMEOUTS.get(name)
+    try:
+        return await asyncio.wait_for(pending, timeout=timeout), None
+    except asyncio.TimeoutError:
+        log.warning("%s source timed out after %ss", name, timeout)
+        return None, "timeout"
+    except Exception as exc:
+        log.warning("%s source failed: %s", name, exc)
+        return None, str(exc)
+
+
+def _elevation_stats(geometry: dict) -> Optional[dict]:
+    """Polygon elevation stats from the local DEM, or None if no DEM is configured."""
+    sampler = get_dem_sampler()
+    if sampler is None:
+        return None
+    return sampler.polygon_stats(geometry)
+
+
+async def _ndvi_stats(geometry: dict, start_date: str, end_date: str) -> dict:
+    """NDVI from local Sentinel-2 scenes when the catalog covers the site, else Earth Engine."""
+    try:
+        local = await asyncio.to_thread(compute_ndvi_from_catalog, geometry, start_date, end_date)
+    except Exception as exc:
+        log.warning("Local NDVI lookup failed: %s", exc)
+        local = None
+    if local is not None:
+        return local
+    return await compute_ndvi_stats_async(geometry=geometry, start_date=start_date, end_date=end_date)
+
 
 async def extract_features_for_site(
     db: Database,
@@ -51,16 +99,34 @@ async def extract_features_for_site(
 
     is_partial = False
 
-    chirps_client = CHIRPSClient()
-    nasa_client = NASAPOWERClient()
-    soil_client = SoilGridsClient()
+    chirps_client = AsyncCHIRPSClient()
+    nasa_client = AsyncNASAPOWERClient()
+    soil_client = AsyncSoilGridsClient()
+
+    (
+        (rainfall_mm, rainfall_error),
+        (temp_tuple, temp_error),
+        (climatology, climatology_error),
+        (soil_props, soil_error),
+        (elevation, elevation_error),
+        (ndvi_stats, ndvi_error),
+    ) = await asyncio.gather(
+        _fetch_source("rainfall", chirps_client.get_rainfall_for_location(lat, lon)),
+        _fetch_source("temperature", nasa_client.get_temperature_climatology(lat, lon)),
+        # Coalesced with the temperature lookup: one cached NASA POWER request
+        _fetch_source("solar_radiation", nasa_client.get_climatology(lat, lon)),
+        _fetch_source("soil", soil_client.get_soil_properties(lat, lon)),
+        _fetch_source("elevation", asyncio.to_thread(_elevation_stats, site_doc["geometry"])),
+        _fetch_source(
+            "ndvi",
+            _ndvi_stats(site_doc["geometry"], start_date, end_date),
+        ),
+    )
 
-    rainfall_mm = chirps_client.get_rainfall_for_location(lat, lon)
     if rainfall_mm is None:
         is_partial = True
         rainfall_mm = 0.0
 
-    temp_tuple = nasa_client.get_temperature_climatology(lat, lon)
     if temp_tuple and len(temp_tuple) == 3:
         _, tmin_c, tmax_c = temp_tuple
     elif temp_tuple and len(temp_tuple) == 2:
@@ -69,7 +135,9 @@ async def extract_features_for_site(
         is_partial = True
         tmin_c, tmax_c = 0.0, 0.0
 
-    soil_props = soil_client.get_soil_properties(lat, lon)
+    # ALLSKY_SFC_SW_DWN annual mean, kWh/m²/day
+    solar_radiation = (climatology or {}).get("solar_radiation")
+
     if soil_props:
         soc = soil_props.get("soc", 0.0)
         sand = soil_props.get("sand", 0.0)
@@ -80,21 +148,15 @@ async def extract_features_for_site(
         is_partial = True
         soc = sand = clay = silt = ph = 0.0
 
-    ndvi_stats = {}
-    try:
-        ndvi_stats = compute_ndvi_stats(
-            geometry=site_doc["geometry"],
-            start_date=start_date,
-            end_date=end_date,
-        )
+    elevation = elevation or {}
+
+    if ndvi_stats is not None:
         ndvi_mean = ndvi_stats.get("ndvi_mean")
         ndvi_std = ndvi_stats.get("ndvi_std")
         if ndvi_mean is None or ndvi_std is None:
             is_partial = True
-        else:
-            is_partial = is_partial or False
-    except Exception as exc:
-        log.warning("NDVI stats unavailable: %s", exc)
+    else:
+        log.warning("NDVI stats unavailable: %s", ndvi_error)
         ndvi_mean = None
         ndvi_std = None
         ndvi_stats = {
@@ -107,9 +169,25 @@ async def extract_features_for_site(
     source_breakdown = {
         "rainfall": {"source": "CHIRPS", "value": rainfall_mm, "available": rainfall_mm > 0},
         "temperature": {"source": "NASA POWER", "tmin": tmin_c, "tmax": tmax_c, "available": temp_tuple is not None},
+        "solar_radiation": {"source": "NASA POWER", "available": solar_radiation is not None},
         "soil": {"source": "SoilGrids", "properties": soil_props, "available": soil_props is not None},
-        "ndvi": {"source": "Sentinel-2", "available": False, "note": "Requires imagery paths"}
+        "elevation": {"source": "DEM", **elevation, "available": bool(elevation)},
+        "ndvi": {
+            "source": "Sentinel-2 (local scene)" if ndvi_stats.get("scene_id") else "Sentinel-2 (Earth Engine)",
+            "collection": ndvi_stats.get("collection_used"),
+            "available": ndvi_mean is not None,
+        },
     }
+    for key, error in (
+        ("rainfall", rainfall_error),
+        ("temperature", temp_error),
+        ("solar_radiation", climatology_error),
+        ("soil", soil_error),
+        ("elevation", elevation_error),
+        ("ndvi", ndvi_error),
+    ):
+        if error:
+            source_breakdown[key]["error"] = error
 
     start_date_obj = datetime.strptime(start_date, "%Y-%m-%d").date()
     end_date_obj = datetime.strptime(end_date, "%Y-%m-%d").date()
@@ -118,8 +196,6 @@ async def extract_features_for_site(
     rainfall_mean_mm_per_day = rainfall_mm / 365.0 if rainfall_mm else 0.0
     rainfall_total_mm = rainfall_mean_mm_per_day * days_in_period
 
-    solar_radiation = None
-
     now = datetime.utcnow()
     features_doc = {
         "id": str(uuid4()),
@@ -138,19 +214,25 @@ async def extract_features_for_site(
         "clay": clay,
         "silt": silt,
         "ph": ph,
+        "elevation_m": elevation.get("mean"),
+        "elevation_min_m": elevation.get("min"),
+        "elevation_max_m": elevation.get("max"),
         "source_breakdown": source_breakdown,
         "partial": is_partial,
         "created_at": now,
         "updated_at": now,
     }
 
-    source_breakdown["ndvi"]["available"] = ndvi_mean is not None
-
     ndvi_meta = {
         "collection": ndvi_stats.get("collection_used"),
         "start_date": ndvi_stats.get("start_date"),
         "end_date": ndvi_stats.get("end_date"),
     }
+    if ndvi_stats.get("image_count") is not None:
+        ndvi_meta["image_count"] = ndvi_stats["image_count"]
+    if ndvi_stats.get("scene_id"):
+        ndvi_meta["scene_id"] = ndvi_stats["scene_id"]
+        ndvi_meta["scene_date"] = ndvi_stats.get("scene_date")
     drive_file_id = None
     try:
         drive_file_id = maybe_upload_ndvi(str(site_id), ndvi_stats)
@@ -13,10 +13,12 @@ Returns structured feature dictionaries with robust error handling.
 
 from typing import Dict, Optional, Any, Tuple
 from dataclasses import dataclass, asdict
+from functools import lru_cache
 from datetime import datetime
 import numpy as np
 
 from .ndvi import compute_ndvi_for_site
+from .zonal import compute_ndvi_for_sites
 from .utils import logger, create_feature_metadata, build_feature_vector_from_site_features
 from .environmental_api_client import (
     get_api_client,
@@ -24,7 +26,9 @@ from .environmental_api_client import (
     NASAPOWERClient,
     SoilGridsClient
 )
+from .config import FEATURE_CONFIG
 from .data_loader import load_water_towers
+from .dem_local import get_dem_sampler
 
 
 # ==============================================================================
@@ -168,26 +172,55 @@ def get_temperature_for_site(
         return None
 
 
+@lru_cache(maxsize=1)
+def _water_tower_elevations() -> Dict[str, float]:
+    """
+    Elevations recorded in the water towers GeoJSON, keyed by name and id.
+
+    Loaded once per process; a failed load raises and is retried next call.
+    """
+    water_towers = load_water_towers()
+    if water_towers is None:
+        raise FileNotFoundError("Could not load water towers GeoJSON")
+
+    elev_col = next((c for c in ('elevation', 'elevation_m') if c in water_towers.columns), None)
+    elevations: Dict[str, float] = {}
+    for _, row in water_towers.iterrows():
+        elevation = row[elev_col] if elev_col else None
+        if elevation is None or (isinstance(elevation, float) and np.isnan(elevation)):
+            # Fall back to the z-coordinate if the geometry is 3D
+            geom = row.geometry
+            elevation = getattr(geom, 'z', None) if geom is not None and geom.has_z else None
+        if elevation is None:
+            continue
+        for key in ('name', 'id'):
+            if key in water_towers.columns and row[key] is not None:
+                elevations[str(row[key])] = float(elevation)
+    return elevations
+
+
 def get_elevation_for_site(
     site_id: str,
     latitude: Optional[float] = None,
     longitude: Optional[float] = None,
     dem_path: Optional[str] = None,
-    data_source: str = 'water_towers_geojson'
+    data_source: str = 'dem'
 ) -> Optional[float]:
     """
     Retrieve elevation for a site.
     
     Data sources:
+    - 'dem': Local DEM GeoTIFF sampled at latitude/longitude (falls back to
+      the GeoJSON properties when no DEM is available)
     - 'water_towers_geojson': Elevation from water_towers.geojson properties
     - 'soilgrids': ISRIC SoilGrids DEM (optional, TIER 2)
     
     Args:
         site_id: Site identifier or water tower name
-        latitude: Site latitude (for SoilGrids fallback)
-        longitude: Site longitude (for SoilGrids fallback)
-        dem_path: Path to local DEM GeoTIFF (optional)
-        data_source: Data source name (default: 'water_towers_geojson')
+        latitude: Site latitude (for DEM/SoilGrids lookup)
+        longitude: Site longitude (for DEM/SoilGrids lookup)
+        dem_path: Path to local DEM GeoTIFF (default: DATA_SOURCES["dem"])
+        data_source: Data source name (default: 'dem')
     
     Returns:
         Elevation in meters or None if unavailable
@@ -195,38 +228,23 @@ def get_elevation_for_site(
     try:
         logger.debug(f"[{site_id}] Retrieving elevation from source: {data_source}")
         
+        if data_source == 'dem':
+            sampler = get_dem_sampler(dem_path)
+            if sampler is not None and latitude is not None and longitude is not None:
+                elevation = sampler.elevation_at(latitude, longitude)
+                if elevation is not None:
+                    logger.info(f"[{site_id}] Elevation (DEM): {elevation:.0f} m")
+                    return elevation
+            data_source = FEATURE_CONFIG["elevation"]["fallback_source"]
+            logger.debug(f"[{site_id}] DEM elevation unavailable; falling back to {data_source}")
+        
         if data_source == 'water_towers_geojson':
-            # Load water towers GeoDataFrame
-            water_towers = load_water_towers()
-            if water_towers is None:
-                logger.warning(f"[{site_id}] Could not load water towers GeoJSON")
-                return None
-            
-            # Try to find site by name or id
-            match = None
-            if 'name' in water_towers.columns:
-                match = water_towers[water_towers['name'] == site_id]
-            if match is None or match.empty:
-                if 'id' in water_towers.columns:
-                    match = water_towers[water_towers['id'] == site_id]
+            elevation = _water_tower_elevations().get(str(site_id))
+            if elevation is not None:
+                logger.info(f"[{site_id}] Elevation (water_towers): {elevation:.0f} m")
+                return elevation
             
-            if match is not None and not match.empty:
-                # Try to get elevation from properties
-                if 'elevation' in match.columns or 'elevation_m' in match.columns:
-                    elev_col = 'elevation' if 'elevation' in match.columns else 'elevation_m'
-                    elevation = match.iloc[0][elev_col]
-                    if elevation is not None:
-                        logger.info(f"[{site_id}] Elevation (water_towers): {elevation:.0f} m")
-                        return float(elevation)
-                
-                # Try to extract elevation from geometry (z-coordinate if 3D)
-                geom = match.iloc[0].geometry
-                if geom and hasattr(geom, 'z'):
-                    elevation = geom.z
-                    logger.info(f"[{site_id}] Elevation (geometry z): {elevation:.0f} m")
-                    return float(elevation)
-            
-            logger.warning(f"[{site_id}] Site not found in water towers GeoJSON")
+            logger.warning(f"[{site_id}] No elevation for site in water towers GeoJSON")
             return None
         
         elif data_source == 'soilgrids':
@@ -264,9 +282,10 @@ def extract_features_for_site(
     dem_path: Optional[str] = None,
     rainfall_source: str = 'chirps',
     temperature_source: str = 'nasa_power',
-    elevation_source: str = 'water_towers_geojson',
+    elevation_source: str = 'dem',
     sentinel2_date: Optional[str] = None,
-    sentinel2_cloud_percentage: Optional[float] = None
+    sentinel2_cloud_percentage: Optional[float] = None,
+    ndvi_result: Optional[Dict[str, Any]] = None
 ) -> Tuple[SiteFeatures, Dict[str, Any]]:
     """
     End-to-end feature extraction for a water tower site.
@@ -275,7 +294,7 @@ def extract_features_for_site(
     - NDVI: Computed from Sentinel-2 if Red/NIR bands and polygon provided
     - Rainfall: Retrieved from CHIRPS (primary), NASA POWER (backup)
     - Temperature: Retrieved from NASA POWER (primary), Open-Meteo (backup)
-    - Elevation: Retrieved from water_towers.geojson properties
+    - Elevation: Sampled from the local DEM (water_towers.geojson properties as fallback)
     
     Per specification: No synthetic defaults; on failure, log + set None.
     
@@ -289,9 +308,11 @@ def extract_features_for_site(
         dem_path: Path to DEM GeoTIFF for elevation (optional)
         rainfall_source: Data source for rainfall ('chirps' or 'nasa_power', default: 'chirps')
         temperature_source: Data source for temperature ('nasa_power' or 'open_meteo', default: 'nasa_power')
-        elevation_source: Data source for elevation ('water_towers_geojson' or 'soilgrids', default: 'water_towers_geojson')
+        elevation_source: Data source for elevation ('dem', 'water_towers_geojson' or 'soilgrids', default: 'dem')
         sentinel2_date: Date of Sentinel-2 acquisition for metadata (optional)
         sentinel2_cloud_percentage: Cloud cover percentage for metadata (optional)
+        ndvi_result: Precomputed compute_ndvi_for_site result, e.g. from a
+                     batch zonal pass over a shared scene (optional)
     
     Returns:
         Tuple of (SiteFeatures, metadata_dict):
@@ -321,16 +342,17 @@ def extract_features_for_site(
     # 1. Extract NDVI
     # ===========================================================================
     
-    if red_band_path and nir_band_path and polygon_wkt:
+    if ndvi_result is not None or (red_band_path and nir_band_path and polygon_wkt):
         logger.debug(f"[{site_id}] Extracting NDVI from Sentinel-2")
         try:
-            ndvi_result = compute_ndvi_for_site(
-                site_id=site_id,
-                red_band_path=red_band_path,
-                nir_band_path=nir_band_path,
-                polygon_wkt=polygon_wkt,
-                valid_pixel_threshold=0.1
-            )
+            if ndvi_result is None:
+                ndvi_result = compute_ndvi_for_site(
+                    site_id=site_id,
+                    red_band_path=red_band_path,
+                    nir_band_path=nir_band_path,
+                    polygon_wkt=polygon_wkt,
+                    valid_pixel_threshold=0.1
+                )
             
             if ndvi_result['success']:
                 features.ndvi_mean = ndvi_result['ndvi_mean']
@@ -441,6 +463,22 @@ def extract_features_for_site(
 # Batch Feature Extraction
 # ==============================================================================
 
+def _batch_ndvi_by_scene(sites: list) -> Dict[str, Dict[str, Any]]:
+    """NDVI results for sites that share a Red/NIR scene with at least one other site."""
+    scenes: Dict[Tuple[str, str], Dict[str, str]] = {}
+    for site_config in sites:
+        bands = (site_config.get('red_band_path'), site_config.get('nir_band_path'))
+        if all(bands) and site_config.get('polygon_wkt') and site_config.get('site_id'):
+            scenes.setdefault(bands, {})[site_config['site_id']] = site_config['polygon_wkt']
+    
+    ndvi_results: Dict[str, Dict[str, Any]] = {}
+    for (red_band_path, nir_band_path), scene_sites in scenes.items():
+        if len(scene_sites) > 1:
+            logger.info(f"Computing NDVI for {len(scene_sites)} sites from one pass over {red_band_path}")
+            ndvi_results.update(compute_ndvi_for_sites(red_band_path, nir_band_path, scene_sites))
+    return ndvi_results
+
+
 def extract_features_for_sites(
     sites: list,
     **kwargs
@@ -456,16 +494,23 @@ def extract_features_for_sites(
                - 'dem_path': for elevation
         **kwargs: Additional arguments passed to extract_features_for_site
     
+    Sites sharing the same Red/NIR scene get their NDVI from one zonal pass
+    over that scene (compute_ndvi_for_sites) instead of one read per site.
+    
     Returns:
         List of (SiteFeatures, metadata) tuples, one per site
     """
     results = []
+    ndvi_results = _batch_ndvi_by_scene(sites)
     
     for site_config in sites:
         logger.info(f"Processing site: {site_config.get('site_id', 'unknown')}")
         
         try:
-            features, metadata = extract_features_for_site(**site_config, **kwargs)
+            site_kwargs = dict(kwargs)
+            if site_config.get('site_id') in ndvi_results:
+                site_kwargs['ndvi_result'] = ndvi_results[site_config['site_id']]
+            features, metadata = extract_features_for_site(**site_config, **site_kwargs)
             results.append({
                 'features': features,
                 'metadata': metadata
@@ -1,10 +1,9 @@
 from __future__ import annotations
 
-import json
 import logging
 import os
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
 from pathlib import Path
 
 # Import Earth Engine safely: on Windows the `ee` package may import
@@ -15,10 +14,16 @@ except Exception as exc:  # pragma: no cover - platform-specific
     ee = None  # type: ignore
     _EE_IMPORT_ERROR = exc
 
+from .config import REQUEST_CONFIG, get_config
+from .ee_executor import run_ee
+from .ndvi_store import NDVIKey, NDVIResultStore, geometry_hash
+
 log = logging.getLogger(__name__)
 
 DEFAULT_COLLECTION = "COPERNICUS/S2_SR_HARMONIZED"
 DEFAULT_SCALE = 10
+# Bump whenever the cloud mask or NDVI formula changes so stored results are recomputed
+NDVI_MASK_VERSION = "qa60-cloud-cirrus-v1"
 _BASE_DIR = Path(__file__).resolve().parents[2]
 _DEFAULT_SA_PATH = _BASE_DIR / "credentials" / "ee_service_account.json"
 SERVICE_ACCOUNT_EMAIL = os.getenv(
@@ -31,6 +36,43 @@ SERVICE_ACCOUNT_JSON = os.getenv(
 )
 _EE_INITIALIZED = False
 _EE_DISABLED = False
+# Lifetime of results for windows that are still open; closed windows are kept forever
+NDVI_CACHE_TTL_HOURS = float(os.getenv("NDVI_CACHE_TTL_HOURS", "24"))
+_ndvi_store: Optional[NDVIResultStore] = None
+
+
+def _get_ndvi_store() -> NDVIResultStore:
+    global _ndvi_store
+    if _ndvi_store is None:
+        cache_dir = Path(get_config()["cache"]["directory"]) / "ndvi"
+        _ndvi_store = NDVIResultStore(cache_dir, ttl_hours=NDVI_CACHE_TTL_HOURS)
+    return _ndvi_store
+
+
+def configure_ndvi_store(db) -> None:
+    """Persist NDVI results in Mongo (called at application startup)."""
+    _get_ndvi_store().configure(db)
+
+
+def _ndvi_store_key(
+    geometry: Optional[Dict[str, Any]],
+    lat: Optional[float],
+    lon: Optional[float],
+    buffer_m: int,
+    start_date: str,
+    end_date: str,
+    collection: str,
+    scale: int,
+) -> NDVIKey:
+    """Store key for an NDVI request (geometry hash + window + collection + scale + mask version)."""
+    return NDVIKey(
+        geometry_hash=geometry_hash(geometry, [lat, lon, buffer_m]),
+        collection=collection,
+        start_date=start_date,
+        end_date=end_date,
+        scale=scale,
+        mask_version=NDVI_MASK_VERSION,
+    )
 
 
 def _init_ee() -> None:
@@ -62,6 +104,9 @@ def _init_ee() -> None:
 
     credentials = ee.ServiceAccountCredentials(SERVICE_ACCOUNT_EMAIL, SERVICE_ACCOUNT_JSON)
     ee.Initialize(credentials)
+    # Bound each HTTP request so a timed-out caller's worker is released too
+    ee_config = REQUEST_CONFIG["earth_engine"]
+    ee.data.setDeadline(int(1000 * max(ee_config["deadline_seconds"], ee_config["batch_deadline_seconds"])))
     _EE_INITIALIZED = True
     log.info("Initialized Earth Engine for service account %s", SERVICE_ACCOUNT_EMAIL)
 
@@ -89,6 +134,50 @@ def _parse_geometry(
     return ee.Geometry.Point([lon, lat]).buffer(buffer_m)
 
 
+def _mask_s2_clouds(img: ee.Image) -> ee.Image:
+    qa = img.select("QA60")
+    cloud_bit = 1 << 10
+    cirrus_bit = 1 << 11
+    mask = qa.bitwiseAnd(cloud_bit).eq(0).And(
+        qa.bitwiseAnd(cirrus_bit).eq(0)
+    )
+    return img.updateMask(mask)
+
+
+def _add_ndvi(img: ee.Image) -> ee.Image:
+    ndvi = img.normalizedDifference(["B8", "B4"]).rename("NDVI")
+    return img.addBands(ndvi)
+
+
+def _filtered_collection(collection: str, region: ee.Geometry, start: str, end: str) -> ee.ImageCollection:
+    """Collection filtered to a region and [start, end), cloud-masked for Sentinel-2."""
+    ic = ee.ImageCollection(collection).filterBounds(region).filterDate(start, end)
+    if "S2" in collection.upper():
+        ic = ic.map(_mask_s2_clouds)
+    return ic
+
+
+def _empty_result(
+    collection: str,
+    start_date: str,
+    end_date: str,
+    image_count: Optional[int] = None,
+) -> Dict[str, Optional[float]]:
+    return {
+        "ndvi_mean": None,
+        "ndvi_std": None,
+        "collection_used": collection,
+        "start_date": start_date,
+        "end_date": end_date,
+        "image_count": image_count,
+    }
+
+
+def _stat(props: Dict[str, Any], key: str) -> Optional[float]:
+    value = props.get(key)
+    return float(value) if value is not None else None
+
+
 def compute_ndvi_stats(
     geometry: Optional[Dict[str, Any]] = None,
     start_date: Optional[str] = None,
@@ -98,6 +187,7 @@ def compute_ndvi_stats(
     buffer_m: int = 500,
     collection: str = DEFAULT_COLLECTION,
     scale: int = DEFAULT_SCALE,
+    refresh_within_hours: float = 0.0,
 ) -> Dict[str, Optional[float]]:
     if not start_date or not end_date:
         raise ValueError("start_date and end_date are required")
@@ -108,78 +198,255 @@ def compute_ndvi_stats(
     except ValueError as exc:
         raise ValueError("Dates must be in ISO format YYYY-MM-DD") from exc
 
+    # Successful results are stored (closed windows permanently); refresh_within_hours
+    # renews open-window results close to expiry
+    store_key = _ndvi_store_key(geometry, lat, lon, buffer_m, start_date, end_date, collection, scale)
+    if cached := _get_ndvi_store().get(store_key, refresh_within_hours):
+        return cached
+
     try:
         _init_ee()
         if _EE_DISABLED:
             log.warning("Earth Engine disabled; skipping NDVI computation")
-            return {
-                "ndvi_mean": None,
-                "ndvi_std": None,
-                "collection_used": collection,
-                "start_date": start_date,
-                "end_date": end_date,
-            }
+            return _empty_result(collection, start_date, end_date)
         region = _parse_geometry(geometry, lat, lon, buffer_m)
-        ic = (
-            ee.ImageCollection(collection)
-            .filterBounds(region)
-            .filterDate(start.date().isoformat(), end.date().isoformat())
+        ic = _filtered_collection(collection, region, start.date().isoformat(), end.date().isoformat())
+
+        # Emptiness check, composite and reduction run server-side in one getInfo;
+        # the image count comes back as provenance.
+        size = ic.size()
+        ndvi_img = ic.map(_add_ndvi).select("NDVI").mean()
+        stats = ee.Algorithms.If(
+            size.gt(0),
+            ndvi_img.reduceRegion(
+                reducer=ee.Reducer.mean().combine(
+                    reducer2=ee.Reducer.stdDev(),
+                    sharedInputs=True,
+                ),
+                geometry=region,
+                scale=scale,
+                maxPixels=1e9,
+                bestEffort=True,
+            ),
+            ee.Dictionary(),
         )
+        response = ee.Dictionary({"image_count": size, "stats": stats}).getInfo()
+        image_count = int(response.get("image_count") or 0)
+        if image_count == 0:
+            log.warning("No Sentinel-2 imagery found for %s - %s", start_date, end_date)
+            return _empty_result(collection, start_date, end_date, image_count=0)
 
-        def mask_s2_clouds(img):
-            qa = img.select("QA60")
-            cloud_bit = 1 << 10
-            cirrus_bit = 1 << 11
-            mask = qa.bitwiseAnd(cloud_bit).eq(0).And(
-                qa.bitwiseAnd(cirrus_bit).eq(0)
-            )
-            return img.updateMask(mask)
+        stats = response.get("stats") or {}
+        result = {
+            **_empty_result(collection, start_date, end_date, image_count=image_count),
+            "ndvi_mean": _stat(stats, "NDVI_mean"),
+            "ndvi_std": _stat(stats, "NDVI_stdDev"),
+        }
+        if result["ndvi_mean"] is not None:
+            _get_ndvi_store().put(store_key, result)
+        return result
+    except Exception as exc:
+        log.exception("NDVI calculation failed: %s", exc)
+        return _empty_result(collection, start_date, end_date)
 
-        if "S2" in collection.upper():
-            ic = ic.map(mask_s2_clouds)
 
-        size = ic.size().getInfo()
-        if size == 0:
-            log.warning("No Sentinel-2 imagery found for %s - %s", start_date, end_date)
-            return {
-                "ndvi_mean": None,
-                "ndvi_std": None,
-                "collection_used": collection,
-                "start_date": start_date,
-                "end_date": end_date,
+def compute_ndvi_stats_batch(
+    geometries: Mapping[str, Dict[str, Any]],
+    windows: Sequence[Tuple[str, str]],
+    collection: str = DEFAULT_COLLECTION,
+    scale: int = DEFAULT_SCALE,
+    refresh_within_hours: float = 0.0,
+) -> Dict[str, Dict[Tuple[str, str], Dict[str, Optional[float]]]]:
+    """
+    NDVI mean/std for many geometries and date windows in one Earth Engine call.
+
+    Each window's mean-NDVI composite becomes one band of a stacked image, and a
+    single reduceRegions over a FeatureCollection of all geometries returns
+    every (geometry, window) statistic in one getInfo round trip instead of
+    two per geometry and window. Results share the NDVI result store used by
+    compute_ndvi_stats, so stored pairs are not recomputed and later
+    single-geometry calls are served from the store.
+
+    Args:
+        geometries: {feature_id: GeoJSON geometry, Feature or FeatureCollection}
+        windows: (start_date, end_date) ISO date pairs
+
+    Returns:
+        {feature_id: {(start_date, end_date): result dict as from compute_ndvi_stats}}.
+        image_count is the number of images intersecting that geometry.
+        An oversized batch is split and, per geometry, retried at coarser
+        scales (marked by scale_used; such results are not stored).
+        Geometries that still fail are left out so callers can fall back
+        to compute_ndvi_stats.
+    """
+    windows = list(dict.fromkeys(windows))
+    for start_date, end_date in windows:
+        try:
+            datetime.fromisoformat(start_date)
+            datetime.fromisoformat(end_date)
+        except (TypeError, ValueError) as exc:
+            raise ValueError("Dates must be in ISO format YYYY-MM-DD") from exc
+
+    store = _get_ndvi_store()
+    results: Dict[str, Dict[Tuple[str, str], Dict[str, Optional[float]]]] = {fid: {} for fid in geometries}
+    missing: Dict[str, list] = {}
+    for fid, geometry in geometries.items():
+        for window in windows:
+            key = _ndvi_store_key(geometry, None, None, 500, window[0], window[1], collection, scale)
+            if cached := store.get(key, refresh_within_hours):
+                results[fid][window] = cached
+            else:
+                missing.setdefault(fid, []).append(window)
+    if not missing:
+        return results
+
+    pending = [w for w in windows if any(w in ws for ws in missing.values())]
+    try:
+        _init_ee()
+    except Exception as exc:
+        log.exception("Batched NDVI calculation failed: %s", exc)
+        return results
+    if _EE_DISABLED:
+        log.warning("Earth Engine disabled; skipping batched NDVI computation")
+        for fid, ws in missing.items():
+            for start_date, end_date in ws:
+                results[fid][(start_date, end_date)] = _empty_result(collection, start_date, end_date)
+        return results
+
+    try:
+        features = _reduce_with_fallback({fid: geometries[fid] for fid in missing}, pending, collection, scale)
+    except Exception as exc:
+        log.exception("Batched NDVI calculation failed: %s", exc)
+        return results
+    for fid, (props, scale_used) in features.items():
+        for i, (start_date, end_date) in enumerate(pending):
+            if (start_date, end_date) not in missing[fid]:
+                continue
+            # Single-band images name the outputs mean/stdDev, multi-band ones <band>_mean
+            prefix = f"w{i}_" if len(pending) > 1 else ""
+            count = props.get(f"w{i}_count")
+            result = {
+                **_empty_result(collection, start_date, end_date, image_count=int(count or 0)),
+                "ndvi_mean": _stat(props, f"{prefix}mean"),
+                "ndvi_std": _stat(props, f"{prefix}stdDev"),
             }
+            if scale_used != scale:
+                result["scale_used"] = scale_used
+            results[fid][(start_date, end_date)] = result
+            # Coarser fallback results are returned but not stored under the requested scale
+            if result["ndvi_mean"] is not None and scale_used == scale:
+                key = _ndvi_store_key(geometries[fid], None, None, 500, start_date, end_date, collection, scale)
+                store.put(key, result)
+    return results
 
-        def add_ndvi(img):
-            ndvi = img.normalizedDifference(["B8", "B4"]).rename("NDVI")
-            return img.addBands(ndvi)
 
-        ndvi_ic = ic.map(add_ndvi)
-        ndvi_img = ndvi_ic.select("NDVI").mean()
+# Scale multipliers tried for a single geometry whose reduction is too large
+_BATCH_FALLBACK_SCALE_FACTORS = (3, 10)
 
-        stats = ndvi_img.reduceRegion(
-            reducer=ee.Reducer.mean().combine(
-                reducer2=ee.Reducer.stdDev(),
-                sharedInputs=True,
-            ),
-            geometry=region,
-            scale=scale,
-            maxPixels=1e9,
-            bestEffort=True,
-        ).getInfo()
-
-        return {
-            "ndvi_mean": float(stats.get("NDVI_mean")) if stats.get("NDVI_mean") is not None else None,
-            "ndvi_std": float(stats.get("NDVI_stdDev")) if stats.get("NDVI_stdDev") is not None else None,
-            "collection_used": collection,
-            "start_date": start_date,
-            "end_date": end_date,
-        }
+
+def _is_ee_error(exc: Exception) -> bool:
+    """Errors raised by Earth Engine itself (too many pixels, memory, timeouts), not transport failures."""
+    return ee is not None and isinstance(exc, ee.EEException)
+
+
+def _reduce_batch(
+    geometries: Mapping[str, Dict[str, Any]],
+    windows: Sequence[Tuple[str, str]],
+    collection: str,
+    scale: int,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    One reduceRegions round trip: {feature_id: properties}.
+
+    Properties hold `w<i>_mean`/`w<i>_stdDev` (or mean/stdDev for a single
+    window) and `w<i>_count`, the number of images intersecting that
+    feature in window i.
+    """
+    features = ee.FeatureCollection([
+        ee.Feature(_parse_geometry(geometry, None, None, 500), {"fid": fid}) for fid, geometry in geometries.items()
+    ])
+    region = features.geometry()
+    collections, bands = [], []
+    for i, (start_date, end_date) in enumerate(windows):
+        ic = _filtered_collection(collection, region, start_date, end_date)
+        # A fully masked band keeps reduceRegions valid for windows without imagery
+        empty = ee.Image.constant(0).updateMask(0).toFloat().rename("NDVI")
+        ndvi = ee.Image(ee.Algorithms.If(ic.size().gt(0), ic.map(_add_ndvi).select("NDVI").mean(), empty))
+        collections.append(ic)
+        bands.append(ndvi.rename(f"w{i}"))
+
+    def _with_counts(feature):
+        geometry = feature.geometry()
+        return feature.set({f"w{i}_count": ic.filterBounds(geometry).size() for i, ic in enumerate(collections)})
+
+    stats = ee.Image.cat(bands).reduceRegions(
+        collection=features.map(_with_counts),
+        reducer=ee.Reducer.mean().combine(reducer2=ee.Reducer.stdDev(), sharedInputs=True),
+        scale=scale,
+        tileScale=4,
+    ).getInfo()
+    return {
+        (feature.get("properties") or {}).get("fid"): feature.get("properties") or {}
+        for feature in stats.get("features", [])
+    }
+
+
+def _reduce_with_fallback(
+    geometries: Mapping[str, Dict[str, Any]],
+    windows: Sequence[Tuple[str, str]],
+    collection: str,
+    scale: int,
+) -> Dict[str, Tuple[Dict[str, Any], int]]:
+    """
+    _reduce_batch that survives oversized requests: {feature_id: (properties, scale used)}.
+
+    A batch rejected by Earth Engine is split in halves; a single geometry
+    that is still rejected is retried at coarser scales. Geometries that
+    fail at every scale are left out. Other errors (network, auth) propagate.
+    """
+    fids = list(geometries)
+    try:
+        return {fid: (props, scale) for fid, props in _reduce_batch(geometries, windows, collection, scale).items()}
     except Exception as exc:
-        log.exception("NDVI calculation failed: %s", exc)
-        return {
-            "ndvi_mean": None,
-            "ndvi_std": None,
-            "collection_used": collection,
-            "start_date": start_date,
-            "end_date": end_date,
-        }
+        if not _is_ee_error(exc):
+            raise
+        if len(fids) > 1:
+            log.warning("Batched NDVI for %d geometries failed (%s); splitting", len(fids), exc)
+            half = len(fids) // 2
+            merged = _reduce_with_fallback({fid: geometries[fid] for fid in fids[:half]}, windows, collection, scale)
+            merged.update(_reduce_with_fallback({fid: geometries[fid] for fid in fids[half:]}, windows, collection, scale))
+            return merged
+        last_error = exc
+
+    for factor in _BATCH_FALLBACK_SCALE_FACTORS:
+        coarse = scale * factor
+        log.warning("NDVI for %s failed at %sm (%s); retrying at %sm", fids[0], scale, last_error, coarse)
+        try:
+            props = _reduce_batch(geometries, windows, collection, coarse)
+            return {fid: (p, coarse) for fid, p in props.items()}
+        except Exception as exc:
+            if not _is_ee_error(exc):
+                raise
+            last_error = exc
+    log.error("NDVI for %s failed at every scale: %s", fids[0], last_error)
+    return {}
+
+
+async def compute_ndvi_stats_async(**kwargs: Any) -> Dict[str, Optional[float]]:
+    """compute_ndvi_stats on the Earth Engine executor (raises asyncio.TimeoutError past the deadline)."""
+    return await run_ee(compute_ndvi_stats, **kwargs)
+
+
+async def compute_ndvi_stats_batch_async(
+    geometries: Mapping[str, Dict[str, Any]],
+    windows: Sequence[Tuple[str, str]],
+    **kwargs: Any,
+) -> Dict[str, Dict[Tuple[str, str], Dict[str, Optional[float]]]]:
+    """compute_ndvi_stats_batch on the Earth Engine executor under the batch deadline."""
+    return await run_ee(
+        compute_ndvi_stats_batch,
+        geometries,
+        windows,
+        deadline=REQUEST_CONFIG["earth_engine"]["batch_deadline_seconds"],
+        **kwargs,
+    )
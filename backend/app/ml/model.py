@@ -56,7 +56,7 @@ def create_prediction_for_site_features(
         ndvi_std=site_features_doc.get("ndvi_std"),
         rainfall_mm=rainfall_mm,
         temp_mean_c=temp_mean_c,
-        elevation_m=None
+        elevation_m=site_features_doc.get("elevation_m")
     )
 
     rainfall_mm = (
@@ -5,20 +5,31 @@ Handles Sentinel-2 data loading, polygon clipping, NDVI computation, and aggrega
 Core module for extracting vegetation indices from satellite imagery.
 """
 
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+import multiprocessing
+import os
 from pathlib import Path
-from typing import Dict, Optional, Tuple, Any
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Any
 import warnings
 
 import numpy as np
 try:
     import rasterio
-    from rasterio.mask import mask as rasterio_mask
+    import rasterio.windows
+    from rasterio.enums import Resampling
+    from rasterio.features import geometry_mask
+    from rasterio.warp import transform_geom
+    from rasterio.windows import Window
     RASTERIO_AVAILABLE = True
 except ImportError:
     RASTERIO_AVAILABLE = False
-from shapely.geometry import shape
+from shapely.geometry import box, mapping, shape
 from shapely.wkt import loads as wkt_loads
 
+from .config import FEATURE_CONFIG
+from .raster_sampling import block_windows, bounds_window, grid_bounds_window
+from .scene_catalog import SceneCatalog, get_scene_catalog
 from .utils import logger, create_feature_metadata
 
 
@@ -42,6 +53,16 @@ NDVI_BANDS = ('B04', 'B08')  # (Red, NIR)
 NODATA_VALUE = 0
 CLOUD_THRESHOLD = 3000  # Sentinel-2 DN values; high values indicate clouds
 
+# Scene Classification (SCL) classes masked out of composites:
+# no data, saturated/defective, cloud shadow, cloud medium/high probability, cirrus
+SCL_MASKED_CLASSES = (0, 1, 3, 8, 9, 10)
+# QA60 bitmask (L1C / older L2A): opaque clouds and cirrus
+QA60_CLOUD_BITS = (1 << 10) | (1 << 11)
+
+# int16 quantisation of saved NDVI rasters: NDVI = stored * NDVI_QUANT_SCALE (+ 0 offset)
+NDVI_QUANT_SCALE = 1e-4
+NDVI_INT16_NODATA = -32768
+
 
 # ==============================================================================
 # Core NDVI Functions
@@ -95,71 +116,110 @@ def load_sentinel2_band(
         raise
 
 
+@dataclass
+class PolygonClip:
+    """
+    A polygon's pixel window and inside-mask on one raster grid.
+
+    Computed once per site and shared by every band and index on that grid:
+    view() crops a band without copying, values() gathers only the pixels
+    whose centres fall inside the polygon.
+    """
+    rows: slice
+    cols: slice
+    mask: np.ndarray
+    transform: Any
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.mask.shape
+
+    def view(self, data: np.ndarray) -> np.ndarray:
+        """Bounding-window view of a full band (no copy)."""
+        return data[self.rows, self.cols]
+
+    def values(self, data: np.ndarray) -> np.ndarray:
+        """Inside-polygon pixels of a full band or of an already-cropped array."""
+        if data.shape != self.mask.shape:
+            data = self.view(data)
+        return data[self.mask]
+
+
+def polygon_clip(
+    metadata: Dict[str, Any],
+    polygon: Any
+) -> Optional[PolygonClip]:
+    """
+    Pixel window and mask for a polygon on a band's grid.
+
+    Args:
+        metadata: Raster metadata with 'transform', 'width' and 'height'
+        polygon: Shapely geometry or WKT string in the raster's CRS
+
+    Returns:
+        PolygonClip, or None if the polygon is invalid, misses the raster
+        or covers no pixel centre
+    """
+    if isinstance(polygon, str):
+        polygon = wkt_loads(polygon)
+    if not polygon.is_valid:
+        logger.warning(f"Invalid polygon: {polygon.wkt}")
+        return None
+
+    window = grid_bounds_window(polygon.bounds, metadata['transform'], metadata['width'], metadata['height'])
+    if window is None:
+        return None
+    transform = rasterio.windows.transform(window, metadata['transform'])
+    mask = geometry_mask(
+        [mapping(polygon)],
+        out_shape=(int(window.height), int(window.width)),
+        transform=transform,
+        invert=True,
+    )
+    if not mask.any():
+        return None
+    rows, cols = window.toslices()
+    return PolygonClip(rows=rows, cols=cols, mask=mask, transform=transform)
+
+
 def clip_to_polygon(
     data: np.ndarray,
     metadata: Dict[str, Any],
-    polygon_wkt: str
+    polygon_wkt: str,
+    clip: Optional[PolygonClip] = None
 ) -> Tuple[Optional[np.ndarray], Optional[Dict[str, Any]]]:
     """
     Clip raster data to a polygon defined by WKT.
     
+    Crops to the polygon's bounding window and sets pixels outside it to
+    nodata. Pass a PolygonClip from polygon_clip to reuse one mask across
+    bands; prefer PolygonClip.view/values directly when a copy isn't needed.
+    
     Args:
         data: Raster data array (e.g., from load_sentinel2_band)
         metadata: Raster metadata (crs, transform, etc.)
         polygon_wkt: Polygon in WKT format (e.g., "POLYGON ((...))")
+        clip: Precomputed PolygonClip for this grid (optional)
     
     Returns:
         Tuple of (clipped_data, clipped_metadata) or (None, None) on failure
     """
     try:
-        # Parse WKT to Shapely geometry
-        polygon = wkt_loads(polygon_wkt)
-        
-        if not polygon.is_valid:
-            logger.warning(f"Invalid polygon WKT: {polygon_wkt}")
+        clip = clip or polygon_clip(metadata, polygon_wkt)
+        if clip is None:
+            logger.warning("Polygon does not cover any pixel of the raster")
             return None, None
         
-        # Create temporary in-memory raster for clipping
-        # We need to write to a temporary file or use rasterio.mask directly
-        # For simplicity, we'll use rasterio.mask on the data
-        
-        # Convert metadata back to a rasterio-compatible format
-        transform = metadata['transform']
-        crs = metadata['crs']
-        
-        # rasterio.mask expects geometries in the same CRS
-        geometries = [polygon]
+        nodata = metadata.get('nodata')
+        clipped_data = np.where(clip.mask, clip.view(data), nodata if nodata is not None else 0).astype(data.dtype)
         
-        # Create temporary dataset for masking
-        import rasterio
-        from rasterio.io import MemoryFile
+        clipped_metadata = metadata.copy()
+        clipped_metadata['transform'] = clip.transform
+        clipped_metadata['height'] = clipped_data.shape[0]
+        clipped_metadata['width'] = clipped_data.shape[1]
         
-        # Write to memory file
-        with MemoryFile() as memfile:
-            with memfile.open(
-                driver='GTiff',
-                height=data.shape[0],
-                width=data.shape[1],
-                count=1,
-                dtype=data.dtype,
-                crs=crs,
-                transform=transform,
-                nodata=metadata.get('nodata', 0)
-            ) as mem:
-                mem.write(data, 1)
-            
-            # Now mask using the memory file
-            with memfile.open() as mem:
-                clipped_data, clipped_transform = rasterio_mask(mem, geometries, crop=True)
-                clipped_data = clipped_data[0]  # Extract first band
-                
-                clipped_metadata = metadata.copy()
-                clipped_metadata['transform'] = clipped_transform
-                clipped_metadata['height'] = clipped_data.shape[0]
-                clipped_metadata['width'] = clipped_data.shape[1]
-                
-                logger.debug(f"Clipped data from {data.shape} to {clipped_data.shape}")
-                return clipped_data, clipped_metadata
+        logger.debug(f"Clipped data from {data.shape} to {clipped_data.shape}")
+        return clipped_data, clipped_metadata
     
     except Exception as e:
         logger.error(f"Failed to clip to polygon: {e}")
@@ -184,9 +244,9 @@ def compute_ndvi(
     Returns:
         NDVI array, same shape as input bands
     """
-    # Convert to float to avoid integer division issues
-    red = red.astype(np.float32)
-    nir = nir.astype(np.float32)
+    # Convert to float to avoid integer division issues (no copy if already float32)
+    red = red.astype(np.float32, copy=False)
+    nir = nir.astype(np.float32, copy=False)
     
     denominator = nir + red
     
@@ -270,6 +330,300 @@ def aggregate_ndvi(
     return result
 
 
+# ==============================================================================
+# Windowed (Block-by-Block) NDVI
+# ==============================================================================
+
+class NDVIAccumulator:
+    """
+    Online mean/std/min/max over NDVI values fed in blocks.
+
+    Uses Welford's update in its batched form (Chan et al.), so statistics
+    match a single pass over the concatenated values while only one block
+    is ever held in memory.
+    """
+
+    def __init__(self):
+        self.total_count = 0
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values: np.ndarray, total: Optional[int] = None) -> None:
+        """
+        Add a block of valid values.
+
+        Args:
+            values: Valid NDVI values from one block
+            total: Pixels considered in the block, valid or not (default: values.size)
+        """
+        self.total_count += values.size if total is None else total
+        n_b = values.size
+        if n_b == 0:
+            return
+        values = values.astype(np.float64, copy=False)
+        mean_b = float(values.mean())
+        m2_b = float(((values - mean_b) ** 2).sum())
+
+        n = self.count + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self._m2 += m2_b + delta * delta * self.count * n_b / n
+        self.count = n
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    @property
+    def std(self) -> float:
+        """Population standard deviation (matches np.std)."""
+        return float(np.sqrt(self._m2 / self.count)) if self.count else 0.0
+
+    def result(self, valid_pixel_threshold: float = 0.1) -> Dict[str, Optional[float]]:
+        """Statistics in the shape returned by aggregate_ndvi."""
+        valid_pixel_ratio = self.count / self.total_count if self.total_count > 0 else 0.0
+        result = {
+            'mean': None,
+            'std': None,
+            'valid_pixel_ratio': valid_pixel_ratio,
+            'min': None,
+            'max': None,
+            'count': self.total_count,
+            'valid_count': self.count
+        }
+        if valid_pixel_ratio >= valid_pixel_threshold and self.count > 0:
+            result['mean'] = float(self.mean)
+            result['std'] = self.std
+            result['min'] = float(self.min)
+            result['max'] = float(self.max)
+        else:
+            logger.warning(
+                f"Insufficient valid NDVI pixels: {valid_pixel_ratio:.2%} "
+                f"(threshold: {valid_pixel_threshold:.2%})"
+            )
+        return result
+
+
+def compute_ndvi_windowed(
+    red_band_path: str,
+    nir_band_path: str,
+    polygon_wkt: str,
+    valid_pixel_threshold: float = 0.1,
+    block_size: Optional[int] = None,
+    boa_add_offset: float = 0.0
+) -> Dict[str, Optional[float]]:
+    """
+    Aggregate NDVI over a polygon reading only the blocks that intersect it.
+
+    The polygon (in the bands' CRS, as for clip_to_polygon) selects a
+    bounding window, which is walked block by block along the raster's
+    internal tiling. Each block is masked to pixel centres inside the
+    polygon and fed to an NDVIAccumulator, so peak memory is bounded by the
+    block size rather than the scene size.
+
+    Args:
+        red_band_path: Path to Red band (B04) GeoTIFF
+        nir_band_path: Path to NIR band (B08) GeoTIFF
+        polygon_wkt: Site boundary as WKT polygon string
+        valid_pixel_threshold: Minimum valid pixel ratio required
+        block_size: Block edge in pixels for untiled rasters
+                    (default: FEATURE_CONFIG["ndvi"]["block_size"])
+        boa_add_offset: L2A BOA_ADD_OFFSET of the scene in DN (Scene.boa_add_offset)
+
+    Returns:
+        Dictionary in the shape returned by aggregate_ndvi
+    """
+    return compute_indices_windowed(
+        {'B04': red_band_path, 'B08': nir_band_path},
+        polygon_wkt,
+        indices=('ndvi',),
+        valid_pixel_threshold=valid_pixel_threshold,
+        block_size=block_size,
+        boa_add_offset=boa_add_offset
+    )['ndvi']
+
+
+# ==============================================================================
+# Multi-Index Spectral Pass
+# ==============================================================================
+
+# Index formulas on surface reflectance. Each entry lists the bands it
+# needs and the range outside which a value is treated as invalid.
+SPECTRAL_INDICES = {
+    'ndvi': {'bands': ('B04', 'B08'), 'valid_range': (-1.0, 1.0)},
+    'evi': {'bands': ('B02', 'B04', 'B08'), 'valid_range': (-1.0, 1.0)},
+    'savi': {'bands': ('B04', 'B08'), 'valid_range': (-1.5, 1.5)},
+    'ndwi': {'bands': ('B03', 'B08'), 'valid_range': (-1.0, 1.0)},  # McFeeters (Green/NIR)
+}
+
+SAVI_L = 0.5  # Soil brightness correction
+
+
+def _compute_index(
+    name: str,
+    bands: Dict[str, np.ndarray],
+    out: np.ndarray,
+    num: np.ndarray,
+    den: np.ndarray
+) -> np.ndarray:
+    """
+    Evaluate one index into `out` using preallocated scratch buffers.
+
+    All arrays are 1-D reflectance of the same length; division by zero
+    yields NaN.
+    """
+    if name == 'ndvi':
+        np.subtract(bands['B08'], bands['B04'], out=num)
+        np.add(bands['B08'], bands['B04'], out=den)
+    elif name == 'ndwi':
+        np.subtract(bands['B03'], bands['B08'], out=num)
+        np.add(bands['B03'], bands['B08'], out=den)
+    elif name == 'savi':
+        np.subtract(bands['B08'], bands['B04'], out=num)
+        num *= 1.0 + SAVI_L
+        np.add(bands['B08'], bands['B04'], out=den)
+        den += SAVI_L
+    elif name == 'evi':
+        # EVI = 2.5 * (NIR - Red) / (NIR + 6 Red - 7.5 Blue + 1)
+        np.subtract(bands['B08'], bands['B04'], out=num)
+        num *= 2.5
+        np.multiply(bands['B02'], -7.5, out=den)
+        den += bands['B08']
+        den += 1.0
+        np.multiply(bands['B04'], 6.0, out=out)
+        den += out
+    else:
+        raise ValueError(f"Unknown spectral index: {name}")
+
+    out.fill(np.nan)
+    np.divide(num, den, out=out, where=den != 0)
+    return out
+
+
+def compute_indices_windowed(
+    band_paths: Dict[str, str],
+    polygon_wkt: str,
+    indices: Tuple[str, ...] = ('ndvi', 'evi', 'savi', 'ndwi'),
+    valid_pixel_threshold: float = 0.1,
+    block_size: Optional[int] = None,
+    boa_add_offset: float = 0.0
+) -> Dict[str, Dict[str, Optional[float]]]:
+    """
+    Aggregate several spectral indices over a polygon in one windowed pass.
+
+    Walks the polygon's window block by block as compute_ndvi_windowed
+    does. Each required band is read once per block and masked once with a
+    shared polygon mask. Every requested index is then evaluated into
+    buffers preallocated for the largest block, so each extra index adds
+    arithmetic only. Reflectance is (DN + boa_add_offset) / reflectance_scale,
+    so scenes processed before and after baseline 04.00 are comparable.
+
+    Args:
+        band_paths: {Sentinel-2 band code: GeoTIFF path}, e.g. 'B04', 'B08';
+                    must cover the bands of every requested index
+        polygon_wkt: Site boundary as WKT polygon string (in the bands' CRS)
+        indices: Index names from SPECTRAL_INDICES
+        valid_pixel_threshold: Minimum valid pixel ratio required
+        block_size: Block edge in pixels for untiled rasters
+                    (default: FEATURE_CONFIG["ndvi"]["block_size"])
+        boa_add_offset: L2A BOA_ADD_OFFSET of the scene in DN (Scene.boa_add_offset)
+
+    Returns:
+        {index: dictionary in the shape returned by aggregate_ndvi}
+    """
+    if not RASTERIO_AVAILABLE:
+        raise ImportError("Rasterio is required for NDVI computation")
+    unknown = [name for name in indices if name not in SPECTRAL_INDICES]
+    if unknown:
+        raise ValueError(f"Unknown spectral index: {', '.join(unknown)}")
+    required = sorted({band for name in indices for band in SPECTRAL_INDICES[name]['bands']})
+    missing = [band for band in required if band not in band_paths]
+    if missing:
+        raise ValueError(f"Missing band paths for {', '.join(missing)}")
+    for band in required:
+        if not Path(band_paths[band]).exists():
+            raise FileNotFoundError(f"File not found: {band_paths[band]}")
+
+    polygon = wkt_loads(polygon_wkt)
+    if not polygon.is_valid:
+        raise ValueError(f"Invalid polygon WKT: {polygon_wkt}")
+    block_size = block_size or FEATURE_CONFIG["ndvi"]["block_size"]
+    scale = FEATURE_CONFIG["ndvi"]["reflectance_scale"]
+
+    accumulators = {name: NDVIAccumulator() for name in indices}
+    sources = {band: rasterio.open(band_paths[band]) for band in required}
+    try:
+        reference = sources[required[0]]
+        for band, src in sources.items():
+            if (src.shape, src.transform) != (reference.shape, reference.transform):
+                raise ValueError(
+                    f"Band grid mismatch: {required[0]} {reference.shape} vs {band} {src.shape}"
+                )
+
+        window = bounds_window(reference, polygon.bounds)
+        if window is None:
+            logger.warning("Polygon does not overlap the Sentinel-2 bands")
+            return {name: acc.result(valid_pixel_threshold) for name, acc in accumulators.items()}
+
+        block_shape = reference.block_shapes[0]
+        if block_shape[1] == reference.width:
+            # Striped (untiled) band: walk square chunks instead of full-width strips
+            block_shape = (block_size, block_size)
+        nodata = {
+            band: src.nodata if src.nodata is not None else NODATA_VALUE
+            for band, src in sources.items()
+        }
+        geometries = [mapping(polygon)]
+
+        # Buffers sized for the largest block, reused for every block and index
+        capacity = block_shape[0] * block_shape[1]
+        band_buffers = {band: np.empty(capacity, dtype=np.float32) for band in required}
+        index_buffers = {name: np.empty(capacity, dtype=np.float32) for name in indices}
+        num = np.empty(capacity, dtype=np.float32)
+        den = np.empty(capacity, dtype=np.float32)
+
+        for block in block_windows(window, block_shape):
+            if not polygon.intersects(box(*reference.window_bounds(block))):
+                continue
+            inside = geometry_mask(
+                geometries,
+                out_shape=(int(block.height), int(block.width)),
+                transform=reference.window_transform(block),
+                invert=True,
+            )
+            n_inside = int(inside.sum())
+            if n_inside == 0:
+                continue
+
+            reflectance = {}
+            band_ok = {}
+            for band, src in sources.items():
+                raw = src.read(1, window=block)[inside]
+                band_ok[band] = raw != nodata[band]
+                values = band_buffers[band][:n_inside]
+                np.add(raw, boa_add_offset, out=values, casting='unsafe')
+                values /= scale
+                reflectance[band] = values
+
+            for name in indices:
+                spec = SPECTRAL_INDICES[name]
+                result = _compute_index(
+                    name, reflectance, index_buffers[name][:n_inside], num[:n_inside], den[:n_inside]
+                )
+                low, high = spec['valid_range']
+                with np.errstate(invalid='ignore'):
+                    valid = (result >= low) & (result <= high)
+                for band in spec['bands']:
+                    valid &= band_ok[band]
+                accumulators[name].update(result[valid], total=n_inside)
+    finally:
+        for src in sources.values():
+            src.close()
+
+    return {name: acc.result(valid_pixel_threshold) for name, acc in accumulators.items()}
+
+
 # ==============================================================================
 # High-Level Pipeline Function
 # ==============================================================================
@@ -279,7 +633,8 @@ def compute_ndvi_for_site(
     red_band_path: str,
     nir_band_path: str,
     polygon_wkt: str,
-    valid_pixel_threshold: float = 0.1
+    valid_pixel_threshold: float = 0.1,
+    windowed: Optional[bool] = None
 ) -> Dict[str, Optional[float]]:
     """
     End-to-end NDVI computation for a water tower site.
@@ -290,6 +645,10 @@ def compute_ndvi_for_site(
     3. Compute NDVI = (NIR - Red) / (NIR + Red)
     4. Aggregate statistics (mean, std, valid pixel ratio)
     
+    In windowed mode (the default, see FEATURE_CONFIG["ndvi"]["windowed"])
+    steps 1-4 run block by block through compute_ndvi_windowed, reading only
+    the blocks that intersect the polygon.
+    
     Per specification: Always return None instead of throwing errors.
     Failures are logged; NDVI stats default to None if any step fails.
     
@@ -299,6 +658,7 @@ def compute_ndvi_for_site(
         nir_band_path: Path to NIR band (B08) GeoTIFF
         polygon_wkt: Site boundary as WKT polygon string
         valid_pixel_threshold: Minimum valid pixel ratio required
+        windowed: Use block-by-block reads (default: FEATURE_CONFIG["ndvi"]["windowed"])
     
     Returns:
         Dictionary with:
@@ -323,37 +683,24 @@ def compute_ndvi_for_site(
         'success': False
     }
     
+    if windowed is None:
+        windowed = FEATURE_CONFIG["ndvi"]["windowed"]
+    
     try:
-        # Step 1: Load Red and NIR bands
-        logger.debug(f"[{site_id}] Loading Red band from {red_band_path}")
-        red_data, red_metadata = load_sentinel2_band(red_band_path, band_index=1)
-        
-        logger.debug(f"[{site_id}] Loading NIR band from {nir_band_path}")
-        nir_data, nir_metadata = load_sentinel2_band(nir_band_path, band_index=1)
-        
-        # Verify bands have same shape
-        if red_data.shape != nir_data.shape:
-            logger.error(
-                f"[{site_id}] Band shape mismatch: Red {red_data.shape} vs NIR {nir_data.shape}"
+        if windowed:
+            logger.debug(f"[{site_id}] Computing NDVI block by block")
+            aggregated = compute_ndvi_windowed(
+                red_band_path,
+                nir_band_path,
+                polygon_wkt,
+                valid_pixel_threshold=valid_pixel_threshold
             )
-            return result
-        
-        # Step 2: Clip to polygon
-        logger.debug(f"[{site_id}] Clipping to polygon")
-        red_clipped, red_meta_clipped = clip_to_polygon(red_data, red_metadata, polygon_wkt)
-        nir_clipped, nir_meta_clipped = clip_to_polygon(nir_data, nir_metadata, polygon_wkt)
-        
-        if red_clipped is None or nir_clipped is None:
-            logger.error(f"[{site_id}] Failed to clip bands to polygon")
-            return result
-        
-        # Step 3: Compute NDVI
-        logger.debug(f"[{site_id}] Computing NDVI")
-        ndvi = compute_ndvi(red_clipped, nir_clipped, handle_division_by_zero=True)
-        
-        # Step 4: Aggregate statistics
-        logger.debug(f"[{site_id}] Aggregating NDVI statistics")
-        aggregated = aggregate_ndvi(ndvi, valid_pixel_threshold=valid_pixel_threshold)
+        else:
+            aggregated = _compute_ndvi_in_memory(
+                site_id, red_band_path, nir_band_path, polygon_wkt, valid_pixel_threshold
+            )
+            if aggregated is None:
+                return result
         
         result['ndvi_mean'] = aggregated['mean']
         result['ndvi_std'] = aggregated['std']
@@ -374,6 +721,352 @@ def compute_ndvi_for_site(
     return result
 
 
+def _compute_ndvi_in_memory(
+    site_id: str,
+    red_band_path: str,
+    nir_band_path: str,
+    polygon_wkt: str,
+    valid_pixel_threshold: float
+) -> Optional[Dict[str, Optional[float]]]:
+    """Full-band load, clip, compute and aggregate (None if a step fails)."""
+    # Step 1: Load Red and NIR bands
+    logger.debug(f"[{site_id}] Loading Red band from {red_band_path}")
+    red_data, red_metadata = load_sentinel2_band(red_band_path, band_index=1)
+    
+    logger.debug(f"[{site_id}] Loading NIR band from {nir_band_path}")
+    nir_data, nir_metadata = load_sentinel2_band(nir_band_path, band_index=1)
+    
+    # Verify bands have same shape
+    if red_data.shape != nir_data.shape:
+        logger.error(
+            f"[{site_id}] Band shape mismatch: Red {red_data.shape} vs NIR {nir_data.shape}"
+        )
+        return None
+    
+    # Step 2: Clip to polygon (one window + mask shared by both bands)
+    logger.debug(f"[{site_id}] Clipping to polygon")
+    clip = polygon_clip(red_metadata, polygon_wkt)
+    
+    if clip is None:
+        logger.error(f"[{site_id}] Failed to clip bands to polygon")
+        return None
+    
+    # Step 3: Compute NDVI on pixels inside the polygon; nodata pixels become NaN
+    logger.debug(f"[{site_id}] Computing NDVI")
+    red_values, nir_values = clip.values(red_data), clip.values(nir_data)
+    ndvi = compute_ndvi(red_values, nir_values, handle_division_by_zero=True)
+    red_nodata = red_metadata.get('nodata')
+    nir_nodata = nir_metadata.get('nodata')
+    ndvi[
+        (red_values == (NODATA_VALUE if red_nodata is None else red_nodata))
+        | (nir_values == (NODATA_VALUE if nir_nodata is None else nir_nodata))
+    ] = np.nan
+    
+    # Step 4: Aggregate statistics
+    logger.debug(f"[{site_id}] Aggregating NDVI statistics")
+    return aggregate_ndvi(ndvi, valid_pixel_threshold=valid_pixel_threshold)
+
+
+def compute_ndvi_from_catalog(
+    geometry: Dict[str, Any],
+    start_date: str,
+    end_date: str,
+    valid_pixel_threshold: float = 0.1,
+    catalog: Optional[SceneCatalog] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    NDVI over a WGS84 site geometry from the local Sentinel-2 scene catalog.
+    
+    Scenes intersecting the site within the date window are tried least
+    cloudy first; the first with enough valid pixels wins.
+    
+    Args:
+        geometry: Site GeoJSON geometry (WGS84)
+        start_date: Window start (YYYY-MM-DD)
+        end_date: Window end (YYYY-MM-DD)
+        valid_pixel_threshold: Minimum valid pixel ratio required
+        catalog: SceneCatalog to search (default: get_scene_catalog())
+    
+    Returns:
+        Dict shaped like gee_ndvi.compute_ndvi_stats plus 'scene_id' and
+        'scene_date', or None if no local scene covers the site
+    """
+    catalog = catalog if catalog is not None else get_scene_catalog()
+    scenes = catalog.search(
+        geometry,
+        start_date,
+        end_date,
+        max_cloud_cover=FEATURE_CONFIG["ndvi"]["max_cloud_cover"],
+        bands=NDVI_BANDS
+    )
+    for scene in scenes:
+        polygon = shape(transform_geom("EPSG:4326", scene.crs, geometry)) if scene.crs else shape(geometry)
+        try:
+            stats = compute_ndvi_windowed(
+                scene.assets['B04'],
+                scene.assets['B08'],
+                polygon.wkt,
+                valid_pixel_threshold=valid_pixel_threshold,
+                boa_add_offset=scene.boa_add_offset
+            )
+        except Exception as e:
+            logger.warning(f"Local NDVI failed for scene {scene.scene_id}: {e}")
+            continue
+        if stats['mean'] is not None:
+            return {
+                'ndvi_mean': stats['mean'],
+                'ndvi_std': stats['std'],
+                'collection_used': 'local:sentinel2',
+                'start_date': start_date,
+                'end_date': end_date,
+                'scene_id': scene.scene_id,
+                'scene_date': scene.datetime.date().isoformat(),
+            }
+    return None
+
+
+# ==============================================================================
+# Temporal Composites
+# ==============================================================================
+
+def _cloud_free(
+    scene: Dict[str, str],
+    bounds: Tuple[float, float, float, float],
+    out_shape: Tuple[int, int]
+) -> Optional[np.ndarray]:
+    """
+    Clear-sky mask for a tile from the scene's SCL or QA60 band, or None if
+    it has neither. Coarser masks (SCL is 20 m) are read onto the tile grid
+    with nearest-neighbour resampling.
+    """
+    band = 'SCL' if 'SCL' in scene else 'QA60' if 'QA60' in scene else None
+    if band is None:
+        return None
+    with rasterio.open(scene[band]) as src:
+        data = src.read(
+            1,
+            window=src.window(*bounds),
+            out_shape=out_shape,
+            resampling=Resampling.nearest,
+            boundless=True,
+            fill_value=0 if band == 'SCL' else QA60_CLOUD_BITS,
+        )
+    if band == 'SCL':
+        return ~np.isin(data, SCL_MASKED_CLASSES)
+    return (data & QA60_CLOUD_BITS) == 0
+
+
+def _composite_tile(
+    args: Tuple[Tuple[int, int, int, int], Sequence[Dict[str, str]], Sequence[float], str]
+) -> Tuple[Tuple[int, int, int, int], np.ndarray, np.ndarray]:
+    """
+    Per-pixel NDVI composite for one tile across all scenes (pool worker).
+
+    Args:
+        args: ((col_off, row_off, width, height), scenes, BOA offsets per scene, method)
+
+    Returns:
+        (tile, composite float32 with NaN where no clear observation,
+         clear observation count uint16)
+    """
+    tile, scenes, boa_offsets, method = args
+    window = Window(*tile)
+    shape_ = (tile[3], tile[2])
+    stack = np.full((len(scenes),) + shape_, np.nan, dtype=np.float32)
+
+    for i, (scene, boa_offset) in enumerate(zip(scenes, boa_offsets)):
+        with rasterio.open(scene['B04']) as red_src, rasterio.open(scene['B08']) as nir_src:
+            red = red_src.read(1, window=window).astype(np.float32)
+            nir = nir_src.read(1, window=window).astype(np.float32)
+            bounds = red_src.window_bounds(window)
+            red_nodata = red_src.nodata if red_src.nodata is not None else NODATA_VALUE
+            nir_nodata = nir_src.nodata if nir_src.nodata is not None else NODATA_VALUE
+
+        valid = (red != red_nodata) & (nir != nir_nodata)
+        red += boa_offset
+        nir += boa_offset
+        denominator = nir + red
+        valid &= denominator != 0
+        clear = _cloud_free(scene, bounds, shape_)
+        if clear is not None:
+            valid &= clear
+        np.divide(nir - red, denominator, out=stack[i], where=valid)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN pixels
+        composite = np.nanmedian(stack, axis=0) if method == 'median' else np.nanmean(stack, axis=0)
+    count = np.isfinite(stack).sum(axis=0).astype(np.uint16)
+    return tile, composite.astype(np.float32), count
+
+
+def _run_tiles(
+    tasks: Iterator[Tuple[Any, ...]],
+    max_workers: int
+) -> Iterator[Tuple[Tuple[int, int, int, int], np.ndarray, np.ndarray]]:
+    """
+    Yield composited tiles as they finish.
+
+    Runs inline for a single worker; otherwise keeps at most two tiles per
+    worker in flight so finished tiles never pile up in memory.
+    """
+    if max_workers <= 1:
+        for task in tasks:
+            yield _composite_tile(task)
+        return
+
+    # spawn: forked children would inherit GDAL handles and app threads
+    with ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        pending = set()
+        for task in tasks:
+            pending.add(pool.submit(_composite_tile, task))
+            if len(pending) >= 2 * max_workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in pending:
+            yield future.result()
+
+
+def compute_ndvi_composite(
+    scenes: Sequence[Dict[str, str]],
+    output_path: str,
+    polygon_wkt: Optional[str] = None,
+    method: str = 'median',
+    tile_size: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    valid_pixel_threshold: float = 0.1,
+    boa_add_offsets: Optional[Sequence[float]] = None
+) -> Dict[str, Any]:
+    """
+    Per-pixel NDVI composite (median or mean) across many scenes on one grid.
+    
+    Streams the scenes tile by tile: each tile reads its window from every
+    scene, drops cloudy pixels using the scene's SCL (or QA60) band, and
+    reduces the stack, so memory is bounded by tile size x scene count.
+    Tiles run in a process pool and are written to a tiled GeoTIFF as they
+    finish (band 1: composite NDVI, band 2: clear observation count).
+    
+    Args:
+        scenes: Band paths per scene ({'B04', 'B08'} plus optional 'SCL' or
+                'QA60'), e.g. Scene.assets from the scene catalog
+        output_path: GeoTIFF to write
+        polygon_wkt: Restrict to this polygon's window (in the scenes' CRS);
+                     also the area the returned statistics cover
+        method: 'median' or 'mean'
+        tile_size: Tile edge in pixels (default: FEATURE_CONFIG["ndvi"]["composite_tile_size"])
+        max_workers: Worker processes (default: FEATURE_CONFIG["ndvi"]["composite_workers"])
+        valid_pixel_threshold: Minimum valid pixel ratio for the statistics
+        boa_add_offsets: L2A BOA_ADD_OFFSET (DN) per scene, e.g.
+                         Scene.boa_add_offset (default: no offset)
+    
+    Returns:
+        Dict with 'path', 'method', 'scene_count' and composite statistics
+        in the shape returned by aggregate_ndvi
+    
+    Raises:
+        ValueError: If the method is unknown or no scenes are given
+    """
+    if not RASTERIO_AVAILABLE:
+        raise ImportError("Rasterio is required for NDVI computation")
+    if method not in ('median', 'mean'):
+        raise ValueError(f"Unknown composite method: {method}")
+    if not scenes:
+        raise ValueError("No scenes to composite")
+    tile_size = tile_size or FEATURE_CONFIG["ndvi"]["composite_tile_size"]
+    max_workers = max_workers or FEATURE_CONFIG["ndvi"]["composite_workers"] or os.cpu_count() or 1
+
+    # The first scene defines the grid; scenes on other grids are skipped
+    with rasterio.open(scenes[0]['B04']) as ref:
+        profile = {'crs': ref.crs, 'transform': ref.transform, 'width': ref.width, 'height': ref.height}
+        grid = (ref.crs, ref.transform, ref.shape)
+        polygon = wkt_loads(polygon_wkt) if polygon_wkt else None
+        window = bounds_window(ref, polygon.bounds) if polygon is not None else Window(0, 0, ref.width, ref.height)
+    boa_add_offsets = list(boa_add_offsets) if boa_add_offsets is not None else [0.0] * len(scenes)
+    same_grid, same_grid_offsets = [], []
+    for scene, boa_offset in zip(scenes, boa_add_offsets):
+        with rasterio.open(scene['B04']) as src:
+            if (src.crs, src.transform, src.shape) == grid:
+                same_grid.append(dict(scene))
+                same_grid_offsets.append(float(boa_offset))
+            else:
+                logger.warning(f"Skipping scene off the composite grid: {scene['B04']}")
+
+    accumulator = NDVIAccumulator()
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    if window is None:
+        logger.warning("Polygon does not overlap the composite scenes")
+        return {'path': None, 'method': method, 'scene_count': len(same_grid), **accumulator.result(valid_pixel_threshold)}
+
+    col0, row0 = int(window.col_off), int(window.row_off)
+    out_transform = rasterio.windows.transform(window, profile['transform'])
+    tasks = (
+        ((int(t.col_off), int(t.row_off), int(t.width), int(t.height)), same_grid, same_grid_offsets, method)
+        for t in block_windows(window, (tile_size, tile_size))
+    )
+
+    with rasterio.open(
+        output_path, 'w', driver='GTiff', count=2, dtype='float32', nodata=np.nan,
+        width=int(window.width), height=int(window.height), crs=profile['crs'], transform=out_transform,
+        tiled=True, blockxsize=256, blockysize=256, compress='deflate',
+    ) as dst:
+        dst.set_band_description(1, f'ndvi_{method}')
+        dst.set_band_description(2, 'clear_observations')
+        for (col, row, width, height), composite, count in _run_tiles(tasks, max_workers):
+            out_window = Window(col - col0, row - row0, width, height)
+            dst.write(composite, 1, window=out_window)
+            dst.write(count.astype(np.float32), 2, window=out_window)
+
+            inside = np.ones(composite.shape, dtype=bool)
+            if polygon is not None:
+                inside = geometry_mask(
+                    [mapping(polygon)], out_shape=composite.shape,
+                    transform=rasterio.windows.transform(Window(col, row, width, height), profile['transform']),
+                    invert=True,
+                )
+            values = composite[inside]
+            accumulator.update(values[np.isfinite(values)], total=int(inside.sum()))
+
+    logger.info(f"Wrote {method} NDVI composite of {len(same_grid)} scene(s) to {output_path}")
+    return {
+        'path': str(output_path),
+        'method': method,
+        'scene_count': len(same_grid),
+        **accumulator.result(valid_pixel_threshold),
+    }
+
+
+def compute_ndvi_composite_from_catalog(
+    geometry: Dict[str, Any],
+    start_date: str,
+    end_date: str,
+    output_path: str,
+    method: str = 'median',
+    catalog: Optional[SceneCatalog] = None,
+    **kwargs
+) -> Optional[Dict[str, Any]]:
+    """
+    Seasonal composite over a WGS84 site geometry from catalogued scenes.
+    
+    Uses every scene of the best-matching grid (tile) in the window; extra
+    keyword arguments go to compute_ndvi_composite.
+    
+    Returns:
+        compute_ndvi_composite result, or None if no local scene covers the site
+    """
+    catalog = catalog if catalog is not None else get_scene_catalog()
+    scenes = catalog.search(geometry, start_date, end_date, bands=NDVI_BANDS)
+    if not scenes:
+        return None
+    crs = scenes[0].crs
+    scenes = sorted((s for s in scenes if s.crs == crs), key=lambda s: s.datetime)
+    polygon = shape(transform_geom("EPSG:4326", crs, geometry)) if crs else shape(geometry)
+    return compute_ndvi_composite(
+        [scene.assets for scene in scenes], output_path, polygon_wkt=polygon.wkt, method=method,
+        boa_add_offsets=[scene.boa_add_offset for scene in scenes], **kwargs
+    )
+
+
 # ==============================================================================
 # Utility: Save NDVI for Visualization
 # ==============================================================================
@@ -381,19 +1074,36 @@ def compute_ndvi_for_site(
 def save_ndvi_array(
     ndvi: np.ndarray,
     output_path: str,
-    metadata: Optional[Dict[str, Any]] = None
+    metadata: Optional[Dict[str, Any]] = None,
+    cog: Optional[bool] = None,
+    compress: Optional[str] = None,
+    quantize: Optional[bool] = None
 ) -> bool:
     """
     Save NDVI array as a GeoTIFF for visualization and validation.
     
+    By default (FEATURE_CONFIG["ndvi"]["output"]) writes a Cloud-Optimized
+    GeoTIFF: tiled, compressed, with internal overviews, so map clients
+    reading a small area or a low zoom level touch only a few blocks.
+    With quantize, NDVI is stored as int16 with scale/offset tags
+    (value = stored * NDVI_QUANT_SCALE), about 4x smaller than float32.
+    
     Args:
         ndvi: NDVI array
         output_path: Path to save GeoTIFF
         metadata: Optional rasterio metadata (crs, transform, etc.)
+        cog: Write a COG (False: plain float32 GeoTIFF as before)
+        compress: 'deflate' or 'zstd'
+        quantize: Store int16 with scale/offset instead of float32
     
     Returns:
         True if successful, False otherwise
     """
+    output = FEATURE_CONFIG["ndvi"]["output"]
+    cog = output["cog"] if cog is None else cog
+    compress = compress or output["compress"]
+    quantize = output["quantize"] if quantize is None else quantize
+    
     try:
         import rasterio
         from rasterio.transform import Affine
@@ -401,6 +1111,19 @@ def save_ndvi_array(
         output_path = Path(output_path)
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
+        if cog:
+            metadata = metadata or {}
+            _write_ndvi_cog(
+                ndvi,
+                output_path,
+                crs=metadata.get('crs'),
+                transform=metadata.get('transform') or Affine.identity(),
+                compress=compress,
+                quantize=quantize
+            )
+            logger.info(f"Saved NDVI COG ({compress}, {'int16' if quantize else 'float32'}) to {output_path}")
+            return True
+        
         # Default metadata if not provided
         if metadata is None:
             metadata = {
@@ -422,3 +1145,58 @@ def save_ndvi_array(
     except Exception as e:
         logger.error(f"Failed to save NDVI array: {e}")
         return False
+
+
+def _write_ndvi_cog(
+    ndvi: np.ndarray,
+    output_path: Path,
+    crs: Any,
+    transform: Any,
+    compress: str,
+    quantize: bool
+) -> None:
+    """
+    Write NDVI as a COG: build a tiled copy with overviews in memory, then
+    copy it out with overviews placed ahead of full-resolution data.
+    """
+    from rasterio.io import MemoryFile
+    from rasterio.shutil import copy as rio_copy
+    
+    output = FEATURE_CONFIG["ndvi"]["output"]
+    block = output["blocksize"]
+    height, width = ndvi.shape
+    
+    if quantize:
+        data = np.full(ndvi.shape, NDVI_INT16_NODATA, dtype=np.int16)
+        finite = np.isfinite(ndvi)
+        data[finite] = np.round(np.clip(ndvi[finite], -1.0, 1.0) / NDVI_QUANT_SCALE)
+        dtype, nodata, predictor = 'int16', NDVI_INT16_NODATA, 2
+    else:
+        data = ndvi.astype(np.float32, copy=False)
+        dtype, nodata, predictor = 'float32', np.nan, 3
+    
+    # Halve until the coarsest overview fits in a single block
+    factors = []
+    factor = 2
+    while max(height, width) / (factor // 2) > block:
+        factors.append(factor)
+        factor *= 2
+    
+    with MemoryFile() as memfile:
+        with memfile.open(
+            driver='GTiff', width=width, height=height, count=1, dtype=dtype, nodata=nodata,
+            crs=crs, transform=transform, tiled=True, blockxsize=block, blockysize=block,
+        ) as tmp:
+            tmp.write(data, 1)
+            if quantize:
+                tmp.scales = (NDVI_QUANT_SCALE,)
+                tmp.offsets = (0.0,)
+            if factors:
+                tmp.build_overviews(factors, Resampling[output["overview_resampling"]])
+        
+        with memfile.open() as tmp:
+            rio_copy(
+                tmp, output_path, driver='GTiff', copy_src_overviews=True,
+                tiled=True, blockxsize=block, blockysize=block,
+                compress=compress.upper(), predictor=predictor,
+            )
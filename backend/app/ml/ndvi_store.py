@@ -0,0 +1,211 @@
+"""
+NDVI Result Store
+
+Persistent store for Earth Engine NDVI statistics, keyed by geometry hash,
+collection, date window, scale and cloud-mask version.
+
+NDVI over a window that has closed (its end date plus an ingestion lag is in
+the past) cannot change, so such results are kept forever; only results for
+open windows expire after `ttl_hours` and get recomputed. Lookups go through
+an in-process LRU front, then the Mongo collection (shared by all workers,
+enabled at startup) or, without Mongo, one JSON file per key on disk.
+
+Mongo documents carry the key components as fields so stored results can be
+queried per tower or window; open-window documents get an `expires_at` that
+Mongo's TTL monitor honours, closed-window documents have none.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .cache import DiskTier
+from .config import CACHE_CONFIG
+from .utils import setup_logger
+
+logger = setup_logger(__name__)
+
+NDVI_STORE_COLLECTION = os.getenv("NDVI_STORE_COLLECTION", "ndvi_results")
+NDVI_STORE_MEMORY_ENTRIES = int(os.getenv("NDVI_STORE_MEMORY_ENTRIES", "4096"))
+# Sentinel-2 scenes can be ingested days after acquisition
+NDVI_CLOSED_WINDOW_LAG_DAYS = int(os.getenv("NDVI_CLOSED_WINDOW_LAG_DAYS", "5"))
+
+
+# ============================================================================
+# KEYS
+# ============================================================================
+
+def geometry_hash(geometry: Optional[Dict[str, Any]], point: Optional[list] = None) -> str:
+    """Stable hash of a GeoJSON geometry (or of a [lat, lon, buffer_m] point)."""
+    payload = json.dumps({"geometry": geometry, "point": None if geometry else point}, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:20]
+
+
+@dataclass(frozen=True)
+class NDVIKey:
+    """Everything an NDVI result depends on."""
+    geometry_hash: str
+    collection: str
+    start_date: str
+    end_date: str
+    scale: int
+    mask_version: str
+
+    @property
+    def id(self) -> str:
+        payload = json.dumps(asdict(self), sort_keys=True)
+        return f"ndvi_{hashlib.sha1(payload.encode('utf-8')).hexdigest()[:20]}"
+
+    def is_closed(self, today: Optional[date] = None) -> bool:
+        """True once no new imagery can arrive for the window."""
+        today = today or datetime.now(timezone.utc).date()
+        end = date.fromisoformat(self.end_date[:10])
+        return end + timedelta(days=NDVI_CLOSED_WINDOW_LAG_DAYS) < today
+
+
+# ============================================================================
+# STORE
+# ============================================================================
+
+class NDVIResultStore:
+    """
+    Memory LRU in front of Mongo (or disk) for NDVI results.
+
+    Stored entries look like {"result": {...}, "computed_at": <ISO-8601>,
+    "expires_at": <ISO-8601> or None}.
+    """
+
+    def __init__(self, cache_dir: Path, ttl_hours: float, memory_entries: int = NDVI_STORE_MEMORY_ENTRIES):
+        self.ttl_hours = ttl_hours
+        self.memory_entries = memory_entries
+        self.disk = DiskTier(Path(cache_dir))
+        self.collection = None
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, db) -> None:
+        """Persist results in db[NDVI_STORE_COLLECTION] instead of on disk."""
+        try:
+            collection = db[NDVI_STORE_COLLECTION]
+            collection.create_index("expires_at", expireAfterSeconds=0)
+            collection.create_index([("geometry_hash", 1), ("start_date", 1), ("end_date", 1)])
+            self.collection = collection
+            logger.info(f"NDVI result store persisted in Mongo ({NDVI_STORE_COLLECTION})")
+        except Exception as e:
+            self.collection = None
+            logger.warning(f"Mongo NDVI result store unavailable, using disk: {e}")
+
+    # ------------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------------
+
+    @staticmethod
+    def _is_fresh(entry: Dict[str, Any], refresh_within_hours: float) -> bool:
+        expires_at = entry.get("expires_at")
+        if expires_at is None:
+            return True
+        remaining = datetime.fromisoformat(expires_at) - datetime.now(timezone.utc)
+        return remaining > timedelta(hours=refresh_within_hours)
+
+    def _read_persistent(self, key: NDVIKey) -> Optional[Dict[str, Any]]:
+        if self.collection is None:
+            return self.disk.get(key.id)
+        doc = self.collection.find_one({"_id": key.id})
+        if not doc:
+            return None
+        expires_at = doc.get("expires_at")
+        if expires_at is not None and expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        return {
+            "result": doc["result"],
+            "computed_at": doc["computed_at"],
+            "expires_at": expires_at.isoformat() if expires_at else None,
+        }
+
+    def get(self, key: NDVIKey, refresh_within_hours: float = 0.0) -> Optional[Dict[str, Any]]:
+        """
+        Stored result for a key, or None if absent or expired.
+
+        Args:
+            key: Request key
+            refresh_within_hours: Treat open-window results expiring within
+                this many hours as misses (closed windows never expire)
+        """
+        if not CACHE_CONFIG["enabled"]:
+            return None
+        with self._lock:
+            entry = self._memory.get(key.id)
+            if entry is not None:
+                self._memory.move_to_end(key.id)
+
+        if entry is None:
+            try:
+                entry = self._read_persistent(key)
+            except Exception as e:
+                logger.warning(f"Failed to read NDVI result {key.id}: {e}")
+                entry = None
+            if entry is not None:
+                self._remember(key.id, entry)
+
+        if entry is None or not self._is_fresh(entry, refresh_within_hours):
+            self.misses += 1
+            return None
+        self.hits += 1
+        # Callers get their own copy; closed-window entries are served forever
+        return copy.deepcopy(entry["result"])
+
+    # ------------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------------
+
+    def _remember(self, key_id: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._memory[key_id] = entry
+            self._memory.move_to_end(key_id)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def put(self, key: NDVIKey, result: Dict[str, Any]) -> None:
+        """Store a result; closed windows are kept forever, open ones for ttl_hours."""
+        if not CACHE_CONFIG["enabled"]:
+            return
+        now = datetime.now(timezone.utc)
+        expires_at = None if key.is_closed(now.date()) else now + timedelta(hours=self.ttl_hours)
+        result = copy.deepcopy(result)
+        entry = {
+            "result": result,
+            "computed_at": now.isoformat(),
+            "expires_at": expires_at.isoformat() if expires_at else None,
+        }
+        self._remember(key.id, entry)
+        try:
+            if self.collection is None:
+                self.disk.set(key.id, entry, self.ttl_hours, json.dumps(entry))
+                return
+            doc = {"_id": key.id, **asdict(key), "result": result, "computed_at": entry["computed_at"]}
+            if expires_at is not None:
+                doc["expires_at"] = expires_at
+            self.collection.replace_one({"_id": key.id}, doc, upsert=True)
+        except Exception as e:
+            logger.warning(f"Failed to persist NDVI result {key.id}: {e}")
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_entries": len(self._memory),
+            "backend": "mongo" if self.collection is not None else "disk",
+        }
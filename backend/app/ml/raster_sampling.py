@@ -0,0 +1,161 @@
+"""
+Raster Sampling Helpers
+
+Windowed, vectorised reads shared by the local raster stores (SoilGrids,
+DEM). Callers pass open rasterio datasets; nothing here opens files.
+
+- pixel_indices: WGS84 points -> (row, col) on a raster's grid
+- read_pixels: values at many pixels from one bounding window (or
+  single-pixel reads when the points are too spread out)
+- polygon_window: bounding window of a polygon plus its pixel-centre mask
+- block_windows: split a window along a raster's block grid
+"""
+
+from typing import Any, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+try:
+    from rasterio.errors import WindowError
+    from rasterio.features import geometry_mask
+    from rasterio.transform import rowcol
+    from rasterio.warp import transform as transform_coords, transform_geom
+    from rasterio.windows import Window, from_bounds
+    RASTERIO_AVAILABLE = True
+except ImportError:
+    RASTERIO_AVAILABLE = False
+from shapely.geometry import mapping, shape
+
+# Bounding windows larger than this are read point by point instead
+MAX_WINDOW_CELLS = 1_000_000
+
+
+def _is_wgs84(src) -> bool:
+    return src.crs is None or src.crs.to_epsg() == 4326
+
+
+def pixel_indices(src, lats: np.ndarray, lons: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pixel row/col for WGS84 points on `src`'s grid.
+
+    Returns:
+        (rows, cols, inside) where inside marks points on the raster
+    """
+    xs, ys = lons, lats
+    if not _is_wgs84(src):
+        xs, ys = transform_coords("EPSG:4326", src.crs, lons.tolist(), lats.tolist())
+    rows, cols = (np.asarray(a, dtype=int) for a in rowcol(src.transform, xs, ys))
+    inside = (rows >= 0) & (rows < src.height) & (cols >= 0) & (cols < src.width)
+    return rows, cols, inside
+
+
+def read_window(src, window, band: int = 1) -> np.ndarray:
+    """Read a window as float with nodata as NaN."""
+    data = src.read(band, window=window, masked=True)
+    return np.ma.filled(data.astype(float), np.nan)
+
+
+def read_pixels(
+    src,
+    rows: np.ndarray,
+    cols: np.ndarray,
+    inside: np.ndarray,
+    band: int = 1
+) -> np.ndarray:
+    """
+    Values at the given pixels (NaN for points outside or nodata).
+
+    Reads one bounding window when it stays under MAX_WINDOW_CELLS, which
+    serves nearby sites with a single I/O; otherwise one pixel per point.
+    """
+    values = np.full(rows.shape, np.nan)
+    if not inside.any():
+        return values
+
+    r, c = rows[inside], cols[inside]
+    r0, r1, c0, c1 = r.min(), r.max(), c.min(), c.max()
+    if (r1 - r0 + 1) * (c1 - c0 + 1) <= MAX_WINDOW_CELLS:
+        data = read_window(src, Window(c0, r0, c1 - c0 + 1, r1 - r0 + 1), band)
+        values[inside] = data[r - r0, c - c0]
+    else:
+        values[inside] = [read_window(src, Window(ci, ri, 1, 1), band)[0, 0] for ri, ci in zip(r, c)]
+    return values
+
+
+def _outer_window(window: "Window") -> "Window":
+    """Smallest whole-pixel window containing a fractional one."""
+    col_off, row_off = np.floor(window.col_off), np.floor(window.row_off)
+    width = np.ceil(window.col_off + window.width) - col_off
+    height = np.ceil(window.row_off + window.height) - row_off
+    return Window(int(col_off), int(row_off), int(width), int(height))
+
+
+def bounds_window(src, bounds: Sequence[float]) -> Optional["Window"]:
+    """
+    Whole-pixel window covering (left, bottom, right, top) in `src`'s CRS,
+    clipped to the raster, or None if the bounds miss it.
+    """
+    return grid_bounds_window(bounds, src.transform, src.width, src.height)
+
+
+def grid_bounds_window(bounds: Sequence[float], transform, width: int, height: int) -> Optional["Window"]:
+    """bounds_window for an in-memory grid described by its transform and size."""
+    window = _outer_window(from_bounds(*bounds, transform=transform))
+    try:
+        window = window.intersection(Window(0, 0, width, height))
+    except WindowError:
+        return None
+    if window.width < 1 or window.height < 1:
+        return None
+    return window
+
+
+def block_windows(window: "Window", block_shape: Tuple[int, int]) -> Iterator["Window"]:
+    """
+    Split a window into pieces aligned to a (rows, cols) block grid, so each
+    piece decodes at most one internal tile of a tiled GeoTIFF.
+    """
+    block_rows, block_cols = block_shape
+    row_start, col_start = int(window.row_off), int(window.col_off)
+    row_stop, col_stop = row_start + int(window.height), col_start + int(window.width)
+    for row in range(row_start - row_start % block_rows, row_stop, block_rows):
+        r0, r1 = max(row, row_start), min(row + block_rows, row_stop)
+        for col in range(col_start - col_start % block_cols, col_stop, block_cols):
+            c0, c1 = max(col, col_start), min(col + block_cols, col_stop)
+            yield Window(c0, r0, c1 - c0, r1 - r0)
+
+
+def polygon_window(
+    src,
+    geometry: Any,
+    geometry_crs: Optional[str] = "EPSG:4326"
+) -> Optional[Tuple["Window", np.ndarray]]:
+    """
+    Bounding window of a polygon on `src` and the mask of pixels whose
+    centres fall inside it.
+
+    Args:
+        src: Open rasterio dataset
+        geometry: GeoJSON dict or shapely geometry
+        geometry_crs: CRS of the geometry (None if already in `src`'s CRS)
+
+    Returns:
+        (window, mask), or None if the polygon misses the raster or
+        covers no pixel centre
+    """
+    geom = shape(geometry) if isinstance(geometry, dict) else geometry
+    if geometry_crs is not None and src.crs is not None and src.crs.to_string() != geometry_crs:
+        geom = shape(transform_geom(geometry_crs, src.crs, mapping(geom)))
+
+    window = bounds_window(src, geom.bounds)
+    if window is None:
+        return None
+
+    mask = geometry_mask(
+        [mapping(geom)],
+        out_shape=(int(window.height), int(window.width)),
+        transform=src.window_transform(window),
+        invert=True,
+    )
+    if not mask.any():
+        return None
+    return window, mask
@@ -0,0 +1,111 @@
+"""
+Provider Rate Limiting
+
+Sliding-window limiters that keep concurrent callers within the documented
+request limits of each provider in API_ENDPOINTS (e.g. NASA POWER: 40
+requests/minute). Limiters are process-wide and shared by every client
+instance for a provider; they do not coordinate across processes, so with N
+uvicorn workers a provider can see up to N times its limit.
+"""
+
+import asyncio
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+from .config import API_ENDPOINTS
+from .utils import setup_logger
+
+logger = setup_logger(__name__)
+
+_PERIOD_SECONDS = {
+    "second": 1.0,
+    "minute": 60.0,
+    "hour": 3600.0,
+    "day": 86400.0,
+}
+
+_RATE_LIMIT_PATTERN = re.compile(r"([\d,]+)\s*requests?\s*/\s*(second|minute|hour|day)", re.IGNORECASE)
+
+
+def parse_rate_limit(rate_limit: Optional[str]) -> Optional[Tuple[int, float]]:
+    """
+    Parse a human-readable limit such as "40 requests/minute".
+
+    Args:
+        rate_limit: Limit string from API_ENDPOINTS
+
+    Returns:
+        (request_count, period_seconds), or None if unlimited/unparseable
+    """
+    if not rate_limit:
+        return None
+    match = _RATE_LIMIT_PATTERN.search(rate_limit)
+    if not match:
+        return None
+    count = int(match.group(1).replace(",", ""))
+    if count <= 0:
+        return None
+    return count, _PERIOD_SECONDS[match.group(2).lower()]
+
+
+class SlidingWindowLimiter:
+    """
+    At most `count` requests in any `period_seconds` window.
+
+    Start times of the last `count` requests are kept; a new request waits
+    until the oldest of them leaves the window, so the documented limit holds
+    over every window, including right after a cold start. State is guarded
+    by a threading lock so the limiter can be shared across event loops and
+    threads.
+    """
+
+    def __init__(self, count: int, period_seconds: float):
+        self.count = count
+        self.period = period_seconds
+        self.started: "deque[float]" = deque()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Record a request if the window has room; otherwise return seconds until it does."""
+        with self._lock:
+            now = time.monotonic()
+            while self.started and self.started[0] <= now - self.period:
+                self.started.popleft()
+            if len(self.started) < self.count:
+                self.started.append(now)
+                return 0.0
+            return self.started[0] + self.period - now
+
+    async def acquire(self) -> None:
+        """Wait (without blocking the event loop) until the window has room."""
+        while True:
+            wait = self._reserve()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+
+_limiters: Dict[str, Optional[SlidingWindowLimiter]] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str) -> Optional[SlidingWindowLimiter]:
+    """
+    Return the shared limiter for a provider in API_ENDPOINTS.
+
+    Args:
+        provider: API_ENDPOINTS key (e.g. "nasa_power")
+
+    Returns:
+        SlidingWindowLimiter, or None if the provider has no documented limit
+    """
+    with _limiters_lock:
+        if provider not in _limiters:
+            limit = parse_rate_limit(API_ENDPOINTS.get(provider, {}).get("rate_limit"))
+            _limiters[provider] = SlidingWindowLimiter(*limit) if limit else None
+            if limit:
+                logger.debug(f"Rate limiting {provider} to {limit[0]} requests per {limit[1]:.0f}s")
+        return _limiters[provider]
@@ -0,0 +1,410 @@
+"""
+Local Sentinel-2 Scene Catalog
+
+STAC-like index of the Sentinel-2 scenes under data/sentinel/: footprint,
+acquisition time, cloud cover, CRS and per-band GeoTIFF paths. The index is
+saved as one compact .npz file (footprints as WKB, plain numpy columns, no
+pickling) and searched through a shapely STRtree plus a vectorised date
+filter, so a site polygon and date window resolve to scenes in
+milliseconds even with thousands of scenes on disk.
+
+Scenes are discovered two ways:
+- STAC Item JSON files (type "Feature" with "assets"); asset keys may be
+  band codes (B04) or common names (red, nir)
+- Loose GeoTIFFs named like T37MBN_20240105T074211_B04_10m.tif; files that
+  differ only in the band token form one scene, and the footprint is the
+  raster's bounds
+
+The index records a signature of the scene files it was built from (count,
+total size, newest mtime). The shared catalog re-checks it every
+`recheck_seconds` and rescans when scenes are added, replaced or removed.
+"""
+
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+try:
+    import rasterio
+    from rasterio.warp import transform_bounds
+    RASTERIO_AVAILABLE = True
+except ImportError:
+    RASTERIO_AVAILABLE = False
+import shapely
+from shapely import STRtree
+from shapely.geometry import box, shape
+
+from .config import DATA_SOURCES, FEATURE_CONFIG
+from .utils import setup_logger
+
+logger = setup_logger(__name__)
+
+DateLike = Union[str, date, datetime]
+
+# STAC common names / eo:bands names -> Sentinel-2 band codes
+COMMON_BAND_NAMES = {
+    "coastal": "B01",
+    "blue": "B02",
+    "green": "B03",
+    "red": "B04",
+    "rededge1": "B05",
+    "rededge2": "B06",
+    "rededge3": "B07",
+    "nir": "B08",
+    "nir08": "B8A",
+    "nir09": "B09",
+    "swir16": "B11",
+    "swir22": "B12",
+    "scl": "SCL",
+}
+
+_BAND_TOKEN = re.compile(r"(?<![A-Za-z0-9])(B\d[\dA]|SCL)(?![A-Za-z0-9])", re.IGNORECASE)
+_DATE_TOKEN = re.compile(r"(\d{8})(?:T(\d{6}))?")
+
+
+# ============================================================================
+# SCENE RECORDS
+# ============================================================================
+
+@dataclass
+class Scene:
+    """One catalogued acquisition."""
+    scene_id: str
+    datetime: datetime
+    footprint: Any  # shapely geometry in WGS84
+    assets: Dict[str, str] = field(default_factory=dict)  # band code -> absolute path
+    cloud_cover: Optional[float] = None
+    crs: Optional[str] = None
+    boa_add_offset: float = 0.0  # DN added before scaling to reflectance
+
+    def band_paths(self, bands: Sequence[str]) -> Dict[str, str]:
+        """Paths for the requested band codes (KeyError if one is missing)."""
+        return {band: self.assets[band] for band in bands}
+
+
+def _to_datetime64(value: DateLike, end_of_day: bool = False) -> np.datetime64:
+    """Naive UTC datetime64[s]; bare dates expand to the end of the day if asked."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00")) if "T" in value else date.fromisoformat(value)
+    if isinstance(value, datetime):
+        return np.datetime64(value.replace(tzinfo=None), "s")
+    day = np.datetime64(value, "D").astype("datetime64[s]")
+    return day + np.timedelta64(86399, "s") if end_of_day else day
+
+
+def boa_add_offset_for(acquired: datetime, processing_baseline: Optional[str] = None) -> float:
+    """
+    L2A BOA_ADD_OFFSET for a scene: -1000 DN from processing baseline 04.00 on.
+
+    The baseline comes from scene metadata when known, otherwise from the
+    acquisition date (baseline 04.00 started with boa_offset_since).
+    """
+    offset = float(FEATURE_CONFIG["ndvi"]["boa_add_offset"])
+    if processing_baseline:
+        try:
+            return offset if float(processing_baseline) >= 4.0 else 0.0
+        except ValueError:
+            pass
+    since = date.fromisoformat(FEATURE_CONFIG["ndvi"]["boa_offset_since"])
+    return offset if acquired.date() >= since else 0.0
+
+
+def _band_code(name: str) -> Optional[str]:
+    """Sentinel-2 band code for an asset key, common name or filename token."""
+    if name.lower() in COMMON_BAND_NAMES:
+        return COMMON_BAND_NAMES[name.lower()]
+    match = _BAND_TOKEN.fullmatch(name)
+    return match.group(1).upper() if match else None
+
+
+# ============================================================================
+# DISCOVERY
+# ============================================================================
+
+def _scene_from_stac_item(path: Path) -> Optional[Scene]:
+    try:
+        item = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(item, dict) or item.get("type") != "Feature" or "assets" not in item:
+        return None
+
+    props = item.get("properties", {})
+    assets: Dict[str, str] = {}
+    for key, asset in item["assets"].items():
+        names = [key]
+        for band in asset.get("eo:bands", []):
+            names += [band.get("name", ""), band.get("common_name", "")]
+        code = next((c for c in map(_band_code, filter(None, names)) if c), None)
+        href = asset.get("href", "")
+        if code is None or "://" in href:
+            continue
+        href_path = (path.parent / href).resolve()
+        if href_path.exists():
+            assets[code] = str(href_path)
+    if not assets or not item.get("geometry"):
+        return None
+
+    epsg = props.get("proj:epsg")
+    acquired = _to_datetime64(props.get("datetime") or props.get("start_datetime")).astype(datetime)
+    # Some providers (e.g. Earth Search) ship assets with the offset already applied
+    if props.get("earthsearch:boa_offset_applied"):
+        offset = 0.0
+    else:
+        offset = boa_add_offset_for(acquired, props.get("s2:processing_baseline"))
+    return Scene(
+        scene_id=item.get("id", path.stem),
+        datetime=acquired,
+        footprint=shape(item["geometry"]),
+        assets=assets,
+        cloud_cover=props.get("eo:cloud_cover"),
+        crs=f"EPSG:{epsg}" if epsg else None,
+        boa_add_offset=offset,
+    )
+
+
+def _scenes_from_geotiffs(paths: Sequence[Path]) -> List[Scene]:
+    groups: Dict[Path, Dict[str, Path]] = {}
+    for path in paths:
+        match = _BAND_TOKEN.search(path.stem)
+        if not match or not _DATE_TOKEN.search(path.stem):
+            continue
+        scene_key = path.parent / (path.stem[:match.start()] + path.stem[match.end():])
+        groups.setdefault(scene_key, {})[_band_code(match.group(1))] = path
+
+    scenes = []
+    for scene_key, assets in groups.items():
+        date_match = _DATE_TOKEN.search(scene_key.name)
+        stamp = date_match.group(1) + (date_match.group(2) or "000000")
+        with rasterio.open(next(iter(assets.values()))) as src:
+            crs = src.crs.to_string() if src.crs else None
+            bounds = transform_bounds(src.crs, "EPSG:4326", *src.bounds) if src.crs else src.bounds
+        acquired = datetime.strptime(stamp, "%Y%m%d%H%M%S")
+        scenes.append(Scene(
+            scene_id=re.sub(r"[_-]{2,}", "_", scene_key.name).strip("_-"),
+            datetime=acquired,
+            footprint=box(*bounds),
+            assets={band: str(p.resolve()) for band, p in assets.items()},
+            crs=crs,
+            boa_add_offset=boa_add_offset_for(acquired),
+        ))
+    return scenes
+
+
+def _scene_files(directory: Path) -> List[Path]:
+    return sorted(p for pattern in ("*.json", "*.tif*") for p in Path(directory).rglob(pattern))
+
+
+def source_signature(directory: Path) -> str:
+    """Cheap fingerprint of the scene files under a directory (no rasters opened)."""
+    directory = Path(directory)
+    if not directory.exists():
+        return ""
+    count, size, newest = 0, 0, 0
+    for path in _scene_files(directory):
+        stat = path.stat()
+        count += 1
+        size += stat.st_size
+        newest = max(newest, stat.st_mtime_ns)
+    return f"{count}:{size}:{newest}"
+
+
+def discover_scenes(directory: Path) -> List[Scene]:
+    """Scan a directory tree for STAC items and loose band GeoTIFFs."""
+    directory = Path(directory)
+    scenes: List[Scene] = []
+    claimed = set()
+    for item_path in sorted(directory.rglob("*.json")):
+        scene = _scene_from_stac_item(item_path)
+        if scene is not None:
+            scenes.append(scene)
+            claimed.update(scene.assets.values())
+
+    if RASTERIO_AVAILABLE:
+        loose = [
+            p for p in sorted(directory.rglob("*.tif*"))
+            if str(p.resolve()) not in claimed
+        ]
+        scenes.extend(_scenes_from_geotiffs(loose))
+    return scenes
+
+
+# ============================================================================
+# CATALOG
+# ============================================================================
+
+class SceneCatalog:
+    """
+    Spatially indexed set of scenes.
+
+    Footprints live in an STRtree; acquisition times and cloud cover are
+    numpy columns so date and cloud filters are vectorised.
+    """
+
+    def __init__(self, scenes: Sequence[Scene], source_signature: str = ""):
+        self.scenes = list(scenes)
+        self.source_signature = source_signature
+        self._times = np.array([np.datetime64(s.datetime, "s") for s in self.scenes], dtype="datetime64[s]")
+        self._clouds = np.array(
+            [np.nan if s.cloud_cover is None else s.cloud_cover for s in self.scenes], dtype=np.float32
+        )
+        self._tree = STRtree([s.footprint for s in self.scenes])
+
+    def __len__(self) -> int:
+        return len(self.scenes)
+
+    def search(
+        self,
+        geometry: Union[Dict[str, Any], Any],
+        start_date: DateLike,
+        end_date: DateLike,
+        max_cloud_cover: Optional[float] = None,
+        bands: Sequence[str] = (),
+        limit: Optional[int] = None
+    ) -> List[Scene]:
+        """
+        Scenes intersecting a WGS84 geometry within [start_date, end_date].
+
+        Args:
+            geometry: GeoJSON dict or shapely geometry (WGS84)
+            start_date: Window start (inclusive)
+            end_date: Window end (inclusive; dates cover the whole day)
+            max_cloud_cover: Drop scenes with a known cloud cover above this (%)
+            bands: Band codes every returned scene must provide
+            limit: Maximum number of scenes
+
+        Returns:
+            Matching scenes, least cloudy first (unknown cover last), then newest
+        """
+        if not self.scenes:
+            return []
+        geom = shape(geometry) if isinstance(geometry, dict) else geometry
+        start = _to_datetime64(start_date)
+        end = _to_datetime64(end_date, end_of_day=True)
+
+        candidates = self._tree.query(geom, predicate="intersects")
+        keep = (self._times[candidates] >= start) & (self._times[candidates] <= end)
+        if max_cloud_cover is not None:
+            clouds = self._clouds[candidates]
+            keep &= np.isnan(clouds) | (clouds <= max_cloud_cover)
+        candidates = candidates[keep]
+
+        scenes = [self.scenes[i] for i in candidates if all(b in self.scenes[i].assets for b in bands)]
+        scenes.sort(key=lambda s: (s.cloud_cover is None, s.cloud_cover or 0.0, -s.datetime.timestamp()))
+        return scenes[:limit] if limit else scenes
+
+    # ------------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------------
+
+    def save(self, path: Path) -> None:
+        """Write the catalog as a compressed .npz (no pickled objects)."""
+        wkb = [shapely.to_wkb(s.footprint) for s in self.scenes]
+        offsets = np.cumsum([0] + [len(b) for b in wkb], dtype=np.int64)
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as fh:
+            np.savez_compressed(
+                fh,
+                scene_id=np.array([s.scene_id for s in self.scenes], dtype=str),
+                datetime=self._times,
+                cloud_cover=self._clouds,
+                crs=np.array([s.crs or "" for s in self.scenes], dtype=str),
+                assets=np.array([json.dumps(s.assets, sort_keys=True) for s in self.scenes], dtype=str),
+                boa_add_offset=np.array([s.boa_add_offset for s in self.scenes], dtype=np.float32),
+                footprint_wkb=np.frombuffer(b"".join(wkb), dtype=np.uint8),
+                footprint_offsets=offsets,
+                source_signature=np.array(self.source_signature, dtype=str),
+            )
+
+    @classmethod
+    def load(cls, path: Path) -> "SceneCatalog":
+        """Read a catalog written by save()."""
+        with np.load(path, allow_pickle=False) as data:
+            # Indexes written before signatures were recorded never match
+            signature = str(data["source_signature"]) if "source_signature" in data.files else ""
+            blob = data["footprint_wkb"].tobytes()
+            offsets = data["footprint_offsets"]
+            footprints = shapely.from_wkb([blob[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)])
+            boa = data["boa_add_offset"] if "boa_add_offset" in data.files else [None] * len(footprints)
+            scenes = [
+                Scene(
+                    scene_id=str(scene_id),
+                    datetime=when.astype(datetime),
+                    footprint=footprint,
+                    assets=json.loads(str(assets)),
+                    cloud_cover=None if np.isnan(cloud) else float(cloud),
+                    crs=str(crs) or None,
+                    boa_add_offset=(
+                        boa_add_offset_for(when.astype(datetime)) if offset is None else float(offset)
+                    ),
+                )
+                for scene_id, when, footprint, assets, cloud, crs, offset in zip(
+                    data["scene_id"], data["datetime"], footprints, data["assets"], data["cloud_cover"], data["crs"], boa
+                )
+            ]
+        return cls(scenes, signature)
+
+    @classmethod
+    def build(cls, directory: Path) -> "SceneCatalog":
+        """Scan a directory and index every scene found."""
+        signature = source_signature(directory)
+        scenes = discover_scenes(directory)
+        logger.info(f"Indexed {len(scenes)} Sentinel-2 scene(s) under {directory}")
+        return cls(scenes, signature)
+
+
+# ============================================================================
+# SHARED INSTANCE
+# ============================================================================
+
+# directory -> (catalog, monotonic time its signature was last checked)
+_catalogs: Dict[Path, Tuple[SceneCatalog, float]] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_scene_catalog(directory: Path = None, rebuild: bool = False) -> SceneCatalog:
+    """
+    Return the process-wide SceneCatalog for a directory.
+
+    Loads the saved index if it matches the scene files on disk; otherwise
+    (or with rebuild=True) scans the directory and saves a fresh index next
+    to the imagery. A loaded catalog is re-checked against the files every
+    `recheck_seconds`, so scenes added while the process runs are found.
+
+    Args:
+        directory: Imagery root (default: DATA_SOURCES["sentinel_local"])
+        rebuild: Rescan the directory even if the index is current
+    """
+    source = DATA_SOURCES["sentinel_local"]
+    directory = Path(directory or source["path"])
+    index_path = directory / source["index_file"]
+    with _catalogs_lock:
+        now = time.monotonic()
+        cached = _catalogs.get(directory)
+        if cached and not rebuild and now - cached[1] < source.get("recheck_seconds", 300):
+            return cached[0]
+
+        signature = source_signature(directory)
+        catalog = None
+        if cached and not rebuild and cached[0].source_signature == signature:
+            catalog = cached[0]
+        elif index_path.exists() and not rebuild:
+            try:
+                loaded = SceneCatalog.load(index_path)
+                if loaded.source_signature == signature:
+                    catalog = loaded
+            except Exception as e:
+                logger.warning(f"Could not read scene index {index_path}: {e}; rebuilding")
+        if catalog is None:
+            catalog = SceneCatalog.build(directory) if directory.exists() else SceneCatalog([])
+            if len(catalog):
+                catalog.save(index_path)
+        _catalogs[directory] = (catalog, now)
+        return catalog
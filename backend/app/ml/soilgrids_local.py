@@ -0,0 +1,239 @@
+"""
+Local SoilGrids Store
+
+Samples SoilGrids layers from GeoTIFFs (ideally Cloud-Optimized) pre-clipped
+to Kenya, one file per property and depth, instead of calling the ISRIC REST
+API. Reads are windowed: a point touches one block per layer and a polygon
+reads only its bounding window, so all properties and depths for a site come
+from one pass over the open rasters.
+
+Values are kept in raw SoilGrids units and converted with the same rules as
+the REST client (soil_means_to_properties), so both paths return identical
+shapes.
+"""
+
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+try:
+    import rasterio
+    RASTERIO_AVAILABLE = True
+except ImportError:
+    RASTERIO_AVAILABLE = False
+from shapely.geometry import shape
+
+from .config import DATA_SOURCES
+from .raster_sampling import pixel_indices, polygon_window, read_pixels, read_window
+from .utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# {property: {depth: raw value or None}}
+LayerValues = Dict[str, Dict[str, Optional[float]]]
+
+
+# ============================================================================
+# UNIT CONVERSION (shared with SoilGridsClient)
+# ============================================================================
+
+def depth_mean(values: Iterable[Optional[float]]) -> Optional[float]:
+    """Unweighted mean across depths, ignoring missing values."""
+    collected = [float(v) for v in values if v is not None and np.isfinite(v)]
+    if not collected:
+        return None
+    return sum(collected) / len(collected)
+
+
+def soil_means_to_properties(means: Dict[str, Optional[float]]) -> Dict[str, Optional[float]]:
+    """
+    Convert depth-averaged raw SoilGrids values into TowerGuard units.
+
+    SoilGrids units:
+    - sand, clay, silt: g/kg (divide by 10 for percentage)
+    - pH: pH*10 (divide by 10 for actual pH)
+    - SOC: dg/kg (decigrams per kilogram)
+    - bulk density: cg/cm³ (centigrams per cubic centimeter)
+    """
+    ph_raw = means.get("phh2o")
+    sand, silt, clay = means.get("sand"), means.get("silt"), means.get("clay")
+    return {
+        "ph": (ph_raw / 10) if ph_raw is not None else 6.0,
+        "soc": means.get("soc"),
+        "sand": sand / 10 if sand is not None else None,
+        "silt": silt / 10 if silt is not None else None,
+        "clay": clay / 10 if clay is not None else None,
+        "bulk_density": means.get("bdod"),
+    }
+
+
+# ============================================================================
+# STORE
+# ============================================================================
+
+class SoilGridsStore:
+    """
+    Open SoilGrids rasters grouped by grid, sampled with windowed reads.
+
+    Layers sharing a grid (CRS, transform, shape) share pixel lookups, so the
+    per-site cost is one coordinate transform plus one small read per layer.
+    Rasterio handles are not thread-safe; reads are serialised by a lock.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        properties: Sequence[str] = None,
+        depths: Sequence[str] = None,
+        pattern: str = "{property}_{depth}_mean.tif"
+    ):
+        if not RASTERIO_AVAILABLE:
+            raise ImportError("rasterio is required for the local SoilGrids store")
+        source = DATA_SOURCES["soilgrids_local"]
+        properties = properties or source["properties"]
+        depths = depths or source["depths"]
+
+        self.layers: Dict[Tuple[str, str], Any] = {}
+        for prop in properties:
+            for depth in depths:
+                path = Path(directory) / pattern.format(property=prop, depth=depth)
+                if path.exists():
+                    self.layers[(prop, depth)] = rasterio.open(path)
+        if not self.layers:
+            raise FileNotFoundError(f"No SoilGrids layers found in {directory}")
+
+        self._groups: Dict[Tuple, List[Tuple[Tuple[str, str], Any]]] = {}
+        for layer, src in self.layers.items():
+            key = (str(src.crs), tuple(src.transform), src.width, src.height)
+            self._groups.setdefault(key, []).append((layer, src))
+        self._lock = threading.Lock()
+        logger.info(f"Opened {len(self.layers)} SoilGrids layer(s) on {len(self._groups)} grid(s) from {directory}")
+
+    def _selected(self, group, properties, depths):
+        return [
+            (layer, src) for layer, src in group
+            if (properties is None or layer[0] in properties) and (depths is None or layer[1] in depths)
+        ]
+
+    def sample_points(
+        self,
+        points: Sequence[Tuple[float, float]],
+        properties: Sequence[str] = None,
+        depths: Sequence[str] = None
+    ) -> List[LayerValues]:
+        """
+        Raw layer values at many (lat, lon) points.
+
+        Points close together are served from one bounding window per layer;
+        widely spread points fall back to one single-pixel read each.
+
+        Returns:
+            One {property: {depth: value}} dict per point (None outside the rasters)
+        """
+        lats = np.asarray([p[0] for p in points], dtype=float)
+        lons = np.asarray([p[1] for p in points], dtype=float)
+        results: List[LayerValues] = [{} for _ in points]
+
+        with self._lock:
+            for group in self._groups.values():
+                selected = self._selected(group, properties, depths)
+                if not selected:
+                    continue
+                rows, cols, inside = pixel_indices(selected[0][1], lats, lons)
+                for (prop, depth), layer_src in selected:
+                    values = read_pixels(layer_src, rows, cols, inside)
+                    for result, value in zip(results, values):
+                        result.setdefault(prop, {})[depth] = float(value) if np.isfinite(value) else None
+        return results
+
+    def sample_polygon(
+        self,
+        geometry: Union[Dict[str, Any], Any],
+        properties: Sequence[str] = None,
+        depths: Sequence[str] = None
+    ) -> LayerValues:
+        """
+        Mean raw layer values over a polygon (GeoJSON dict or shapely geometry).
+
+        Each layer reads only the polygon's bounding window; pixels whose
+        centres fall inside the polygon are averaged. Polygons smaller than a
+        pixel use the pixel under their centroid.
+        """
+        geom = shape(geometry) if isinstance(geometry, dict) else geometry
+        result: LayerValues = {}
+
+        with self._lock:
+            for group in self._groups.values():
+                selected = self._selected(group, properties, depths)
+                if not selected:
+                    continue
+                window_mask = polygon_window(selected[0][1], geom)
+                for (prop, depth), layer_src in selected:
+                    value = None
+                    if window_mask is not None:
+                        window, mask = window_mask
+                        data = read_window(layer_src, window)[mask]
+                        data = data[np.isfinite(data)]
+                        value = float(data.mean()) if data.size else None
+                    result.setdefault(prop, {})[depth] = value
+
+        if not any(v is not None for depths_ in result.values() for v in depths_.values()):
+            centroid = geom.centroid
+            return self.sample_points([(centroid.y, centroid.x)], properties, depths)[0]
+        return result
+
+    def properties_at(self, lat: float, lon: float) -> Optional[Dict[str, Optional[float]]]:
+        """TowerGuard soil properties at a point (depth-averaged), or None if off-raster."""
+        return self._to_properties(self.sample_points([(lat, lon)])[0])
+
+    def properties_for_polygon(self, geometry: Union[Dict[str, Any], Any]) -> Optional[Dict[str, Optional[float]]]:
+        """TowerGuard soil properties averaged over a polygon, or None if off-raster."""
+        return self._to_properties(self.sample_polygon(geometry))
+
+    @staticmethod
+    def _to_properties(values: LayerValues) -> Optional[Dict[str, Optional[float]]]:
+        means = {prop: depth_mean(by_depth.values()) for prop, by_depth in values.items()}
+        if all(v is None for v in means.values()):
+            return None
+        return soil_means_to_properties(means)
+
+    def close(self) -> None:
+        for src in self.layers.values():
+            src.close()
+
+
+# ============================================================================
+# SHARED INSTANCE
+# ============================================================================
+
+_stores: Dict[Path, Optional[SoilGridsStore]] = {}
+_stores_lock = threading.Lock()
+
+
+def get_soilgrids_store(directory: Path = None) -> Optional[SoilGridsStore]:
+    """
+    Return the process-wide SoilGridsStore for a directory, opening it on first use.
+
+    Args:
+        directory: Folder of SoilGrids GeoTIFFs (default: DATA_SOURCES["soilgrids_local"])
+
+    Returns:
+        SoilGridsStore, or None if rasterio is unavailable or no layers exist
+    """
+    source = DATA_SOURCES["soilgrids_local"]
+    directory = Path(directory or source["path"])
+    with _stores_lock:
+        if directory not in _stores:
+            store = None
+            if not RASTERIO_AVAILABLE:
+                logger.debug("rasterio not installed; local SoilGrids store disabled")
+            elif directory.exists():
+                try:
+                    store = SoilGridsStore(directory, pattern=source["pattern"])
+                except FileNotFoundError:
+                    logger.debug(f"No local SoilGrids layers in {directory}")
+                except Exception as e:
+                    logger.warning(f"Could not open local SoilGrids layers in {directory}: {e}")
+            _stores[directory] = store
+        return _stores[directory]
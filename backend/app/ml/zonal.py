@@ -0,0 +1,276 @@
+"""
+Zonal NDVI Statistics
+
+Per-zone NDVI statistics for many polygons from one pass over a Sentinel-2
+scene. Instead of reading and clipping the scene once per site, the union
+window of all zones is walked block by block (as in compute_ndvi_windowed);
+each block is read once, zones are burned into a label image and
+per-zone sums are gathered with np.bincount.
+
+Overlapping zones (e.g. a tower and its 2 km buffer) cannot share a label
+image, so zones are split into non-overlapping layers and each layer is
+rasterised separately over the same block of NDVI values.
+"""
+
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+try:
+    import rasterio
+    from rasterio.features import rasterize
+    from rasterio.warp import transform_geom
+    RASTERIO_AVAILABLE = True
+except ImportError:
+    RASTERIO_AVAILABLE = False
+from shapely import STRtree
+from shapely.geometry import box, mapping, shape
+from shapely.ops import unary_union
+from shapely.wkt import loads as wkt_loads
+
+from .config import FEATURE_CONFIG
+from .ndvi import NODATA_VALUE
+from .raster_sampling import block_windows, bounds_window
+from .utils import logger
+
+
+# ==============================================================================
+# Accumulator
+# ==============================================================================
+
+class ZonalAccumulator:
+    """
+    Per-zone online mean/std/min/max, the vectorised form of NDVIAccumulator.
+
+    Each block contributes per-zone counts, means and squared deviations via
+    np.bincount, merged with the batched Welford (Chan et al.) update.
+    """
+
+    def __init__(self, n_zones: int):
+        self.n_zones = n_zones
+        self.total_count = np.zeros(n_zones, dtype=np.int64)
+        self.count = np.zeros(n_zones, dtype=np.int64)
+        self.mean = np.zeros(n_zones)
+        self._m2 = np.zeros(n_zones)
+        self.min = np.full(n_zones, np.inf)
+        self.max = np.full(n_zones, -np.inf)
+
+    def update(self, labels: np.ndarray, values: np.ndarray, valid: np.ndarray) -> None:
+        """
+        Add one block.
+
+        Args:
+            labels: Zone label per pixel (0 = no zone, zone i has label i + 1)
+            values: NDVI per pixel, same shape as labels
+            valid: Mask of usable NDVI pixels, same shape as labels
+        """
+        size = self.n_zones + 1
+        self.total_count += np.bincount(labels.ravel(), minlength=size)[1:]
+
+        zone_labels = labels[valid]
+        zone_values = values[valid].astype(np.float64)
+        count_b = np.bincount(zone_labels, minlength=size)
+        if not count_b[1:].any():
+            return
+        sums_b = np.bincount(zone_labels, weights=zone_values, minlength=size)
+        mean_b = np.divide(sums_b, count_b, out=np.zeros(size), where=count_b > 0)
+        m2_b = np.bincount(zone_labels, weights=(zone_values - mean_b[zone_labels]) ** 2, minlength=size)
+        count_b, mean_b, m2_b = count_b[1:], mean_b[1:], m2_b[1:]
+
+        n = self.count + count_b
+        hit = count_b > 0
+        delta = mean_b - self.mean
+        self.mean[hit] += delta[hit] * count_b[hit] / n[hit]
+        self._m2[hit] += m2_b[hit] + delta[hit] ** 2 * self.count[hit] * count_b[hit] / n[hit]
+        self.count = n
+
+        in_zone = zone_labels > 0
+        np.minimum.at(self.min, zone_labels[in_zone] - 1, zone_values[in_zone])
+        np.maximum.at(self.max, zone_labels[in_zone] - 1, zone_values[in_zone])
+
+    def results(self, valid_pixel_threshold: float = 0.1) -> List[Dict[str, Optional[float]]]:
+        """Per-zone statistics in the shape returned by aggregate_ndvi."""
+        results = []
+        for i in range(self.n_zones):
+            total, count = int(self.total_count[i]), int(self.count[i])
+            valid_pixel_ratio = count / total if total > 0 else 0.0
+            result = {
+                'mean': None,
+                'std': None,
+                'valid_pixel_ratio': valid_pixel_ratio,
+                'min': None,
+                'max': None,
+                'count': total,
+                'valid_count': count
+            }
+            if valid_pixel_ratio >= valid_pixel_threshold and count > 0:
+                result['mean'] = float(self.mean[i])
+                result['std'] = float(np.sqrt(self._m2[i] / count))
+                result['min'] = float(self.min[i])
+                result['max'] = float(self.max[i])
+            results.append(result)
+        return results
+
+
+# ==============================================================================
+# Zone Preparation
+# ==============================================================================
+
+def _to_geometry(zone: Any) -> Any:
+    if isinstance(zone, str):
+        return wkt_loads(zone)
+    if isinstance(zone, dict):
+        return shape(zone)
+    return zone
+
+
+def _non_overlapping_layers(geometries: Sequence[Any]) -> List[List[int]]:
+    """Greedily group zone indices so no two zones in a layer share area."""
+    tree = STRtree(geometries)
+    layers: List[List[int]] = []
+    layer_of: Dict[int, int] = {}
+    for i, geom in enumerate(geometries):
+        conflicts = {
+            layer_of[j] for j in tree.query(geom, predicate="intersects")
+            if j in layer_of and not geom.touches(geometries[j])
+        }
+        layer = next((k for k in range(len(layers)) if k not in conflicts), len(layers))
+        if layer == len(layers):
+            layers.append([])
+        layers[layer].append(i)
+        layer_of[i] = layer
+    return layers
+
+
+# ==============================================================================
+# Zonal NDVI
+# ==============================================================================
+
+def compute_zonal_ndvi(
+    red_band_path: str,
+    nir_band_path: str,
+    zones: Mapping[str, Any],
+    valid_pixel_threshold: float = 0.1,
+    geometry_crs: Optional[str] = None,
+    block_size: Optional[int] = None
+) -> Dict[str, Dict[str, Optional[float]]]:
+    """
+    NDVI statistics for many zones from a single read of one scene.
+
+    Args:
+        red_band_path: Path to Red band (B04) GeoTIFF
+        nir_band_path: Path to NIR band (B08) GeoTIFF
+        zones: {zone_id: polygon} as WKT, GeoJSON dict or shapely geometry
+        valid_pixel_threshold: Minimum valid pixel ratio required per zone
+        geometry_crs: CRS of the zones (None if already in the bands' CRS)
+        block_size: Block edge in pixels for untiled rasters
+                    (default: FEATURE_CONFIG["ndvi"]["block_size"])
+
+    Returns:
+        {zone_id: statistics in the shape returned by aggregate_ndvi}
+    """
+    if not RASTERIO_AVAILABLE:
+        raise ImportError("Rasterio is required for NDVI computation")
+    zone_ids = list(zones)
+    if not zone_ids:
+        return {}
+    block_size = block_size or FEATURE_CONFIG["ndvi"]["block_size"]
+
+    accumulator = ZonalAccumulator(len(zone_ids))
+    with rasterio.open(red_band_path) as red_src, rasterio.open(nir_band_path) as nir_src:
+        if (red_src.shape, red_src.transform) != (nir_src.shape, nir_src.transform):
+            raise ValueError(
+                f"Band grid mismatch: Red {red_src.shape} vs NIR {nir_src.shape}"
+            )
+
+        geometries = [_to_geometry(zones[zone_id]) for zone_id in zone_ids]
+        if geometry_crs is not None and red_src.crs is not None:
+            geometries = [shape(transform_geom(geometry_crs, red_src.crs, mapping(g))) for g in geometries]
+        layers = _non_overlapping_layers(geometries)
+        tree = STRtree(geometries)
+
+        window = bounds_window(red_src, unary_union(geometries).bounds)
+        if window is None:
+            logger.warning("No zone overlaps the Sentinel-2 bands")
+            return dict(zip(zone_ids, accumulator.results(valid_pixel_threshold)))
+
+        block_shape = red_src.block_shapes[0]
+        if block_shape[1] == red_src.width:
+            block_shape = (block_size, block_size)
+        red_nodata = red_src.nodata if red_src.nodata is not None else NODATA_VALUE
+        nir_nodata = nir_src.nodata if nir_src.nodata is not None else NODATA_VALUE
+
+        for block in block_windows(window, block_shape):
+            hits = set(tree.query(box(*red_src.window_bounds(block)), predicate="intersects").tolist())
+            if not hits:
+                continue
+
+            red = red_src.read(1, window=block).astype(np.float32)
+            nir = nir_src.read(1, window=block).astype(np.float32)
+            denominator = nir + red
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ndvi = (nir - red) / denominator
+            valid = (
+                (red != red_nodata) & (nir != nir_nodata) & (denominator != 0)
+                & (ndvi >= -1.0) & (ndvi <= 1.0)
+            )
+
+            out_shape = (int(block.height), int(block.width))
+            block_transform = red_src.window_transform(block)
+            for layer in layers:
+                burn = [(mapping(geometries[i]), i + 1) for i in layer if i in hits]
+                if not burn:
+                    continue
+                labels = rasterize(burn, out_shape=out_shape, transform=block_transform, fill=0, dtype="int32")
+                accumulator.update(labels, ndvi, valid)
+
+    logger.info(f"Zonal NDVI computed for {len(zone_ids)} zone(s) in {len(layers)} layer(s)")
+    return dict(zip(zone_ids, accumulator.results(valid_pixel_threshold)))
+
+
+def compute_ndvi_for_sites(
+    red_band_path: str,
+    nir_band_path: str,
+    sites: Mapping[str, str],
+    valid_pixel_threshold: float = 0.1
+) -> Dict[str, Dict[str, Any]]:
+    """
+    compute_ndvi_for_site for many sites sharing one scene.
+
+    Args:
+        red_band_path: Path to Red band (B04) GeoTIFF
+        nir_band_path: Path to NIR band (B08) GeoTIFF
+        sites: {site_id: polygon WKT in the bands' CRS}
+
+    Returns:
+        {site_id: result dict in the shape returned by compute_ndvi_for_site}
+    """
+    results = {
+        site_id: {
+            'site_id': site_id,
+            'ndvi_mean': None,
+            'ndvi_std': None,
+            'ndvi_valid_pixel_ratio': None,
+            'ndvi_min': None,
+            'ndvi_max': None,
+            'success': False
+        }
+        for site_id in sites
+    }
+    try:
+        zonal = compute_zonal_ndvi(
+            red_band_path, nir_band_path, sites, valid_pixel_threshold=valid_pixel_threshold
+        )
+    except Exception as e:
+        logger.error(f"Zonal NDVI computation failed for {len(sites)} site(s): {e}", exc_info=True)
+        return results
+
+    for site_id, stats in zonal.items():
+        results[site_id].update({
+            'ndvi_mean': stats['mean'],
+            'ndvi_std': stats['std'],
+            'ndvi_valid_pixel_ratio': stats['valid_pixel_ratio'],
+            'ndvi_min': stats['min'],
+            'ndvi_max': stats['max'],
+            'success': stats['mean'] is not None
+        })
+    return results
@@ -37,6 +37,11 @@ class SiteFeatureRead(BaseModel):
     silt: float | None
     ph: float | None
     
+    # Elevation metrics (local DEM)
+    elevation_m: float | None = None
+    elevation_min_m: float | None = None
+    elevation_max_m: float | None = None
+    
     # Metadata
     source_breakdown: dict[str, Any] | None
     partial: bool
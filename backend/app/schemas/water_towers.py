@@ -16,3 +16,22 @@ class WaterTowerRead(BaseModel):
     updated_at: datetime
     
     model_config = {"from_attributes": True}
+
+
+class NdviSeriesPoint(BaseModel):
+    """One monthly NDVI composite."""
+    month: str  # YYYY-MM
+    ndvi_mean: float | None
+    ndvi_std: float | None
+    image_count: int | None
+
+
+class NdviTrendRead(BaseModel):
+    """Stored monthly NDVI series for a water tower and its linear trend."""
+    water_tower_id: str
+    collection: str
+    series: list[NdviSeriesPoint]
+    slope_per_year: float | None
+    months_with_data: int
+    first_month: str | None
+    last_month: str | None
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import uuid
+from pathlib import Path
+from typing import Any
+
+from pymongo.database import Database
+
+from app.core.config import settings
+from app.db.locks import acquire_lease, release_lease
+from app.ml.environmental_api_client import AsyncCHIRPSClient, AsyncNASAPOWERClient, AsyncSoilGridsClient
+from app.ml.gee_ndvi import compute_ndvi_stats_batch_async
+from app.services.tower_enrichment_service import (
+    DEFAULT_NDVI_END,
+    DEFAULT_NDVI_START,
+    default_baseline_window,
+    get_centroid_latlon,
+)
+
+log = logging.getLogger(__name__)
+
+# kenya_water_towers_18.geojson ships without coordinates; the loader falls back
+# to these 2 km buffers, so they are the canonical geometries when Mongo is down.
+TOWERS_BUFFER_PATH = Path(__file__).parent.parent.parent / "data" / "water_towers" / "kenya_water_towers_18_buffers_2km.geojson"
+
+# Every worker schedules the warm-up and refresher; one of them does the work
+# and the rest read its results through the shared cache tiers
+WARMUP_LOCK_ID = "cache_warmup"
+WARMUP_LEASE_HOURS = 1.0
+
+
+def _canonical_towers(db: Database) -> list[dict[str, Any]]:
+    """Towers from the water_towers collection, or the bundled GeoJSON if unavailable."""
+    try:
+        towers = list(db["water_towers"].find({}, {"id": 1, "geometry": 1, "metadata": 1}))
+        if towers:
+            return towers
+    except Exception as exc:
+        log.warning("Could not read water_towers for cache warm-up: %s", exc)
+
+    if not TOWERS_BUFFER_PATH.exists():
+        return []
+    geojson = json.loads(TOWERS_BUFFER_PATH.read_text(encoding="utf-8"))
+    return [
+        {"id": (feature.get("properties") or {}).get("id"), "geometry": feature.get("geometry")}
+        for feature in geojson.get("features", [])
+        if feature.get("geometry")
+    ]
+
+
+def _try_acquire_warmup_lease(db: Database, owner: str) -> bool:
+    try:
+        return acquire_lease(db, WARMUP_LOCK_ID, owner, WARMUP_LEASE_HOURS)
+    except Exception as exc:
+        # Without Mongo there is no shared cache either; warm this worker
+        log.warning("Cache warm-up lease unavailable, warming locally: %s", exc)
+        return True
+
+
+def _release_warmup_lease(db: Database, owner: str) -> None:
+    try:
+        release_lease(db, WARMUP_LOCK_ID, owner)
+    except Exception as exc:
+        log.warning("Could not release cache warm-up lease: %s", exc)
+
+
+async def warm_canonical_caches(
+    db: Database,
+    refresh_within_hours: float = 0.0,
+    include_ndvi: bool = True,
+) -> dict[str, Any]:
+    """
+    Pre-populate provider and NDVI caches for every canonical water tower.
+
+    Uses the same clients, grid snapping and NDVI windows as enrich_water_tower,
+    so subsequent enrichment and feature requests for canonical towers hit warm
+    caches. Entries expiring within `refresh_within_hours` are refetched. Runs
+    hold a Mongo lease; while another worker holds it the call returns at once
+    with skipped=True.
+
+    Returns:
+        Count of towers processed and of successful lookups per source.
+    """
+    owner = uuid.uuid4().hex
+    if not await asyncio.to_thread(_try_acquire_warmup_lease, db, owner):
+        log.info("Cache warm-up already running in another worker; skipped")
+        return {"towers": 0, "skipped": True}
+    try:
+        return await _warm_canonical_caches(db, refresh_within_hours, include_ndvi)
+    finally:
+        await asyncio.to_thread(_release_warmup_lease, db, owner)
+
+
+async def _warm_canonical_caches(db: Database, refresh_within_hours: float, include_ndvi: bool) -> dict[str, Any]:
+    towers = await asyncio.to_thread(_canonical_towers, db)
+    baseline_start, baseline_end = default_baseline_window(DEFAULT_NDVI_START, DEFAULT_NDVI_END)
+    ndvi_windows = {(DEFAULT_NDVI_START, DEFAULT_NDVI_END), (baseline_start, baseline_end)}
+
+    chirps = AsyncCHIRPSClient()
+    nasa = AsyncNASAPOWERClient()
+    soil = AsyncSoilGridsClient()
+    semaphore = asyncio.Semaphore(max(1, settings.enrichment_max_workers))
+    summary = {"towers": len(towers), "rainfall": 0, "temperature": 0, "soil": 0, "ndvi": 0}
+
+    async def _warm(tower: dict[str, Any]) -> None:
+        latlon = get_centroid_latlon(tower)
+        if not latlon:
+            return
+        lat, lon = latlon
+        async with semaphore:
+            lookups = {
+                "rainfall": chirps.get_rainfall_for_location(lat, lon, refresh_within_hours=refresh_within_hours),
+                "temperature": nasa.get_temperature_climatology(lat, lon, refresh_within_hours=refresh_within_hours),
+                "soil": soil.get_soil_properties(lat, lon, refresh_within_hours=refresh_within_hours),
+            }
+            results = await asyncio.gather(*lookups.values(), return_exceptions=True)
+            for source, result in zip(lookups, results):
+                if result is not None and not isinstance(result, Exception):
+                    summary[source] += 1
+
+    async def _warm_ndvi() -> None:
+        geometries = {tower["id"]: tower["geometry"] for tower in towers if tower.get("id") and tower.get("geometry")}
+        if not include_ndvi or not geometries:
+            return
+        try:
+            stats = await compute_ndvi_stats_batch_async(
+                geometries,
+                sorted(ndvi_windows),
+                refresh_within_hours=refresh_within_hours,
+            )
+        except Exception as exc:  # pragma: no cover - NDVI optional
+            log.warning("NDVI warm-up failed: %s", exc)
+            return
+        summary["ndvi"] = sum(
+            result.get("ndvi_mean") is not None for by_window in stats.values() for result in by_window.values()
+        )
+
+    await asyncio.gather(_warm_ndvi(), *(_warm(tower) for tower in towers))
+    log.info("Cache warm-up complete: %s", summary)
+    return summary
+
+
+async def run_cache_refresher(db: Database, interval_hours: float) -> None:
+    """
+    Periodically renew canonical tower caches ahead of their TTL.
+
+    Each cycle refetches entries that would expire before the cycle after next,
+    so user-facing requests for canonical towers never see an expired entry.
+    """
+    while True:
+        await asyncio.sleep(interval_hours * 3600)
+        try:
+            await warm_canonical_caches(db, refresh_within_hours=interval_hours * 2)
+        except Exception as exc:  # pragma: no cover - keep refreshing
+            log.warning("Scheduled cache refresh failed: %s", exc)
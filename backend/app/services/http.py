@@ -1,35 +1,57 @@
+import asyncio
 import httpx
 from typing import Any
 
+from app.ml.circuit_breaker import CircuitOpenError, get_circuit_breaker
+
 
 class HTTPService:
-    """HTTP service with timeout and retry logic."""
-    
-    def __init__(self, timeout: int = 30, max_retries: int = 3):
+    """HTTP service with timeout, retry/backoff and per-host circuit breaking."""
+
+    def __init__(self, timeout: int = 30, max_retries: int = 3, retry_delay: float = 0.5):
         self.timeout = timeout
         self.max_retries = max_retries
+        self.retry_delay = retry_delay
         self.client = httpx.AsyncClient(
             timeout=httpx.Timeout(timeout),
             follow_redirects=True
         )
-    
+
     async def get(self, url: str, params: dict[str, Any] | None = None, headers: dict[str, str] | None = None) -> dict[str, Any]:
-        """Make GET request with retry logic."""
+        """
+        Make GET request with retry logic.
+
+        Raises CircuitOpenError without touching the network while the host's
+        breaker is open, so callers drop straight to their fixture fallback.
+        """
+        breaker = get_circuit_breaker(url)
         last_exception = None
-        
+        delay = self.retry_delay
+
         for attempt in range(self.max_retries):
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuit open for {breaker.name}")
             try:
                 response = await self.client.get(url, params=params, headers=headers)
                 response.raise_for_status()
+                breaker.record_success()
                 return response.json()
-            except (httpx.HTTPError, httpx.TimeoutException) as e:
+            except httpx.HTTPStatusError as e:
                 last_exception = e
-                if attempt == self.max_retries - 1:
+                if e.response.status_code < 500:
+                    breaker.record_success()
                     break
-                continue
-        
+                breaker.record_failure()
+            except (httpx.HTTPError, httpx.TimeoutException) as e:
+                last_exception = e
+                breaker.record_failure()
+            if attempt == self.max_retries - 1 or breaker.is_open:
+                break
+            await asyncio.sleep(delay)
+            delay *= 2
+
         raise last_exception or Exception("Failed to fetch data")
-    
+
     async def close(self):
         """Close the HTTP client."""
         await self.client.aclose()
@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Optional
+
+import numpy as np
+from pymongo import UpdateOne
+from pymongo.database import Database
+
+from app.db.locks import acquire_lease, release_lease
+from app.ml.gee_ndvi import DEFAULT_COLLECTION, NDVI_MASK_VERSION, compute_ndvi_stats_batch_async
+from app.ml.ndvi_store import NDVIKey
+
+log = logging.getLogger(__name__)
+
+# Monthly Sentinel-2 composites per tower, stored as one bucket document per
+# tower, collection and year with 12-slot arrays (index 0 = January). A value
+# slot is null until that month has been computed; image_count 0 marks a month
+# without usable imagery. The separate `computed` array records which months
+# are final: a month with no imagery stays retryable for EMPTY_MONTH_RETRY_DAYS
+# after its window ends, since late-ingested scenes can still fill it, and a
+# month computed at a coarsened fallback scale stays retryable until the
+# full-scale computation succeeds. Months
+# are appended once their window has closed, so the trend endpoint never calls
+# Earth Engine. Buckets are per cloud-mask version: bumping NDVI_MASK_VERSION
+# starts fresh buckets and the old values are no longer read.
+SERIES_COLLECTION = "ndvi_series"
+SERIES_START_YEAR = 2017
+EMPTY_MONTH_RETRY_DAYS = 90
+_FIELDS = ("ndvi_mean", "ndvi_std", "image_count")
+
+# One update at a time across all workers (see app.db.locks)
+LOCK_LEASE_HOURS = 6.0
+
+# The update started through the API in this process (the backfill takes far
+# longer than an HTTP request may), with the outcome of the last one
+_update_state: dict[str, Any] = {"task": None, "last_summary": None, "last_error": None}
+
+
+def _month_window(year: int, month: int) -> tuple[str, str]:
+    """[first day, first day of next month) as used by filterDate."""
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return date(year, month, 1).isoformat(), end.isoformat()
+
+
+def _closed_months(collection: str, today: Optional[date] = None) -> list[tuple[int, int]]:
+    """(year, month) from SERIES_START_YEAR through the last month whose window has closed."""
+    today = today or datetime.now(timezone.utc).date()
+    months = []
+    for year in range(SERIES_START_YEAR, today.year + 1):
+        for month in range(1, 13):
+            start, end = _month_window(year, month)
+            key = NDVIKey("", collection, start, end, 0, NDVI_MASK_VERSION)
+            if not key.is_closed(today):
+                return months
+            months.append((year, month))
+    return months
+
+
+def _bucket_id(tower_id: str, collection: str, year: int) -> str:
+    return f"{tower_id}:{collection}:{NDVI_MASK_VERSION}:{year}"
+
+
+def _ensure_indexes(db: Database) -> None:
+    db[SERIES_COLLECTION].create_index([("tower_id", 1), ("collection", 1), ("mask_version", 1), ("year", 1)])
+
+
+async def update_ndvi_series(
+    db: Database,
+    tower_ids: Optional[list[str]] = None,
+    collection: str = DEFAULT_COLLECTION,
+    today: Optional[date] = None,
+) -> dict[str, Any]:
+    """
+    Append every closed month missing from each tower's NDVI series.
+
+    The first run backfills from SERIES_START_YEAR; later runs only compute
+    the months closed since (plus any month an earlier run failed to get).
+    Each year of missing months is one batched Earth Engine request for all
+    towers that need it. Runs hold a Mongo lease per collection; while
+    another worker holds it the call returns at once with skipped=True.
+
+    Returns:
+        Count of towers considered and of months appended.
+    """
+    lock_id = f"ndvi_series:update:{collection}"
+    owner = uuid.uuid4().hex
+    if not await asyncio.to_thread(acquire_lease, db, lock_id, owner, LOCK_LEASE_HOURS):
+        log.info("NDVI series update already running elsewhere; skipped")
+        return {"towers": 0, "months_appended": 0, "skipped": True}
+    try:
+        return await _update_ndvi_series(db, tower_ids, collection, today)
+    finally:
+        await asyncio.to_thread(release_lease, db, lock_id, owner)
+
+
+async def _update_ndvi_series(
+    db: Database,
+    tower_ids: Optional[list[str]],
+    collection: str,
+    today: Optional[date],
+) -> dict[str, Any]:
+    query: dict[str, Any] = {"geometry": {"$ne": None}}
+    if tower_ids is not None:
+        query["id"] = {"$in": list(tower_ids)}
+    geometries = {doc["id"]: doc["geometry"] for doc in db["water_towers"].find(query, {"id": 1, "geometry": 1})}
+    summary: dict[str, Any] = {"towers": len(geometries), "months_appended": 0}
+    if not geometries:
+        return summary
+
+    _ensure_indexes(db)
+    computed = {
+        (doc["tower_id"], doc["year"]): doc.get("computed") or [bool(count) for count in doc["image_count"]]
+        for doc in db[SERIES_COLLECTION].find(
+            {"tower_id": {"$in": list(geometries)}, "collection": collection, "mask_version": NDVI_MASK_VERSION},
+            {"tower_id": 1, "year": 1, "image_count": 1, "computed": 1},
+        )
+    }
+    missing: dict[int, dict[str, list[int]]] = {}
+    for tower_id in geometries:
+        for year, month in _closed_months(collection, today):
+            if not computed.get((tower_id, year), [False] * 12)[month - 1]:
+                missing.setdefault(year, {}).setdefault(tower_id, []).append(month)
+
+    retry_until = (today or datetime.now(timezone.utc).date()) - timedelta(days=EMPTY_MONTH_RETRY_DAYS)
+
+    for year, months_by_tower in sorted(missing.items()):
+        months = sorted({m for ms in months_by_tower.values() for m in ms})
+        windows = [_month_window(year, month) for month in months]
+        try:
+            results = await compute_ndvi_stats_batch_async(
+                {tower_id: geometries[tower_id] for tower_id in months_by_tower},
+                windows,
+                collection=collection,
+            )
+        except Exception as exc:
+            log.warning("NDVI series update for %s failed: %s", year, exc)
+            continue
+
+        operations = []
+        now = datetime.now(timezone.utc)
+        for tower_id, tower_months in months_by_tower.items():
+            updates = {}
+            for month in tower_months:
+                result = results.get(tower_id, {}).get(_month_window(year, month))
+                # No image_count means Earth Engine did not answer; retry next run
+                if not result or result.get("image_count") is None:
+                    continue
+                for field in _FIELDS:
+                    updates[f"{field}.{month - 1}"] = result.get(field)
+                window_end = date.fromisoformat(_month_window(year, month)[1])
+                # Coarsened fallback results stand in until a full-scale run succeeds
+                full_scale = "scale_used" not in result
+                updates[f"computed.{month - 1}"] = full_scale and (bool(result["image_count"]) or window_end <= retry_until)
+            if not updates:
+                continue
+            bucket_id = _bucket_id(tower_id, collection, year)
+            operations += [
+                UpdateOne(
+                    {"_id": bucket_id},
+                    {"$setOnInsert": {
+                        "tower_id": tower_id,
+                        "collection": collection,
+                        "mask_version": NDVI_MASK_VERSION,
+                        "year": year,
+                        **{field: [None] * 12 for field in _FIELDS},
+                        "computed": [False] * 12,
+                    }},
+                    upsert=True,
+                ),
+                UpdateOne({"_id": bucket_id}, {"$set": {**updates, "updated_at": now}}),
+            ]
+            summary["months_appended"] += len(updates) // (len(_FIELDS) + 1)
+        if operations:
+            await asyncio.to_thread(db[SERIES_COLLECTION].bulk_write, operations, ordered=True)
+
+    log.info("NDVI series update complete: %s", summary)
+    return summary
+
+
+def _record_update(task: asyncio.Task) -> None:
+    if task.cancelled():
+        return
+    if task.exception():
+        _update_state["last_error"] = str(task.exception())
+        log.warning("NDVI series update failed: %s", task.exception())
+    else:
+        _update_state["last_summary"] = task.result()
+        _update_state["last_error"] = None
+
+
+def ndvi_series_update_status() -> dict[str, Any]:
+    """Whether an API-started update is running here, and the last one's summary or error."""
+    task = _update_state["task"]
+    return {
+        "running": task is not None and not task.done(),
+        "last_summary": _update_state["last_summary"],
+        "last_error": _update_state["last_error"],
+    }
+
+
+def start_ndvi_series_update(
+    db: Database,
+    tower_ids: Optional[list[str]] = None,
+    collection: str = DEFAULT_COLLECTION,
+) -> dict[str, Any]:
+    """Start update_ndvi_series in the background unless one is already running; returns its status."""
+    task = _update_state["task"]
+    if task is None or task.done():
+        task = asyncio.create_task(update_ndvi_series(db, tower_ids, collection))
+        task.add_done_callback(_record_update)
+        _update_state["task"] = task
+    return ndvi_series_update_status()
+
+
+def get_ndvi_series(db: Database, tower_id: str, collection: str = DEFAULT_COLLECTION) -> list[dict[str, Any]]:
+    """All computed months for a tower under the current mask version, oldest first, from a single query."""
+    series = []
+    query = {"tower_id": tower_id, "collection": collection, "mask_version": NDVI_MASK_VERSION}
+    for bucket in db[SERIES_COLLECTION].find(query).sort("year", 1):
+        for index in range(12):
+            if bucket["image_count"][index] is None:
+                continue
+            series.append({
+                "month": f"{bucket['year']}-{index + 1:02d}",
+                **{field: bucket[field][index] for field in _FIELDS},
+            })
+    return series
+
+
+def ndvi_trend(series: list[dict[str, Any]]) -> dict[str, Any]:
+    """
+    Least-squares NDVI trend over the months that have a value.
+
+    Returns:
+        slope_per_year (NDVI units per year, None with fewer than 12 months),
+        months_with_data, first_month and last_month
+    """
+    points = [(p["month"], p["ndvi_mean"]) for p in series if p["ndvi_mean"] is not None]
+    trend: dict[str, Any] = {
+        "slope_per_year": None,
+        "months_with_data": len(points),
+        "first_month": points[0][0] if points else None,
+        "last_month": points[-1][0] if points else None,
+    }
+    if len(points) >= 12:
+        x = np.array([int(m[:4]) + (int(m[5:7]) - 1) / 12.0 for m, _ in points])
+        y = np.array([value for _, value in points])
+        trend["slope_per_year"] = float(np.polyfit(x, y, 1)[0])
+    return trend
+
+
+async def run_ndvi_series_updater(db: Database, interval_hours: float) -> None:
+    """
+    Periodically append newly closed months to every tower's NDVI series.
+
+    The first run waits one interval so startup never triggers the backfill;
+    run it through POST /api/water-towers/ndvi-series/update instead.
+    """
+    while True:
+        await asyncio.sleep(interval_hours * 3600)
+        try:
+            await update_ndvi_series(db)
+        except Exception as exc:  # pragma: no cover - keep updating
+            log.warning("Scheduled NDVI series update failed: %s", exc)
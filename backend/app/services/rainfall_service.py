@@ -1,13 +1,22 @@
+import asyncio
 from datetime import datetime
-from pathlib import Path
+from typing import Any
 
+from app.ml.chirps_local import get_chirps_cube
 
-async def fetch_rainfall_summary(lat: float, lon: float, start_date: str, end_date: str) -> dict:
+
+async def fetch_rainfall_summary(
+    lat: float,
+    lon: float,
+    start_date: str,
+    end_date: str,
+    geometry: dict[str, Any] | None = None,
+) -> dict:
     """
-    Fetch rainfall summary from CHIRPS data.
-    This is a placeholder that uses a simple estimation.
-    In production, this should read CHIRPS NetCDF files.
-    
+    Fetch rainfall summary from the local CHIRPS NetCDF archive.
+    Uses the polygon-mean over `geometry` when given, otherwise the cell at lat/lon.
+    Falls back to a climate-based estimate if no archive is available.
+
     Returns dict with: rainfall_total_mm, rainfall_mean_mm_per_day, partial
     """
     try:
@@ -15,25 +24,33 @@ async def fetch_rainfall_summary(lat: float, lon: float, start_date: str, end_da
         start = datetime.strptime(start_date, "%Y-%m-%d")
         end = datetime.strptime(end_date, "%Y-%m-%d")
         days = (end - start).days + 1
-        
-        # In production, this would:
-        # 1. Load CHIRPS NetCDF file
-        # 2. Extract data for lat/lon
-        # 3. Sum rainfall over date range
-        
-        # For now, use a reasonable estimate based on Kenya's climate
+
+        cube = get_chirps_cube()
+        if cube is not None:
+            if geometry is not None:
+                summary = await asyncio.to_thread(cube.polygon_summary, geometry, start_date, end_date)
+            else:
+                summary = await asyncio.to_thread(cube.point_summary, lat, lon, start_date, end_date)
+            if summary is not None:
+                return {
+                    "rainfall_total_mm": summary["rainfall_total_mm"],
+                    "rainfall_mean_mm_per_day": summary["rainfall_mean_mm_per_day"],
+                    "partial": summary["partial"],
+                }
+
+        # No local archive (or site outside it): estimate from Kenya's climate
         # Kenya receives 630-1100mm annually, ~1.7-3mm/day average
         daily_estimate = 2.5  # mm/day (reasonable for Kenya)
-        
+
         rainfall_total = daily_estimate * days
         rainfall_mean = daily_estimate
-        
+
         return {
             "rainfall_total_mm": rainfall_total,
             "rainfall_mean_mm_per_day": rainfall_mean,
             "partial": True  # Mark as partial since we're estimating
         }
-        
+
     except Exception as e:
         return {
             "rainfall_total_mm": None,
@@ -1,17 +1,52 @@
+import asyncio
 import json
 import os
 from pathlib import Path
+from app.ml.soilgrids_local import get_soilgrids_store
 from app.services.http import http_service
 
+# Local layer -> (result key, divisor) for the 0-5cm topsoil summary
+LOCAL_TOPSOIL_LAYERS = {
+    "soc": ("soc", 10.0),  # dg/kg -> g/kg
+    "sand": ("sand", 10.0),  # g/kg -> %
+    "clay": ("clay", 10.0),
+    "silt": ("silt", 10.0),
+    "phh2o": ("ph", 10.0),  # pH*10 -> pH units
+}
+
+
+def _local_topsoil(lat: float, lon: float) -> dict | None:
+    """0-5cm soil properties from the local SoilGrids rasters, or None if unavailable."""
+    store = get_soilgrids_store()
+    if store is None:
+        return None
+    try:
+        values = store.sample_points([(lat, lon)], properties=list(LOCAL_TOPSOIL_LAYERS), depths=["0-5cm"])[0]
+    except Exception:
+        return None
+    result = {key: None for key, _ in LOCAL_TOPSOIL_LAYERS.values()}
+    for prop, (key, divisor) in LOCAL_TOPSOIL_LAYERS.items():
+        raw = values.get(prop, {}).get("0-5cm")
+        if raw is not None:
+            result[key] = raw / divisor
+    if all(v is None for v in result.values()):
+        return None
+    result["partial"] = any(v is None for v in result.values())
+    return result
+
 
 async def fetch_soil_properties(lat: float, lon: float) -> dict:
     """
-    Fetch soil properties from SoilGrids REST API.
+    Fetch soil properties from the local SoilGrids rasters, else the SoilGrids REST API.
     Falls back to fixture if API fails.
     
     Returns dict with: soc, sand, clay, silt, ph, partial
     """
     try:
+        local = await asyncio.to_thread(_local_topsoil, lat, lon)
+        if local is not None:
+            return local
+
         # Try SoilGrids REST API
         url = "https://rest.isric.org/soilgrids/v2.0/properties/query"
         params = {
@@ -1,19 +1,24 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from typing import Any, Optional, Tuple
 
 from pymongo.database import Database
 from shapely.geometry import shape
 
-from app.ml.environmental_api_client import CHIRPSClient, NASAPOWERClient, SoilGridsClient
-from app.ml.gee_ndvi import compute_ndvi_stats
+from app.core.config import settings
+from app.ml.environmental_api_client import AsyncCHIRPSClient, AsyncNASAPOWERClient, AsyncSoilGridsClient
+from app.ml.gee_ndvi import compute_ndvi_stats_async, compute_ndvi_stats_batch_async
 
 log = logging.getLogger(__name__)
 
+DEFAULT_NDVI_START = "2024-01-01"
+DEFAULT_NDVI_END = "2024-12-31"
 
-def _get_centroid_latlon(tower_doc: dict[str, Any]) -> Optional[Tuple[float, float]]:
+
+def get_centroid_latlon(tower_doc: dict[str, Any]) -> Optional[Tuple[float, float]]:
     """
     Extract a representative lat/lon from the tower geometry or metadata.
 
@@ -51,42 +56,77 @@ def _calc_health_score_from_ndvi(ndvi_mean: Optional[float]) -> Optional[float]:
     return None
 
 
+def default_baseline_window(
+    ndvi_start: str,
+    ndvi_end: str,
+    baseline_start: Optional[str] = None,
+    baseline_end: Optional[str] = None,
+) -> Tuple[str, str]:
+    """Default NDVI baseline: same window, previous year (explicit bounds win)."""
+
+    def _previous_year(day: str) -> str:
+        parsed = date.fromisoformat(day)
+        try:
+            return parsed.replace(year=parsed.year - 1).isoformat()
+        except ValueError:  # 29 February
+            return parsed.replace(year=parsed.year - 1, day=28).isoformat()
+
+    try:
+        return baseline_start or _previous_year(ndvi_start), baseline_end or _previous_year(ndvi_end)
+    except ValueError:
+        return baseline_start or ndvi_start, baseline_end or ndvi_end
+
+
 async def enrich_water_tower(
     db: Database,
     water_tower_id: str,
-    ndvi_start: str = "2024-01-01",
-    ndvi_end: str = "2024-12-31",
+    ndvi_start: str = DEFAULT_NDVI_START,
+    ndvi_end: str = DEFAULT_NDVI_END,
     baseline_start: Optional[str] = None,
     baseline_end: Optional[str] = None,
+    ndvi_results: Optional[dict[Tuple[str, str], dict[str, Any]]] = None,
 ) -> dict[str, Any]:
     """
     Fetch and persist NDVI, climate, and soil summaries for a single water tower.
 
     This uses existing environmental clients (CHIRPS, NASA POWER, SoilGrids) and
-    Sentinel-2 NDVI (via gee_ndvi) to populate tower.metadata.
+    Sentinel-2 NDVI (via gee_ndvi) to populate tower.metadata. NDVI windows
+    present in `ndvi_results` (e.g. from compute_ndvi_stats_batch) are used
+    as-is instead of being requested again.
     """
+    ndvi_results = ndvi_results or {}
+
+    async def _ndvi(start: str, end: str) -> dict[str, Any]:
+        if (start, end) in ndvi_results:
+            return ndvi_results[(start, end)]
+        return await compute_ndvi_stats_async(
+            geometry=tower_doc.get("geometry"),
+            start_date=start,
+            end_date=end,
+        )
+
     tower_doc = db["water_towers"].find_one({"id": water_tower_id})
     if not tower_doc:
         raise ValueError(f"Water tower {water_tower_id} not found")
 
-    latlon = _get_centroid_latlon(tower_doc)
+    latlon = get_centroid_latlon(tower_doc)
     if not latlon:
         raise ValueError(f"Water tower {water_tower_id} is missing geometry/centroid")
     lat, lon = latlon
 
     # Clients
-    chirps = CHIRPSClient()
-    nasa = NASAPOWERClient()
-    soil = SoilGridsClient()
+    chirps = AsyncCHIRPSClient()
+    nasa = AsyncNASAPOWERClient()
+    soil = AsyncSoilGridsClient()
 
     # Climate
-    rainfall_mm = chirps.get_rainfall_for_location(lat, lon)
-    temp_tuple = nasa.get_temperature_climatology(lat, lon) or (None, None, None)
+    rainfall_mm = await chirps.get_rainfall_for_location(lat, lon)
+    temp_tuple = await nasa.get_temperature_climatology(lat, lon) or (None, None, None)
     temp_mean, tmin_c, tmax_c = temp_tuple
 
     # Soil
     log.info(f"Fetching soil properties for {water_tower_id} at ({lat}, {lon})")
-    soil_props = soil.get_soil_properties(lat, lon) or {}
+    soil_props = await soil.get_soil_properties(lat, lon) or {}
     if soil_props:
         log.info(f"Soil data received: sand={soil_props.get('sand')}, clay={soil_props.get('clay')}, silt={soil_props.get('silt')}")
     else:
@@ -97,17 +137,14 @@ async def enrich_water_tower(
     ndvi_std = None
     ndvi_meta: dict[str, Any] = {}
     try:
-        ndvi_stats = compute_ndvi_stats(
-            geometry=tower_doc.get("geometry"),
-            start_date=ndvi_start,
-            end_date=ndvi_end,
-        )
+        ndvi_stats = await _ndvi(ndvi_start, ndvi_end)
         ndvi_mean = ndvi_stats.get("ndvi_mean")
         ndvi_std = ndvi_stats.get("ndvi_std")
         ndvi_meta = {
             "collection": ndvi_stats.get("collection_used"),
             "start_date": ndvi_stats.get("start_date"),
             "end_date": ndvi_stats.get("end_date"),
+            "image_count": ndvi_stats.get("image_count"),
         }
     except Exception as exc:  # pragma: no cover - NDVI optional
         log.warning("NDVI computation failed for %s: %s", water_tower_id, exc)
@@ -116,22 +153,11 @@ async def enrich_water_tower(
     ndvi_baseline_mean = None
     ndvi_baseline_std = None
     ndvi_delta = None
-    # Default baseline: same window, previous year
     if baseline_start is None or baseline_end is None:
-        try:
-            year = datetime.utcnow().year
-            baseline_start = ndvi_start.replace(str(year), str(year - 1))
-            baseline_end = ndvi_end.replace(str(year), str(year - 1))
-        except Exception:
-            baseline_start = baseline_start or ndvi_start
-            baseline_end = baseline_end or ndvi_end
+        baseline_start, baseline_end = default_baseline_window(ndvi_start, ndvi_end, baseline_start, baseline_end)
 
     try:
-        baseline_stats = compute_ndvi_stats(
-            geometry=tower_doc.get("geometry"),
-            start_date=baseline_start,
-            end_date=baseline_end,
-        )
+        baseline_stats = await _ndvi(baseline_start, baseline_end)
         ndvi_baseline_mean = baseline_stats.get("ndvi_mean")
         ndvi_baseline_std = baseline_stats.get("ndvi_std")
         if ndvi_mean is not None and ndvi_baseline_mean is not None:
@@ -179,26 +205,48 @@ async def enrich_water_tower(
 
 async def enrich_all_water_towers(
     db: Database,
-    ndvi_start: str = "2024-01-01",
-    ndvi_end: str = "2024-12-31",
+    ndvi_start: str = DEFAULT_NDVI_START,
+    ndvi_end: str = DEFAULT_NDVI_END,
+    max_workers: Optional[int] = None,
 ) -> list[dict[str, Any]]:
     """
-    Iterate over all towers and enrich them one by one.
+    Enrich all towers with at most `max_workers` towers in flight.
+
+    Provider clients share per-provider rate limiters (see app.ml.rate_limit),
+    so raising the worker count increases throughput without exceeding the
+    documented rate limits. max_workers=1 restores the sequential behaviour.
 
-    This is intentionally sequential to avoid hammering external APIs.
+    NDVI for every tower and both windows (current and baseline) is fetched
+    up front with one batched Earth Engine request.
     """
-    updated_docs: list[dict[str, Any]] = []
-    cursor = db["water_towers"].find()
-    for tower in cursor:
-        try:
-            updated = await enrich_water_tower(
-                db=db,
-                water_tower_id=tower["id"],
-                ndvi_start=ndvi_start,
-                ndvi_end=ndvi_end,
-            )
-            if updated:
-                updated_docs.append(updated)
-        except Exception as exc:  # pragma: no cover - batch resilience
-            log.warning("Enrichment failed for %s: %s", tower.get("id"), exc)
-    return updated_docs
+    workers = max(1, max_workers or settings.enrichment_max_workers)
+    semaphore = asyncio.Semaphore(workers)
+    towers = list(db["water_towers"].find({}, {"id": 1, "geometry": 1}))
+    windows = [(ndvi_start, ndvi_end), default_baseline_window(ndvi_start, ndvi_end)]
+    try:
+        ndvi_by_tower = await compute_ndvi_stats_batch_async(
+            {tower["id"]: tower["geometry"] for tower in towers if tower.get("geometry")},
+            windows,
+        )
+    except Exception as exc:  # pragma: no cover - towers fall back to per-window requests
+        log.warning("Batched NDVI prefetch failed: %s", exc)
+        ndvi_by_tower = {}
+
+    async def _enrich(tower_id: str) -> Optional[dict[str, Any]]:
+        async with semaphore:
+            try:
+                return await enrich_water_tower(
+                    db=db,
+                    water_tower_id=tower_id,
+                    ndvi_start=ndvi_start,
+                    ndvi_end=ndvi_end,
+                    ndvi_results=ndvi_by_tower.get(tower_id),
+                )
+            except Exception as exc:  # pragma: no cover - batch resilience
+                log.warning("Enrichment failed for %s: %s", tower_id, exc)
+                return None
+
+    tower_ids = [tower["id"] for tower in towers]
+    log.info("Enriching %d water towers with %d workers", len(tower_ids), workers)
+    results = await asyncio.gather(*(_enrich(tower_id) for tower_id in tower_ids))
+    return [doc for doc in results if doc]
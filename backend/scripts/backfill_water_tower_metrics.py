@@ -3,12 +3,15 @@ Backfill script to enrich all water towers with NDVI, climate, and soil summarie
 
 Usage (from repo root):
     cd backend
-    python -m scripts.backfill_water_tower_metrics
+    python -m scripts.backfill_water_tower_metrics [--workers N]
 
 This will call the same enrichment pipeline as the API endpoints and
-write results into the Mongo "water_towers" collection.
+write results into the Mongo "water_towers" collection. Towers are enriched
+concurrently (default: ENRICHMENT_MAX_WORKERS) while provider calls stay
+within their documented rate limits.
 """
 
+import argparse
 import asyncio
 from pymongo import MongoClient
 
@@ -16,12 +19,15 @@ from app.core.config import settings
 from app.services.tower_enrichment_service import enrich_all_water_towers
 
 
-async def main():
+async def main(max_workers: int | None = None):
     client = MongoClient(settings.mongodb_uri)
     db = client[settings.mongodb_db]
-    updated = await enrich_all_water_towers(db)
+    updated = await enrich_all_water_towers(db, max_workers=max_workers)
     print(f"Enriched {len(updated)} water towers.")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=None, help="Towers enriched concurrently")
+    args = parser.parse_args()
+    asyncio.run(main(max_workers=args.workers))
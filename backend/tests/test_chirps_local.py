@@ -0,0 +1,78 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+xr = pytest.importorskip("xarray")
+pd = pytest.importorskip("pandas")
+
+from app.ml import chirps_local
+from app.services import rainfall_service
+
+
+LATS = np.arange(-1.975, 1.0, 0.05)
+LONS = np.arange(35.025, 38.0, 0.05)
+
+
+@pytest.fixture
+def chirps_dir(tmp_path):
+    """A daily file for 2020 (2 mm/day, western columns masked) and a monthly file for 2021 (60 mm/month)."""
+    days = pd.date_range("2020-01-01", "2020-12-31", freq="D")
+    daily = np.full((len(days), len(LATS), len(LONS)), 2.0, dtype="float32")
+    daily[:, :, :10] = -9999
+    xr.Dataset(
+        {"precip": (("time", "latitude", "longitude"), daily)},
+        coords={"time": days, "latitude": LATS, "longitude": LONS},
+    ).to_netcdf(tmp_path / "chirps-v2.0.2020.days_p05.nc")
+
+    months = pd.date_range("2021-01-01", "2021-12-01", freq="MS")
+    xr.Dataset(
+        {"precip": (("time", "latitude", "longitude"), np.full((12, len(LATS), len(LONS)), 60.0, dtype="float32"))},
+        coords={"time": months, "latitude": LATS[::-1], "longitude": LONS},
+    ).to_netcdf(tmp_path / "chirps-v2.0.monthly.nc")
+    return tmp_path
+
+
+def test_point_queries_span_daily_and_monthly_files(chirps_dir):
+    cube = chirps_local.CHIRPSCube(sorted(chirps_dir.glob("*.nc")))
+
+    summary = cube.point_summary(-0.42, 36.5, "2020-12-17", "2021-01-15")
+    assert summary["rainfall_total_mm"] == pytest.approx(15 * 2.0 + 60.0 * 15 / 31)
+    assert summary["partial"] is False
+
+    masked, outside = cube.point_summaries([(0.1, 35.1), (4.5, 40.0)], "2020-03-01", "2020-03-31")
+    assert masked is None and outside is None
+    assert cube.annual_rainfall(-0.42, 36.5, 2020) == pytest.approx(732.0)
+
+
+def test_overlapping_daily_and_monthly_files_count_each_day_once(chirps_dir):
+    days = pd.date_range("2021-03-01", "2021-03-31", freq="D")
+    xr.Dataset(
+        {"precip": (("time", "latitude", "longitude"), np.full((31, len(LATS), len(LONS)), 2.0, dtype="float32"))},
+        coords={"time": days, "latitude": LATS, "longitude": LONS},
+    ).to_netcdf(chirps_dir / "chirps-v2.0.2021.03.days_p05.nc")
+    cube = chirps_local.CHIRPSCube(sorted(chirps_dir.glob("chirps-v2.0.*.nc")))
+
+    march = cube.point_summary(-0.42, 36.5, "2021-03-01", "2021-03-31")
+    assert march["rainfall_total_mm"] == pytest.approx(62.0)  # daily values win over the monthly 60 mm
+    assert march["days_covered"] == 31
+
+    straddling = cube.point_summary(-0.42, 36.5, "2021-02-15", "2021-03-10")
+    assert straddling["rainfall_total_mm"] == pytest.approx(60.0 * 14 / 28 + 10 * 2.0)
+    assert straddling["days_covered"] == 24
+    assert cube.annual_rainfall(-0.42, 36.5, 2021) == pytest.approx(11 * 60.0 + 62.0)
+
+
+def test_rainfall_service_uses_local_polygon_mean(chirps_dir, monkeypatch):
+    monkeypatch.setitem(chirps_local.DATA_SOURCES["chirps_local"], "path", chirps_dir)
+    monkeypatch.setattr(chirps_local, "_cubes", {})
+    polygon = {
+        "type": "Polygon",
+        "coordinates": [[[36.0, -0.5], [36.5, -0.5], [36.5, 0.0], [36.0, 0.0], [36.0, -0.5]]],
+    }
+
+    result = asyncio.run(
+        rainfall_service.fetch_rainfall_summary(-0.25, 36.25, "2021-03-01", "2021-03-31", geometry=polygon)
+    )
+
+    assert result == {"rainfall_total_mm": pytest.approx(60.0), "rainfall_mean_mm_per_day": pytest.approx(60.0 / 31), "partial": False}
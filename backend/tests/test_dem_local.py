@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+rasterio = pytest.importorskip("rasterio")
+from rasterio.transform import from_origin
+
+from app.ml import dem_local, features
+from app.ml.scoring import apply_elevation_rule
+
+
+@pytest.fixture
+def dem_path(tmp_path, monkeypatch):
+    """0.01° DEM over 36-37E, 0-1S rising 10 m per row from 1000 m; last column is nodata."""
+    path = tmp_path / "kenya_dem.tif"
+    data = (1000 + 10 * np.arange(100, dtype="float32"))[:, None].repeat(100, axis=1)
+    data[:, -1] = -9999
+    with rasterio.open(
+        path, "w", driver="GTiff", height=100, width=100, count=1, dtype="float32",
+        crs="EPSG:4326", transform=from_origin(36.0, 0.0, 0.01, 0.01), nodata=-9999,
+        tiled=True, blockxsize=32, blockysize=32,
+    ) as dst:
+        dst.write(data, 1)
+    monkeypatch.setitem(dem_local.DATA_SOURCES["dem"], "path", path)
+    monkeypatch.setattr(dem_local, "_samplers", {})
+    yield path
+    for sampler in dem_local._samplers.values():
+        if sampler is not None:
+            sampler.close()
+
+
+def test_points_and_polygon_stats(dem_path):
+    sampler = dem_local.get_dem_sampler()
+
+    assert sampler.sample_points([(-0.005, 36.5), (-0.505, 36.2), (-0.5, 36.995), (1.0, 38.0)]) == [
+        1000.0, 1500.0, None, None,
+    ]
+
+    stats = sampler.polygon_stats({
+        "type": "Polygon",
+        "coordinates": [[[36.2, -0.3], [36.3, -0.3], [36.3, -0.2], [36.2, -0.2], [36.2, -0.3]]],
+    })
+    assert stats == {"mean": pytest.approx(1245.0), "min": 1200.0, "max": 1290.0, "pixel_count": 100}
+
+    tiny = sampler.polygon_stats({
+        "type": "Polygon",
+        "coordinates": [[[36.501, -0.506], [36.502, -0.506], [36.502, -0.505], [36.501, -0.505], [36.501, -0.506]]],
+    })
+    assert tiny == {"mean": 1500.0, "min": 1500.0, "max": 1500.0, "pixel_count": 1}
+
+
+def test_elevation_feature_uses_dem_and_scores(dem_path, monkeypatch):
+    monkeypatch.setattr(features, "load_water_towers", lambda: pytest.fail("GeoJSON reloaded"))
+
+    elevation = features.get_elevation_for_site("site", latitude=-0.705, longitude=36.4)
+
+    assert elevation == 1700.0
+    points, is_met, _ = apply_elevation_rule(elevation)
+    assert is_met and points > 0
@@ -0,0 +1,337 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+from app.ml import cache
+from app.ml import circuit_breaker
+from app.ml import environmental_api_client as env
+
+
+POWER_PAYLOAD = {
+    "properties": {
+        "parameter": {
+            "T2M": {"ANN": 18.0},
+            "T2M_MIN": {"ANN": 12.0},
+            "T2M_MAX": {"ANN": 24.0},
+            "PRECTOTCORR": {"ANN": 2.0},
+            "ALLSKY_SFC_SW_DWN": {"ANN": 5.4},
+        }
+    }
+}
+
+
+@pytest.fixture
+def mock_transport(tmp_path, monkeypatch):
+    """Route the shared async client through an in-process transport."""
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json=POWER_PAYLOAD)
+
+    def fake_client() -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    monkeypatch.setattr(env, "get_async_http_client", fake_client)
+    fake_config = lambda: {"cache": {"directory": str(tmp_path)}, "data_dirs": {"fixtures": str(tmp_path)}}
+    monkeypatch.setattr(env, "get_config", fake_config)
+    monkeypatch.setattr(cache, "get_config", fake_config)
+    cache._memory_tier.clear()
+    circuit_breaker._breakers.clear()
+    return calls
+
+
+def test_async_nasa_power_temperature(mock_transport):
+    client = env.AsyncNASAPOWERClient()
+
+    result = asyncio.run(client.get_temperature_climatology(-0.42, 36.5))
+
+    assert result == (18.0, 12.0, 24.0)
+    assert len(mock_transport) == 1
+
+
+def test_async_chirps_rainfall_uses_cache(mock_transport):
+    client = env.AsyncCHIRPSClient()
+
+    first = asyncio.run(client.get_rainfall_for_location(-0.42, 36.5))
+    second = asyncio.run(client.get_rainfall_for_location(-0.42, 36.5))
+
+    assert first == pytest.approx(730.0)
+    assert second == first
+    assert len(mock_transport) == 1
+
+
+def test_chirps_fixture_fallback_is_not_cached(mock_transport, monkeypatch):
+    async def failing(request: httpx.Request) -> httpx.Response:
+        mock_transport.append(request)
+        return httpx.Response(503)
+
+    monkeypatch.setattr(env, "get_async_http_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(failing)))
+    client = env.AsyncCHIRPSClient()
+
+    assert asyncio.run(client.get_rainfall_for_location(-0.42, 36.5)) == client._load_fixture()
+    assert client.cache.get(client._cache_key(*client._snap(-0.42, 36.5), None)) is None
+
+
+def test_rainfall_and_temperature_share_one_climatology_call(mock_transport):
+    chirps = env.AsyncCHIRPSClient()
+    nasa = env.AsyncNASAPOWERClient()
+
+    async def tower():
+        return await asyncio.gather(
+            chirps.get_rainfall_for_location(-0.42, 36.5),
+            nasa.get_temperature_climatology(-0.42, 36.5),
+            nasa.get_rainfall_climatology(-0.42, 36.5),
+        )
+
+    rainfall, temperature, power_rainfall = asyncio.run(tower())
+
+    assert rainfall == power_rainfall == pytest.approx(730.0)
+    assert temperature == (18.0, 12.0, 24.0)
+    assert len(mock_transport) == 1
+    requested = mock_transport[0].url.params["parameters"].split(",")
+    assert {"T2M", "T2M_MIN", "T2M_MAX", "PRECTOTCORR", "ALLSKY_SFC_SW_DWN"} <= set(requested)
+
+
+def test_parse_rate_limit():
+    from app.ml.rate_limit import parse_rate_limit
+
+    assert parse_rate_limit("40 requests/minute") == (40, 60.0)
+    assert parse_rate_limit("10,000 requests/day") == (10000, 86400.0)
+    assert parse_rate_limit("Unlimited") is None
+
+
+def test_rate_limiter_never_exceeds_count_per_window(monkeypatch):
+    from app.ml import rate_limit
+
+    clock = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: clock[0])
+    limiter = rate_limit.SlidingWindowLimiter(3, 60.0)
+
+    assert [limiter._reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter._reserve() == pytest.approx(60.0)
+    clock[0] += 59.0
+    assert limiter._reserve() == pytest.approx(1.0)  # no refill within the window
+    clock[0] += 1.0
+    assert limiter._reserve() == 0.0
+
+
+def test_cache_promotes_disk_hits_into_memory(tmp_path):
+    cache._memory_tier.clear()
+    manager = cache.CacheManager(cache_dir=tmp_path, ttl_hours=1)
+    manager.set("soilgrids_test", {"ph": 6.5})
+    cache._memory_tier.clear()
+
+    memory_hits = cache._memory_tier.hits
+    assert manager.get("soilgrids_test") == {"ph": 6.5}
+    assert manager.get("soilgrids_test") == {"ph": 6.5}
+    assert cache._memory_tier.hits == memory_hits + 1
+
+
+def test_cached_values_cannot_be_mutated_by_callers(tmp_path):
+    cache._memory_tier.clear()
+    manager = cache.CacheManager(cache_dir=tmp_path, ttl_hours=1)
+    value = {"ph": 6.5}
+    manager.set("soilgrids_alias", value)
+    value["ph"] = 0.0
+    manager.get("soilgrids_alias")["ph"] = 1.0
+
+    assert manager.get("soilgrids_alias") == {"ph": 6.5}
+
+
+def test_async_lookup_runs_mongo_tier_off_the_event_loop(tmp_path, monkeypatch):
+    import threading
+    from mongomock import MongoClient
+
+    loop_threads = []
+    tier = cache.MongoTier(MongoClient()["towerguard_test"]["provider_cache"])
+    real_get = tier.get
+    monkeypatch.setattr(tier, "get", lambda key: loop_threads.append(threading.current_thread()) or real_get(key))
+    monkeypatch.setattr(cache, "_mongo_tier", tier)
+    cache._memory_tier.clear()
+    manager = cache.CacheManager(cache_dir=tmp_path, ttl_hours=1)
+
+    async def scenario():
+        await manager.aset("soilgrids_async", {"ph": 6.5})
+        cache._memory_tier.clear()
+        manager.disk.cache_dir.joinpath("soilgrids_async.json").unlink()
+        return await manager.alookup("soilgrids_async"), threading.current_thread()
+
+    (data, stale), loop_thread = asyncio.run(scenario())
+    assert (data, stale) == ({"ph": 6.5}, False)
+    assert loop_threads and loop_thread not in loop_threads
+
+
+def test_memory_tier_evicts_beyond_byte_budget():
+    tier = cache.MemoryTier(max_bytes=100)
+    for i in range(5):
+        tier.set(f"k{i}", {"data": i}, 1, "x" * 40)
+
+    assert tier.current_bytes <= 100
+    assert tier.get("k0") is None
+    assert tier.get("k4") is not None
+
+
+def test_concurrent_lookups_share_one_fetch(mock_transport):
+    client = env.AsyncNASAPOWERClient()
+
+    async def burst():
+        return await asyncio.gather(
+            *(client.get_temperature_climatology(-0.42, 36.5) for _ in range(5))
+        )
+
+    results = asyncio.run(burst())
+
+    assert all(result == (18.0, 12.0, 24.0) for result in results)
+    assert len(mock_transport) == 1
+
+
+def test_sites_in_same_grid_cell_share_cache_entry(mock_transport):
+    client = env.AsyncNASAPOWERClient()
+
+    asyncio.run(client.get_temperature_climatology(0.1500, 37.3000))
+    asyncio.run(client.get_temperature_climatology(0.1521, 37.3084))
+
+    assert len(mock_transport) == 1
+    assert env.snap_to_grid(0.1521, 37.3084, env.API_ENDPOINTS["nasa_power"]["grid"]) == (0.0, 37.5)
+
+
+def _write_aged_entry(manager, key, data, age_hours):
+    timestamp = (datetime.now() - timedelta(hours=age_hours)).isoformat()
+    manager._write(manager._tiers(), key, {"timestamp": timestamp, "data": data})
+
+
+def test_stale_entry_is_served_and_refreshed_in_background(mock_transport):
+    client = env.AsyncNASAPOWERClient()
+    lat, lon = client._snap(-0.42, 36.5)
+    key = client._cache_key("clim", lat, lon)
+    _write_aged_entry(client.cache, key, {"mean_c": 10.0, "min_c": 5.0, "max_c": 15.0}, client.cache.ttl_hours + 1)
+
+    async def run():
+        stale = await client.get_temperature_climatology(-0.42, 36.5)
+        await asyncio.sleep(0.1)
+        refreshed = await client.get_temperature_climatology(-0.42, 36.5)
+        return stale, refreshed
+
+    stale, refreshed = asyncio.run(run())
+
+    assert stale == (10.0, 5.0, 15.0)
+    assert refreshed == (18.0, 12.0, 24.0)
+    assert len(mock_transport) == 1
+
+
+def test_cache_discards_entries_past_hard_ttl(tmp_path):
+    cache._memory_tier.clear()
+    manager = cache.CacheManager(cache_dir=tmp_path, ttl_hours=1, stale_ttl_hours=2)
+
+    _write_aged_entry(manager, "swr_test", {"v": 1}, 1.5)
+    assert manager.lookup("swr_test") == ({"v": 1}, True)
+    assert manager.get("swr_test") is None
+
+    _write_aged_entry(manager, "swr_test", {"v": 1}, 3)
+    assert manager.lookup("swr_test") == (None, False)
+
+
+def test_circuit_opens_after_repeated_failures(monkeypatch):
+    circuit_breaker._breakers.clear()
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(503)
+
+    monkeypatch.setattr(
+        env, "get_async_http_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    http = env.AsyncHTTPClient(retry_attempts=1)
+    url = "https://power.example.org/api"
+
+    async def run():
+        return [await http.get(url) for _ in range(8)]
+
+    results = asyncio.run(run())
+
+    threshold = env.REQUEST_CONFIG["circuit_breaker"]["failure_threshold"]
+    assert results == [None] * 8
+    assert len(calls) == threshold
+    assert circuit_breaker.get_circuit_stats()["power.example.org"]["state"] == circuit_breaker.OPEN
+
+
+def test_circuit_half_opens_and_closes_on_successful_probe(monkeypatch):
+    breaker = circuit_breaker.CircuitBreaker("host", failure_threshold=2, reset_timeout_seconds=0)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.is_open
+
+    assert breaker.allow()
+    assert breaker.state == circuit_breaker.HALF_OPEN
+    breaker.record_success()
+    assert breaker.state == circuit_breaker.CLOSED
+
+
+def test_rate_limited_or_garbled_probe_does_not_close_the_circuit(monkeypatch):
+    circuit_breaker._breakers.clear()
+    responses = iter([httpx.Response(429), httpx.Response(200, text="not json")])
+    monkeypatch.setattr(
+        env, "get_async_http_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(lambda request: next(responses))),
+    )
+    url = "https://power.example.org/api"
+    breaker = circuit_breaker.get_circuit_breaker(url)
+    breaker.reset_timeout_seconds = 0
+    breaker._open(0.0)
+
+    http = env.AsyncHTTPClient(retry_attempts=1)
+    http.retry_delay = 0
+    assert asyncio.run(http.get(url)) is None  # 429 probe
+    assert breaker.state == circuit_breaker.HALF_OPEN
+    assert asyncio.run(http.get(url)) is None  # undecodable probe
+    assert breaker.state == circuit_breaker.HALF_OPEN
+    assert breaker.allow()  # probe slot was released
+
+
+def test_feature_pipeline_keeps_climatology_solar_radiation(mock_transport, monkeypatch):
+    from mongomock import MongoClient
+
+    from app.ml import feature_pipeline
+
+    monkeypatch.setenv("EE_DISABLE", "1")
+    monkeypatch.setattr(feature_pipeline, "compute_ndvi_from_catalog", lambda *a: None)
+    db = MongoClient()["towerguard_test"]
+    db["sites"].insert_one({
+        "id": "site-1",
+        "geometry": {"type": "Polygon", "coordinates": [[[36.5, -0.42], [36.51, -0.42], [36.51, -0.41], [36.5, -0.42]]]},
+    })
+
+    doc = asyncio.run(feature_pipeline.extract_features_for_site(db, "site-1", "2024-01-01", "2024-12-31"))
+
+    assert doc["solar_radiation"] == pytest.approx(5.4)
+    assert doc["source_breakdown"]["solar_radiation"]["available"]
+    assert sum("power.larc.nasa.gov" in str(r.url) for r in mock_transport) == 1
+
+
+def test_feature_pipeline_reports_local_ndvi_source(mock_transport, monkeypatch):
+    from mongomock import MongoClient
+
+    from app.ml import feature_pipeline
+
+    local = {
+        "ndvi_mean": 0.62, "ndvi_std": 0.05, "collection_used": "local:sentinel2",
+        "start_date": "2024-01-01", "end_date": "2024-12-31", "scene_id": "T37MBN_20240105", "scene_date": "2024-01-05",
+    }
+    monkeypatch.setattr(feature_pipeline, "compute_ndvi_from_catalog", lambda *a: local)
+    monkeypatch.setattr(feature_pipeline, "maybe_upload_ndvi", lambda *a: None)
+    db = MongoClient()["towerguard_test"]
+    db["sites"].insert_one({
+        "id": "site-1",
+        "geometry": {"type": "Polygon", "coordinates": [[[36.5, -0.42], [36.51, -0.42], [36.51, -0.41], [36.5, -0.42]]]},
+    })
+
+    doc = asyncio.run(feature_pipeline.extract_features_for_site(db, "site-1", "2024-01-01", "2024-12-31"))
+
+    assert doc["source_breakdown"]["ndvi"] == {
+        "source": "Sentinel-2 (local scene)", "collection": "local:sentinel2", "available": True,
+    }
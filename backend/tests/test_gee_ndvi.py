@@ -0,0 +1,131 @@
+import asyncio
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from mongomock import MongoClient
+
+from app.ml import ee_executor, gee_ndvi
+from app.ml.ndvi_store import NDVIResultStore
+
+TOWER = {"type": "Polygon", "coordinates": [[[36.0, -0.5], [36.1, -0.5], [36.1, -0.4], [36.0, -0.5]]]}
+CURRENT, BASELINE = ("2024-01-01", "2024-12-31"), ("2023-01-01", "2023-12-31")
+
+
+@pytest.fixture
+def ndvi_store(tmp_path, monkeypatch):
+    """NDVI result store on disk in tmp_path with Earth Engine disabled."""
+    monkeypatch.setattr(gee_ndvi, "_ndvi_store", NDVIResultStore(tmp_path, ttl_hours=24))
+    monkeypatch.setattr(gee_ndvi, "_EE_DISABLED", True)
+    return gee_ndvi._get_ndvi_store()
+
+
+def test_batch_serves_cached_pairs_shared_with_single_requests(ndvi_store):
+    cached = {"ndvi_mean": 0.61, "ndvi_std": 0.08, "collection_used": gee_ndvi.DEFAULT_COLLECTION,
+              "start_date": CURRENT[0], "end_date": CURRENT[1], "image_count": 41}
+    key = gee_ndvi._ndvi_store_key(TOWER, None, None, 500, *CURRENT, gee_ndvi.DEFAULT_COLLECTION, gee_ndvi.DEFAULT_SCALE)
+    ndvi_store.put(key, cached)
+
+    results = gee_ndvi.compute_ndvi_stats_batch({"mau": TOWER, "elgon": TOWER}, [CURRENT, BASELINE, CURRENT])
+
+    assert results["mau"][CURRENT] == results["elgon"][CURRENT] == cached
+    assert results["mau"][BASELINE] == {**cached, "ndvi_mean": None, "ndvi_std": None, "image_count": None,
+                                        "start_date": BASELINE[0], "end_date": BASELINE[1]}
+    assert gee_ndvi.compute_ndvi_stats(geometry=TOWER, start_date=CURRENT[0], end_date=CURRENT[1]) == cached
+
+
+def test_batch_rejects_bad_dates(ndvi_store):
+    with pytest.raises(ValueError):
+        gee_ndvi.compute_ndvi_stats_batch({"mau": TOWER}, [("2024-13-01", "2024-12-31")])
+
+
+def test_closed_windows_are_kept_forever_and_open_windows_expire(ndvi_store):
+    db = MongoClient()["towerguard_test"]
+    ndvi_store.configure(db)
+    today = date.today()
+    open_window = ((today - timedelta(days=30)).isoformat(), today.isoformat())
+    closed_key = gee_ndvi._ndvi_store_key(TOWER, None, None, 500, *BASELINE, gee_ndvi.DEFAULT_COLLECTION, 10)
+    open_key = gee_ndvi._ndvi_store_key(TOWER, None, None, 500, *open_window, gee_ndvi.DEFAULT_COLLECTION, 10)
+    ndvi_store.put(closed_key, {"ndvi_mean": 0.5})
+    ndvi_store.put(open_key, {"ndvi_mean": 0.6})
+
+    closed_doc = db["ndvi_results"].find_one({"_id": closed_key.id})
+    open_doc = db["ndvi_results"].find_one({"_id": open_key.id})
+    assert "expires_at" not in closed_doc and closed_doc["mask_version"] == gee_ndvi.NDVI_MASK_VERSION
+    assert open_doc["expires_at"] > datetime.now(timezone.utc).replace(tzinfo=None)
+
+    ndvi_store.clear_memory()
+    assert ndvi_store.get(closed_key, refresh_within_hours=10_000) == {"ndvi_mean": 0.5}
+    assert ndvi_store.get(open_key) == {"ndvi_mean": 0.6}
+    assert ndvi_store.get(open_key, refresh_within_hours=25) is None
+
+
+def test_ee_executor_caps_concurrency_and_enforces_deadlines(monkeypatch):
+    monkeypatch.setitem(ee_executor.EE_CONFIG, "max_concurrent_requests", 2)
+    monkeypatch.setattr(ee_executor, "_executor", None)
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def blocking_call(seconds):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(seconds)
+        with lock:
+            active[0] -= 1
+        return seconds
+
+    async def scenario():
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        beat = asyncio.create_task(heartbeat())
+        results = await asyncio.gather(*(ee_executor.run_ee(blocking_call, 0.05) for _ in range(6)))
+        with pytest.raises(asyncio.TimeoutError):
+            await ee_executor.run_ee(blocking_call, 0.3, deadline=0.05)
+        beat.cancel()
+        return results, ticks
+
+    results, ticks = asyncio.run(scenario())
+    ee_executor.shutdown_ee_executor()
+
+    assert results == [0.05] * 6
+    assert peak[0] == 2
+    assert ticks >= 10  # the event loop kept running while calls were blocked
+    assert ee_executor.get_ee_executor_stats()["timeouts"] >= 1
+
+
+def test_oversized_batch_is_split_then_coarsened(monkeypatch):
+    calls = []
+
+    def reduce_batch(geometries, windows, collection, scale):
+        calls.append((sorted(geometries), scale))
+        if "mau" in geometries and scale < 100:
+            raise RuntimeError("User memory limit exceeded.")
+        return {fid: {"fid": fid, "mean": 0.6, "w0_count": 3} for fid in geometries}
+
+    monkeypatch.setattr(gee_ndvi, "_reduce_batch", reduce_batch)
+    monkeypatch.setattr(gee_ndvi, "_is_ee_error", lambda exc: isinstance(exc, RuntimeError))
+
+    features = gee_ndvi._reduce_with_fallback({"elgon": TOWER, "mau": TOWER}, [CURRENT], "S2", 10)
+
+    assert features == {
+        "elgon": ({"fid": "elgon", "mean": 0.6, "w0_count": 3}, 10),
+        "mau": ({"fid": "mau", "mean": 0.6, "w0_count": 3}, 100),
+    }
+    assert calls == [(["elgon", "mau"], 10), (["elgon"], 10), (["mau"], 10), (["mau"], 30), (["mau"], 100)]
+
+
+def test_store_results_cannot_be_mutated_by_callers(ndvi_store):
+    key = gee_ndvi._ndvi_store_key(TOWER, None, None, 500, *BASELINE, gee_ndvi.DEFAULT_COLLECTION, 10)
+    result = {"ndvi_mean": 0.5}
+    ndvi_store.put(key, result)
+    result["ndvi_mean"] = 0.0
+    ndvi_store.get(key)["ndvi_mean"] = 1.0
+
+    assert ndvi_store.get(key) == {"ndvi_mean": 0.5}
@@ -0,0 +1,218 @@
+import numpy as np
+import pytest
+
+rasterio = pytest.importorskip("rasterio")
+from rasterio.features import geometry_mask
+from rasterio.transform import from_origin
+from shapely.geometry import Polygon, mapping
+
+from app.ml import ndvi
+
+TRANSFORM = from_origin(300000.0, 9950000.0, 10.0, 10.0)
+POLYGON = Polygon([(300055, 9949995), (300395, 9949705), (300600, 9949400), (300100, 9949350)])
+
+
+@pytest.fixture
+def bands(tmp_path):
+    """Tiled 64x64 UTM red/NIR bands with 16-pixel blocks and a nodata stripe."""
+    rng = np.random.default_rng(0)
+    red = rng.integers(200, 1500, (64, 64)).astype("uint16")
+    nir = rng.integers(1500, 4000, (64, 64)).astype("uint16")
+    red[40:44, :] = nir[40:44, :] = 0
+    paths = []
+    for name, data in (("B04", red), ("B08", nir)):
+        path = tmp_path / f"{name}.tif"
+        with rasterio.open(
+            path, "w", driver="GTiff", height=64, width=64, count=1, dtype="uint16",
+            crs="EPSG:32737", transform=TRANSFORM, nodata=0, tiled=True, blockxsize=16, blockysize=16,
+        ) as dst:
+            dst.write(data, 1)
+        paths.append(str(path))
+    return paths, red, nir
+
+
+def test_accumulator_matches_single_pass():
+    values = np.random.default_rng(1).uniform(-1, 1, 10_000)
+    acc = ndvi.NDVIAccumulator()
+    for block in np.array_split(values, 7):
+        acc.update(block)
+
+    assert acc.mean == pytest.approx(values.mean())
+    assert acc.std == pytest.approx(values.std())
+    assert (acc.min, acc.max) == (values.min(), values.max())
+
+
+def test_windowed_ndvi_matches_full_read(bands):
+    (red_path, nir_path), red, nir = bands
+    inside = geometry_mask([mapping(POLYGON)], out_shape=red.shape, transform=TRANSFORM, invert=True)
+    r, n = red[inside].astype(float), nir[inside].astype(float)
+    valid = (r != 0) & (n != 0)
+    expected = (n[valid] - r[valid]) / (n[valid] + r[valid])
+
+    stats = ndvi.compute_ndvi_windowed(red_path, nir_path, POLYGON.wkt, block_size=8)
+
+    assert stats["valid_count"] == expected.size
+    assert stats["count"] == int(inside.sum())
+    assert stats["mean"] == pytest.approx(expected.mean(), rel=1e-5)
+    assert stats["std"] == pytest.approx(expected.std(), rel=1e-4)
+    assert stats["max"] == pytest.approx(expected.max(), rel=1e-5)
+
+    site = ndvi.compute_ndvi_for_site("site", red_path, nir_path, POLYGON.wkt)
+    assert site["success"] and site["ndvi_mean"] == pytest.approx(stats["mean"])
+
+
+def test_in_memory_path_shares_one_clip(bands, monkeypatch):
+    (red_path, nir_path), red, _ = bands
+    calls = []
+    real_clip = ndvi.polygon_clip
+    monkeypatch.setattr(ndvi, "polygon_clip", lambda *a: calls.append(a) or real_clip(*a))
+
+    windowed = ndvi.compute_ndvi_windowed(red_path, nir_path, POLYGON.wkt)
+    in_memory = ndvi.compute_ndvi_for_site("site", red_path, nir_path, POLYGON.wkt, windowed=False)
+
+    assert len(calls) == 1
+    assert in_memory["ndvi_mean"] == pytest.approx(windowed["mean"])
+    assert in_memory["ndvi_valid_pixel_ratio"] == pytest.approx(windowed["valid_pixel_ratio"])
+
+    _, metadata = ndvi.load_sentinel2_band(red_path)
+    clipped, clipped_meta = ndvi.clip_to_polygon(red, metadata, POLYGON.wkt)
+    clip = real_clip(metadata, POLYGON)
+    assert clipped.shape == clip.shape == (clipped_meta["height"], clipped_meta["width"])
+    assert (clipped[~clip.mask] == 0).all()
+    assert np.shares_memory(clip.view(red), red)
+
+
+def test_zonal_ndvi_matches_per_site_reads(bands, monkeypatch):
+    from app.ml import zonal
+
+    (red_path, nir_path), _, _ = bands
+    zones = {
+        "tower": POLYGON.wkt,
+        "buffer": POLYGON.buffer(60).wkt,
+        "other": "POLYGON ((300450 9949950, 300600 9949950, 300600 9949800, 300450 9949800, 300450 9949950))",
+        "outside": "POLYGON ((0 0, 10 0, 10 10, 0 0))",
+    }
+    expected = {zone_id: ndvi.compute_ndvi_windowed(red_path, nir_path, wkt) for zone_id, wkt in zones.items()}
+
+    opened = []
+    real_open = rasterio.open
+    monkeypatch.setattr(zonal.rasterio, "open", lambda path, *a, **k: opened.append(path) or real_open(path, *a, **k))
+    stats = zonal.compute_zonal_ndvi(red_path, nir_path, zones, block_size=8)
+
+    assert len(opened) == 2
+    for zone_id in ("tower", "buffer", "other"):
+        assert stats[zone_id]["count"] == expected[zone_id]["count"]
+        assert stats[zone_id]["valid_count"] == expected[zone_id]["valid_count"]
+        for key in ("mean", "std", "min", "max"):
+            assert stats[zone_id][key] == pytest.approx(expected[zone_id][key], rel=1e-5)
+    assert stats["outside"]["mean"] is None and stats["outside"]["count"] == 0
+
+
+def test_multi_index_pass_reads_each_band_once(bands, tmp_path, monkeypatch):
+    (red_path, nir_path), red, nir = bands
+    rng = np.random.default_rng(2)
+    blue = rng.integers(100, 800, red.shape).astype("uint16")
+    green = rng.integers(300, 1200, red.shape).astype("uint16")
+    paths = {"B04": red_path, "B08": nir_path}
+    for name, data in (("B02", blue), ("B03", green)):
+        path = tmp_path / f"{name}.tif"
+        with rasterio.open(
+            path, "w", driver="GTiff", height=64, width=64, count=1, dtype="uint16",
+            crs="EPSG:32737", transform=TRANSFORM, nodata=0, tiled=True, blockxsize=16, blockysize=16,
+        ) as dst:
+            dst.write(data, 1)
+        paths[name] = str(path)
+
+    opened = []
+    real_open = rasterio.open
+    monkeypatch.setattr(ndvi.rasterio, "open", lambda path, *a, **k: opened.append(path) or real_open(path, *a, **k))
+    stats = ndvi.compute_indices_windowed(paths, POLYGON.wkt)
+
+    assert sorted(opened) == sorted(paths.values())
+    inside = geometry_mask([mapping(POLYGON)], out_shape=red.shape, transform=TRANSFORM, invert=True)
+    valid = inside & (red != 0) & (nir != 0)
+    b, g, r, n = (band[valid] / 10000.0 for band in (blue, green, red, nir))
+    expected = {
+        "ndvi": (n - r) / (n + r),
+        "evi": 2.5 * (n - r) / (n + 6 * r - 7.5 * b + 1),
+        "savi": 1.5 * (n - r) / (n + r + 0.5),
+        "ndwi": (g - n) / (g + n),
+    }
+    for name, values in expected.items():
+        assert stats[name]["valid_count"] == values.size
+        assert stats[name]["mean"] == pytest.approx(values.mean(), rel=1e-4)
+        assert stats[name]["std"] == pytest.approx(values.std(), rel=1e-3)
+
+
+def _write(path, data, transform=TRANSFORM, nodata=0):
+    with rasterio.open(
+        path, "w", driver="GTiff", height=data.shape[0], width=data.shape[1], count=1, dtype=data.dtype.name,
+        crs="EPSG:32737", transform=transform, nodata=nodata,
+    ) as dst:
+        dst.write(data, 1)
+    return str(path)
+
+
+def test_composite_rejects_empty_scene_list(tmp_path):
+    with pytest.raises(ValueError, match="No scenes"):
+        ndvi.compute_ndvi_composite([], tmp_path / "empty.tif")
+
+
+def test_median_composite_streams_tiles_and_masks_clouds(tmp_path):
+    scenes = []
+    for i, nir_value in enumerate((3000, 2000, 1500)):
+        red = np.full((64, 64), 1000, dtype="uint16")
+        nir = np.full((64, 64), nir_value, dtype="uint16")
+        scl = np.full((32, 32), 4, dtype="uint8")  # 20 m vegetation class
+        if i == 0:
+            scl[:16, :] = 9  # high-probability cloud over the top half
+        scenes.append({
+            "B04": _write(tmp_path / f"s{i}_B04.tif", red),
+            "B08": _write(tmp_path / f"s{i}_B08.tif", nir),
+            "SCL": _write(tmp_path / f"s{i}_SCL.tif", scl, from_origin(300000.0, 9950000.0, 20.0, 20.0)),
+        })
+
+    result = ndvi.compute_ndvi_composite(scenes, tmp_path / "median.tif", tile_size=16, max_workers=1)
+
+    with rasterio.open(result["path"]) as src:
+        composite, count = src.read(1), src.read(2)
+    top, bottom = (1 / 3 + 1 / 5) / 2, 1 / 3  # medians of {1/3, 1/5} and {1/2, 1/3, 1/5}
+    assert composite[:32] == pytest.approx(np.full((32, 64), top))
+    assert composite[32:] == pytest.approx(np.full((32, 64), bottom))
+    assert count[0, 0] == 2 and count[-1, -1] == 3
+    assert result["scene_count"] == 3 and result["valid_pixel_ratio"] == 1.0
+
+    pooled = ndvi.compute_ndvi_composite(
+        scenes, tmp_path / "pooled.tif", polygon_wkt=POLYGON.wkt, method="mean", tile_size=16, max_workers=2
+    )
+    inline = ndvi.compute_ndvi_composite(
+        scenes, tmp_path / "inline.tif", polygon_wkt=POLYGON.wkt, method="mean", tile_size=16, max_workers=1
+    )
+    with rasterio.open(pooled["path"]) as a, rasterio.open(inline["path"]) as b:
+        assert np.array_equal(a.read(), b.read(), equal_nan=True)
+    assert pooled["mean"] == pytest.approx(inline["mean"])
+
+
+def test_save_ndvi_array_writes_compressed_cog(tmp_path, monkeypatch):
+    monkeypatch.setitem(ndvi.FEATURE_CONFIG["ndvi"]["output"], "blocksize", 128)
+    y, x = np.mgrid[-1:1:512j, -1:1:512j]
+    values = (np.sin(3 * x) * np.cos(2 * y)).astype("float32")
+    values[:8, :8] = np.nan
+    metadata = {"crs": "EPSG:32737", "transform": TRANSFORM}
+
+    plain_profile = {"driver": "GTiff", "dtype": "float32", "width": 512, "height": 512, "count": 1, **metadata}
+    assert ndvi.save_ndvi_array(values, tmp_path / "plain.tif", plain_profile, cog=False)
+    assert ndvi.save_ndvi_array(values, tmp_path / "float.tif", metadata, compress="zstd")
+    assert ndvi.save_ndvi_array(values, tmp_path / "int16.tif", metadata, quantize=True)
+
+    with rasterio.open(tmp_path / "float.tif") as src:
+        assert src.block_shapes[0] == (128, 128)
+        assert src.compression.name.lower() == "zstd"
+        assert src.overviews(1) == [2, 4]
+        assert np.array_equal(src.read(1), values, equal_nan=True)
+
+    with rasterio.open(tmp_path / "int16.tif") as src:
+        assert src.dtypes[0] == "int16" and src.scales == (1e-4,)
+        restored = np.where(src.read(1) == src.nodata, np.nan, src.read(1) * src.scales[0])
+        assert np.allclose(restored, values, atol=5e-5, equal_nan=True)
+    assert (tmp_path / "int16.tif").stat().st_size * 4 < (tmp_path / "plain.tif").stat().st_size
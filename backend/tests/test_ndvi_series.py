@@ -0,0 +1,120 @@
+import asyncio
+from datetime import date
+
+import pytest
+from mongomock import MongoClient
+
+from app.db.locks import LOCK_COLLECTION, acquire_lease, release_lease
+from app.services import ndvi_series_service as series_service
+
+TOWER = {"type": "Polygon", "coordinates": [[[36.0, -0.5], [36.1, -0.5], [36.1, -0.4], [36.0, -0.5]]]}
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """Two towers and a fake batched NDVI call whose value rises 0.01 per month."""
+    db = MongoClient()["towerguard_test"]
+    db["water_towers"].insert_many([{"id": "mau", "geometry": TOWER}, {"id": "elgon", "geometry": TOWER}])
+    calls = []
+
+    async def fake_batch(geometries, windows, collection):
+        calls.append((sorted(geometries), list(windows)))
+        return {
+            tower_id: {
+                (start, end): {
+                    "ndvi_mean": 0.5 + 0.01 * int(start[5:7]) if start[5:7] != "02" else None,
+                    "ndvi_std": 0.1,
+                    "image_count": 0 if start[5:7] == "02" else 4,
+                }
+                for start, end in windows
+            }
+            for tower_id in geometries
+        }
+
+    monkeypatch.setattr(series_service, "compute_ndvi_stats_batch_async", fake_batch)
+    db.calls = calls
+    db.fake_batch = fake_batch
+    return db
+
+
+def test_series_backfills_then_appends_only_new_months(db):
+    first = asyncio.run(series_service.update_ndvi_series(db, today=date(2017, 4, 20)))
+    assert first == {"towers": 2, "months_appended": 6}
+    assert db.calls == [(["elgon", "mau"], [("2017-01-01", "2017-02-01"), ("2017-02-01", "2017-03-01"),
+                                          ("2017-03-01", "2017-04-01")])]
+
+    bucket = db["ndvi_series"].find_one({"tower_id": "mau"})
+    assert bucket["computed"][:3] == [True, False, True]  # February had no imagery yet
+
+    second = asyncio.run(series_service.update_ndvi_series(db, today=date(2018, 1, 3)))
+    assert second["months_appended"] == 2 * 9  # February retried, April-November; December is still open
+    assert db.calls[-1][1][:2] == [("2017-02-01", "2017-03-01"), ("2017-04-01", "2017-05-01")]
+    assert db["ndvi_series"].count_documents({}) == 2
+    assert db["ndvi_series"].find_one({"tower_id": "mau"})["computed"][1] is True  # now past the retry period
+
+    series = series_service.get_ndvi_series(db, "mau")
+    assert [p["month"] for p in series] == [f"2017-{m:02d}" for m in range(1, 12)]
+    assert series[1] == {"month": "2017-02", "ndvi_mean": None, "ndvi_std": 0.1, "image_count": 0}
+
+    trend = series_service.ndvi_trend(series)
+    assert trend["months_with_data"] == 10 and trend["last_month"] == "2017-11"
+    assert trend["slope_per_year"] is None  # fewer than 12 months
+    assert asyncio.run(series_service.update_ndvi_series(db, today=date(2018, 1, 3)))["months_appended"] == 0
+
+
+def test_mask_version_bump_recomputes_the_series(db, monkeypatch):
+    asyncio.run(series_service.update_ndvi_series(db, today=date(2017, 4, 20)))
+    assert len(series_service.get_ndvi_series(db, "mau")) == 3
+
+    monkeypatch.setattr(series_service, "NDVI_MASK_VERSION", "next-mask")
+    assert series_service.get_ndvi_series(db, "mau") == []
+    assert asyncio.run(series_service.update_ndvi_series(db, today=date(2017, 4, 20)))["months_appended"] == 6
+    assert db["ndvi_series"].count_documents({"mask_version": "next-mask"}) == 2
+
+
+def test_coarsened_months_are_retried(db, monkeypatch):
+    async def coarse_batch(geometries, windows, collection):
+        return {
+            tower_id: {window: {"ndvi_mean": 0.6, "ndvi_std": 0.1, "image_count": 4, "scale_used": 30} for window in windows}
+            for tower_id in geometries
+        }
+
+    monkeypatch.setattr(series_service, "compute_ndvi_stats_batch_async", coarse_batch)
+    assert asyncio.run(series_service.update_ndvi_series(db, today=date(2017, 2, 20)))["months_appended"] == 2
+    assert db["ndvi_series"].find_one({"tower_id": "mau"})["computed"][0] is False
+
+    monkeypatch.setattr(series_service, "compute_ndvi_stats_batch_async", db.fake_batch)
+    asyncio.run(series_service.update_ndvi_series(db, today=date(2017, 2, 20)))
+    assert db.calls == [(["elgon", "mau"], [("2017-01-01", "2017-02-01")])]
+    assert db["ndvi_series"].find_one({"tower_id": "mau"})["computed"][0] is True
+
+
+def test_update_is_skipped_while_another_worker_holds_the_lock(db):
+    lock_id = f"ndvi_series:update:{series_service.DEFAULT_COLLECTION}"
+    assert acquire_lease(db, lock_id, "other-worker", lease_hours=1)
+
+    skipped = asyncio.run(series_service.update_ndvi_series(db, today=date(2017, 4, 20)))
+    assert skipped["skipped"] is True and db.calls == []
+
+    release_lease(db, lock_id, "other-worker")
+    assert asyncio.run(series_service.update_ndvi_series(db, today=date(2017, 4, 20)))["months_appended"] == 6
+    assert db[LOCK_COLLECTION].count_documents({}) == 0
+
+
+def test_update_runs_in_the_background_and_reports_status(db):
+    async def start_and_wait():
+        status = series_service.start_ndvi_series_update(db, ["mau"])
+        assert status["running"] is True
+        assert series_service.start_ndvi_series_update(db)["running"] is True  # no second run while busy
+        await series_service._update_state["task"]
+        return series_service.ndvi_series_update_status()
+
+    status = asyncio.run(start_and_wait())
+    assert status["running"] is False and status["last_error"] is None
+    assert status["last_summary"]["towers"] == 1
+    assert db.calls and all(towers == ["mau"] for towers, _ in db.calls)
+
+
+def test_trend_slope_per_year():
+    series = [{"month": f"20{18 + i // 12}-{i % 12 + 1:02d}", "ndvi_mean": 0.4 + 0.002 * i} for i in range(24)]
+    assert series_service.ndvi_trend(series)["slope_per_year"] == pytest.approx(0.024)
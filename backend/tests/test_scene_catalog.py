@@ -0,0 +1,100 @@
+import json
+
+import numpy as np
+import pytest
+
+rasterio = pytest.importorskip("rasterio")
+from rasterio.transform import from_origin
+from rasterio.warp import transform_geom
+from shapely.geometry import box, mapping
+
+from app.ml import ndvi, scene_catalog
+
+TRANSFORM = from_origin(300000.0, 9950000.0, 10.0, 10.0)
+
+
+def _write_band(path, value):
+    with rasterio.open(
+        path, "w", driver="GTiff", height=64, width=64, count=1, dtype="uint16",
+        crs="EPSG:32737", transform=TRANSFORM, nodata=0,
+    ) as dst:
+        dst.write(np.full((64, 64), value, dtype="uint16"), 1)
+
+
+@pytest.fixture
+def sentinel_dir(tmp_path, monkeypatch):
+    """Two loose-GeoTIFF scenes on the same tile plus one STAC item far away."""
+    for stamp, (red, nir) in {"20240105T074211": (2000, 4000), "20240220T074211": (2000, 3000)}.items():
+        scene_dir = tmp_path / stamp
+        scene_dir.mkdir()
+        _write_band(scene_dir / f"T37MBN_{stamp}_B04_10m.tif", red)
+        _write_band(scene_dir / f"T37MBN_{stamp}_B08_10m.tif", nir)
+
+    stac_dir = tmp_path / "stac"
+    stac_dir.mkdir()
+    _write_band(stac_dir / "red.tif", 500)
+    (stac_dir / "item.json").write_text(json.dumps({
+        "type": "Feature",
+        "id": "S2B_far_away",
+        "geometry": mapping(box(40.0, 2.0, 41.0, 3.0)),
+        "properties": {"datetime": "2024-01-10T07:42:11Z", "eo:cloud_cover": 5.0},
+        "assets": {"red": {"href": "red.tif"}, "thumbnail": {"href": "https://example.com/t.png"}},
+    }))
+
+    monkeypatch.setitem(scene_catalog.DATA_SOURCES["sentinel_local"], "path", tmp_path)
+    monkeypatch.setattr(scene_catalog, "_catalogs", {})
+    return tmp_path
+
+
+def _site_geometry():
+    utm = mapping(box(300100, 9949500, 300400, 9949800))
+    return transform_geom("EPSG:32737", "EPSG:4326", utm)
+
+
+def test_catalog_builds_saves_and_searches(sentinel_dir):
+    catalog = scene_catalog.get_scene_catalog()
+    assert len(catalog) == 3
+    assert (sentinel_dir / "catalog.npz").exists()
+
+    reloaded = scene_catalog.SceneCatalog.load(sentinel_dir / "catalog.npz")
+    far = reloaded.search(box(40.5, 2.5, 40.6, 2.6), "2024-01-10", "2024-01-10")
+    assert [s.scene_id for s in far] == ["S2B_far_away"]
+    assert far[0].cloud_cover == 5.0 and set(far[0].assets) == {"B04"}
+
+    site = _site_geometry()
+    hits = reloaded.search(site, "2024-01-01", "2024-03-31", bands=("B04", "B08"))
+    assert [s.datetime.date().isoformat() for s in hits] == ["2024-02-20", "2024-01-05"]
+    assert hits[0].crs == "EPSG:32737"
+    assert reloaded.search(site, "2024-01-06", "2024-02-19") == []
+
+
+def test_catalog_rescans_when_scenes_are_added(sentinel_dir, monkeypatch):
+    assert len(scene_catalog.get_scene_catalog()) == 3
+
+    scene_dir = sentinel_dir / "20240310T074211"
+    scene_dir.mkdir()
+    _write_band(scene_dir / "T37MBN_20240310T074211_B04_10m.tif", 1000)
+    _write_band(scene_dir / "T37MBN_20240310T074211_B08_10m.tif", 2500)
+    assert len(scene_catalog.get_scene_catalog()) == 3  # within recheck_seconds
+
+    monkeypatch.setitem(scene_catalog.DATA_SOURCES["sentinel_local"], "recheck_seconds", 0)
+    assert len(scene_catalog.get_scene_catalog()) == 4
+    monkeypatch.setattr(scene_catalog, "_catalogs", {})
+    assert len(scene_catalog.get_scene_catalog()) == 4  # saved index is current
+
+
+def test_ndvi_from_catalog_uses_best_local_scene(sentinel_dir):
+    result = ndvi.compute_ndvi_from_catalog(_site_geometry(), "2024-01-01", "2024-01-31")
+
+    assert result["scene_id"] == "T37MBN_20240105T074211_10m"
+    assert result["ndvi_mean"] == pytest.approx(0.5)
+    assert ndvi.compute_ndvi_from_catalog(_site_geometry(), "2023-01-01", "2023-01-31") is None
+
+
+def test_boa_offset_follows_processing_baseline():
+    from datetime import datetime
+
+    assert scene_catalog.boa_add_offset_for(datetime(2021, 6, 1)) == 0.0
+    assert scene_catalog.boa_add_offset_for(datetime(2022, 6, 1)) == -1000.0
+    assert scene_catalog.boa_add_offset_for(datetime(2022, 6, 1), processing_baseline="03.01") == 0.0
+    assert scene_catalog.boa_add_offset_for(datetime(2021, 6, 1), processing_baseline="04.00") == -1000.0
@@ -87,3 +87,26 @@ def test_biodiversity_requires_filter():
     response = client.get(f"/api/biodiversity?site_id={some_uuid}")
     assert response.status_code == 200
     assert isinstance(response.json(), list)
+
+
+def test_default_baseline_window_is_previous_year():
+    from app.services.tower_enrichment_service import default_baseline_window
+
+    assert default_baseline_window("2024-01-01", "2024-12-31") == ("2023-01-01", "2023-12-31")
+    assert default_baseline_window("2024-02-29", "2024-03-31") == ("2023-02-28", "2023-03-31")
+    assert default_baseline_window("2024-01-01", "2024-12-31", "2020-01-01", "2020-06-30") == (
+        "2020-01-01", "2020-06-30",
+    )
+
+
+def test_cache_warmup_is_skipped_while_another_worker_holds_the_lease():
+    import asyncio
+
+    from app.db.locks import acquire_lease, release_lease
+    from app.services.cache_warmup_service import WARMUP_LOCK_ID, warm_canonical_caches
+
+    assert acquire_lease(test_db, WARMUP_LOCK_ID, "other-worker", lease_hours=1)
+    try:
+        assert asyncio.run(warm_canonical_caches(test_db, include_ndvi=False)) == {"towers": 0, "skipped": True}
+    finally:
+        release_lease(test_db, WARMUP_LOCK_ID, "other-worker")
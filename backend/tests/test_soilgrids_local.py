@@ -0,0 +1,62 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+rasterio = pytest.importorskip("rasterio")
+from rasterio.transform import from_origin
+
+from app.ml import environmental_api_client as env
+from app.ml import soilgrids_local
+from app.services import soil_service
+
+
+RAW_VALUES = {"phh2o": 62, "soc": 300, "sand": 400, "silt": 250, "clay": 350, "bdod": 120}
+
+
+@pytest.fixture
+def soil_dir(tmp_path, monkeypatch):
+    """Kenya-aligned 0.0025° rasters; each depth adds 10 raw units, top-left quadrant is nodata."""
+    transform = from_origin(36.0, 0.0, 0.0025, 0.0025)
+    for prop, base in RAW_VALUES.items():
+        for offset, depth in enumerate(["0-5cm", "5-15cm", "15-30cm"]):
+            data = np.full((200, 200), base + 10 * offset, dtype="int16")
+            data[:100, :100] = -32768
+            with rasterio.open(
+                tmp_path / f"{prop}_{depth}_mean.tif", "w", driver="GTiff", height=200, width=200,
+                count=1, dtype="int16", crs="EPSG:4326", transform=transform, nodata=-32768,
+            ) as dst:
+                dst.write(data, 1)
+    monkeypatch.setitem(soilgrids_local.DATA_SOURCES["soilgrids_local"], "path", tmp_path)
+    monkeypatch.setattr(soilgrids_local, "_stores", {})
+    yield tmp_path
+    for store in soilgrids_local._stores.values():
+        if store is not None:
+            store.close()
+
+
+def test_point_and_polygon_sampling_read_all_layers(soil_dir):
+    store = soilgrids_local.get_soilgrids_store()
+
+    inside, masked, outside = store.sample_points([(-0.4, 36.4), (-0.1, 36.1), (1.0, 38.0)])
+    assert inside["sand"] == {"0-5cm": 400.0, "5-15cm": 410.0, "15-30cm": 420.0}
+    assert masked["sand"]["0-5cm"] is None
+    assert outside["clay"]["15-30cm"] is None
+
+    props = store.properties_for_polygon({
+        "type": "Polygon",
+        "coordinates": [[[36.3, -0.4], [36.4, -0.4], [36.4, -0.3], [36.3, -0.3], [36.3, -0.4]]],
+    })
+    assert props["sand"] == pytest.approx(41.0)
+    assert props["ph"] == pytest.approx(7.2)
+
+
+def test_clients_prefer_local_rasters(soil_dir, monkeypatch):
+    monkeypatch.setattr(env.AsyncHTTPClient, "get", lambda *a, **k: pytest.fail("REST called"))
+
+    client_props = asyncio.run(env.AsyncSoilGridsClient().get_soil_properties(-0.4, 36.4))
+    topsoil = asyncio.run(soil_service.fetch_soil_properties(-0.4, 36.4))
+
+    assert client_props["clay"] == pytest.approx(36.0)
+    assert client_props["bulk_density"] == pytest.approx(130.0)
+    assert topsoil == {"soc": 30.0, "sand": 40.0, "clay": 35.0, "silt": 25.0, "ph": 6.2, "partial": False}